@@ -1,4 +1,6 @@
 import logging
+import multiprocessing
+import os
 
 from flask import Flask
 from flask_cors import CORS
@@ -9,10 +11,14 @@ from routes.upload import upload_bp
 from routes.voice import voice_bp
 from routes.interview import interview_bp
 from routes.dashboard import dashboard_bp
+from routes.export import export_bp
 from routes.submission import submission_bp
+from jobs import start_job_workers
 from storage import get_agent, init_storage
 from routes.analytics import analytics_bp
+from routes.batch import batch_bp
 from routes.gemini import gemini_bp
+from routes.jobs import jobs_bp
 
 def create_app() -> Flask:
     logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
@@ -29,15 +35,27 @@ def create_app() -> Flask:
     app.register_blueprint(voice_bp, url_prefix="/api")
     app.register_blueprint(interview_bp, url_prefix="/api")
     app.register_blueprint(dashboard_bp, url_prefix="/api")
+    app.register_blueprint(export_bp, url_prefix="/api")
     app.register_blueprint(agent_bp, url_prefix="/api")
     app.register_blueprint(submission_bp, url_prefix="/api")
+    app.register_blueprint(batch_bp, url_prefix="/api")
+    app.register_blueprint(jobs_bp, url_prefix="/api")
     app.register_blueprint(analytics_bp)
-    
+
     return app
 
 
 app = create_app()
 
+# Job workers run only in the process that serves requests: SSE events such as ``pdf_ready``
+# are published on that process's in-memory bus. Spawned PDF engine workers re-import this
+# module (as ``__mp_main__``), and the debug reloader's watcher process runs it as ``__main__``
+# without ``WERKZEUG_RUN_MAIN``; neither may lease jobs.
+if __name__ != "__main__" and multiprocessing.parent_process() is None:
+    start_job_workers()
+
 
 if __name__ == "__main__":
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_job_workers()
     app.run(host="0.0.0.0", port=5050, debug=True)
@@ -0,0 +1,114 @@
+import io
+import logging
+import wave
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+LEAD_PADDING_SECONDS = 0.2
+TRAIL_PADDING_SECONDS = 0.3
+# Speech frames must clear the noise floor by this margin and sit within this range of the peak.
+NOISE_MARGIN_DB = 10.0
+PEAK_RANGE_DB = 45.0
+WAV_CONTENT_TYPES = {"audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"}
+
+
+def is_wav_upload(content_type: str, head: bytes = b"") -> bool:
+    if str(content_type or "").split(";", 1)[0].strip().lower() in WAV_CONTENT_TYPES:
+        return True
+    return head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+
+
+def _decode_pcm(data: bytes) -> tuple[np.ndarray, int]:
+    """Decode integer PCM WAV bytes into mono float32 samples in [-1, 1]."""
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        channels = reader.getnchannels()
+        sample_width = reader.getsampwidth()
+        sample_rate = reader.getframerate()
+        frames = reader.readframes(reader.getnframes())
+
+    if sample_width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        packed = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = (np.where(packed & 0x800000, packed - 0x1000000, packed)).astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {sample_width}")
+
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def _lowpass(samples: np.ndarray, cutoff_ratio: float, taps: int = 63) -> np.ndarray:
+    # Windowed-sinc FIR; cutoff_ratio is the cutoff as a fraction of the source sample rate.
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff_ratio * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel.astype(np.float32), mode="same")
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Downsample to ``target_rate``; lower-rate audio is returned as-is since upsampling adds no detail."""
+    if source_rate <= target_rate or samples.size == 0:
+        return samples
+    samples = _lowpass(samples, 0.45 * target_rate / source_rate)
+    duration = samples.size / source_rate
+    target_times = np.arange(int(duration * target_rate)) / target_rate
+    source_times = np.arange(samples.size) / source_rate
+    return np.interp(target_times, source_times, samples).astype(np.float32)
+
+
+def speech_bounds(samples: np.ndarray, sample_rate: int) -> tuple[int, int] | None:
+    """Energy-based VAD: return the sample range from first to last voiced frame, padded."""
+    frame = max(1, int(sample_rate * FRAME_SECONDS))
+    frame_count = samples.size // frame
+    if frame_count == 0:
+        return None
+    frames = samples[: frame_count * frame].reshape(frame_count, frame)
+    rms_db = 20 * np.log10(np.sqrt(np.mean(frames * frames, axis=1)) + 1e-9)
+    threshold = max(np.percentile(rms_db, 10) + NOISE_MARGIN_DB, rms_db.max() - PEAK_RANGE_DB)
+    voiced = np.flatnonzero(rms_db > threshold)
+    if voiced.size == 0:
+        return None
+    start = max(0, voiced[0] * frame - int(LEAD_PADDING_SECONDS * sample_rate))
+    end = min(samples.size, (voiced[-1] + 1) * frame + int(TRAIL_PADDING_SECONDS * sample_rate))
+    return start, end
+
+
+def _encode_pcm16(samples: np.ndarray, sample_rate: int) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def preprocess_wav(data: bytes) -> bytes:
+    """Trim leading/trailing silence and convert to mono 16-bit PCM at no more than 16 kHz.
+
+    Returns the input unchanged when it cannot be decoded (e.g. float or compressed WAV),
+    or when no speech is detected so STT can still make the final call.
+    """
+    try:
+        samples, sample_rate = _decode_pcm(data)
+    except (wave.Error, ValueError, EOFError) as exc:
+        logger.info("Skipping WAV preprocessing: %s", exc)
+        return data
+
+    bounds = speech_bounds(samples, sample_rate)
+    if bounds is None:
+        return data
+    trimmed = samples[bounds[0] : bounds[1]]
+    return _encode_pcm16(resample(trimmed, sample_rate), min(sample_rate, TARGET_SAMPLE_RATE))
@@ -0,0 +1,265 @@
+"""Fill many answer sets against one agent template in parallel.
+
+Used by the batch-fill endpoint and as a CLI, run from backend/:
+
+    python batch_fill.py <agent_id> answers.csv --zip out.zip
+    python batch_fill.py <agent_id> answers.ndjson --completed
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+from completed_pdf import COMPLETED_PDF_STORAGE, persist_completed_session
+from form_index import form_index_for_agent
+from pdf_engine import PDF_ENGINE_WORKERS, PdfEngineBusy, run_pdf_job
+from routes.submission import fill_pdf_with_json
+from storage import COMPLETED_DIR, get_agent, init_storage, save_completed_session
+from zip_stream import iter_zip
+
+BATCH_FILL_MAX_ROWS = int(os.getenv("BATCH_FILL_MAX_ROWS", "5000") or 0)
+# Stay one fill short of the engine's workers so interactive fills and previews never queue behind a batch.
+BATCH_FILL_CONCURRENCY = max(1, int(os.getenv("BATCH_FILL_CONCURRENCY", str(max(1, PDF_ENGINE_WORKERS - 1))) or 1))
+# A busy engine is back-pressure, not a bad row: wait and resubmit before giving up on it.
+BATCH_FILL_BUSY_RETRIES = int(os.getenv("BATCH_FILL_BUSY_RETRIES", "8") or 0)
+BATCH_FILL_BUSY_RETRY_SECONDS = float(os.getenv("BATCH_FILL_BUSY_RETRY_SECONDS", "0.5") or 0)
+BATCH_FILL_BUSY_RETRY_MAX_SECONDS = 10.0
+INPUT_FORMATS = ("csv", "ndjson")
+
+
+class BatchInputError(ValueError):
+    pass
+
+
+@dataclass
+class FillResult:
+    index: int
+    answers: dict[str, str]
+    pdf_bytes: bytes | None = None
+    error: str = ""
+
+
+@dataclass
+class BatchProgress:
+    total: int
+    done: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def record(self, result: FillResult) -> None:
+        self.done += 1
+        if result.error:
+            self.failed += 1
+            self.errors.append({"row": result.index + 1, "error": result.error})
+
+    def as_dict(self) -> dict:
+        return {"total": self.total, "done": self.done, "failed": self.failed, "errors": self.errors[:100]}
+
+
+def detect_format(filename: str = "", content_type: str = "") -> str:
+    lowered = f"{filename} {content_type}".lower()
+    if "ndjson" in lowered or "jsonl" in lowered or "json" in lowered:
+        return "ndjson"
+    return "csv"
+
+
+def _clean_answers(raw: dict) -> dict[str, str]:
+    return {str(key).strip(): str(value) for key, value in raw.items() if str(key).strip() and value not in (None, "")}
+
+
+def parse_answer_sets(text: str, input_format: str, max_rows: int = BATCH_FILL_MAX_ROWS) -> list[dict[str, str]]:
+    """Parse CSV (header row = field names) or NDJSON (one object per line, optionally under "answers")."""
+    if input_format not in INPUT_FORMATS:
+        raise BatchInputError(f"format must be one of: {', '.join(INPUT_FORMATS)}")
+
+    answer_sets: list[dict[str, str]] = []
+    if input_format == "csv":
+        rows: Iterable[dict] = csv.DictReader(io.StringIO(text))
+    else:
+        rows = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise BatchInputError(f"Line {line_number} is not valid JSON: {exc.msg}") from exc
+            if isinstance(item, dict) and isinstance(item.get("answers"), dict):
+                item = item["answers"]
+            if not isinstance(item, dict):
+                raise BatchInputError(f"Line {line_number} must be a JSON object.")
+            rows.append(item)
+
+    for row in rows:
+        answer_sets.append(_clean_answers(row))
+        if max_rows and len(answer_sets) > max_rows:
+            raise BatchInputError(f"Batch exceeds {max_rows} answer sets.")
+    if not answer_sets:
+        raise BatchInputError("No answer sets found.")
+    return answer_sets
+
+
+def _fill_with_retry(pdf_path: str, answers: dict[str, str], form_index: dict | None) -> bytes:
+    attempt = 0
+    while True:
+        try:
+            return run_pdf_job(fill_pdf_with_json, pdf_path, answers, form_index)
+        except PdfEngineBusy:
+            if attempt >= BATCH_FILL_BUSY_RETRIES:
+                raise
+            time.sleep(min(BATCH_FILL_BUSY_RETRY_MAX_SECONDS, BATCH_FILL_BUSY_RETRY_SECONDS * (2**attempt)))
+            attempt += 1
+
+
+def iter_fills(
+    *,
+    pdf_path: str,
+    form_index: dict | None,
+    answer_sets: list[dict[str, str]],
+    concurrency: int = BATCH_FILL_CONCURRENCY,
+) -> Iterator[FillResult]:
+    """Yield fills as they finish (not in input order), keeping at most ``concurrency`` in flight."""
+    pending = {}
+    rows = iter(enumerate(answer_sets))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-fill") as executor:
+        while True:
+            while len(pending) < concurrency:
+                try:
+                    index, answers = next(rows)
+                except StopIteration:
+                    break
+                future = executor.submit(_fill_with_retry, pdf_path, answers, form_index)
+                pending[future] = (index, answers)
+            if not pending:
+                return
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, answers = pending.pop(future)
+                try:
+                    yield FillResult(index=index, answers=answers, pdf_bytes=future.result())
+                except Exception as exc:
+                    yield FillResult(index=index, answers=answers, error=str(exc) or type(exc).__name__)
+
+
+def _entry_name(index: int) -> str:
+    return f"filled-{index + 1:05d}.pdf"
+
+
+def iter_zip_batch(
+    *,
+    agent: dict,
+    answer_sets: list[dict[str, str]],
+    on_progress: Callable[[BatchProgress], None] | None = None,
+) -> Iterator[bytes]:
+    """Stream a ZIP of filled PDFs, closed by a ``batch_report.json`` entry with per-row errors."""
+    progress = BatchProgress(total=len(answer_sets))
+
+    def entries():
+        for result in iter_fills(
+            pdf_path=agent["pdf_path"], form_index=form_index_for_agent(agent), answer_sets=answer_sets
+        ):
+            progress.record(result)
+            if on_progress:
+                on_progress(progress)
+            if result.pdf_bytes is not None:
+                yield _entry_name(result.index), result.pdf_bytes
+        report = {"agent_id": agent["agent_id"], **progress.as_dict()}
+        yield "batch_report.json", json.dumps(report, indent=2).encode("utf-8")
+
+    return iter_zip(entries())
+
+
+def fill_into_completed(
+    *,
+    agent: dict,
+    answer_sets: list[dict[str, str]],
+    on_progress: Callable[[BatchProgress], None] | None = None,
+) -> BatchProgress:
+    """Store every fill as a completed session, exactly like individual submissions."""
+    progress = BatchProgress(total=len(answer_sets))
+    if COMPLETED_PDF_STORAGE == "lazy" and agent.get("template_sha256"):
+        # Nothing to fill up front: each session is rebuilt from its answers when first opened.
+        results: Iterable[FillResult] = (
+            FillResult(index=index, answers=answers, pdf_bytes=None) for index, answers in enumerate(answer_sets)
+        )
+    else:
+        results = iter_fills(pdf_path=agent["pdf_path"], form_index=form_index_for_agent(agent), answer_sets=answer_sets)
+    for result in results:
+        if not result.error:
+            session_id = str(uuid.uuid4())
+            try:
+                if result.pdf_bytes is None:
+                    persist_completed_session(
+                        session_id=session_id, agent=agent, answers=result.answers, fill=fill_pdf_with_json
+                    )
+                else:
+                    filled_pdf_path = COMPLETED_DIR / f"{session_id}_completed.pdf"
+                    filled_pdf_path.write_bytes(result.pdf_bytes)
+                    save_completed_session(
+                        session_id=session_id,
+                        agent_id=agent["agent_id"],
+                        answers=result.answers,
+                        filled_pdf_path=str(filled_pdf_path),
+                        template_sha256=agent.get("template_sha256", ""),
+                    )
+            except Exception as exc:
+                result.error = str(exc) or type(exc).__name__
+        progress.record(result)
+        if on_progress:
+            on_progress(progress)
+    return progress
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Fill many answer sets against one agent's PDF template.")
+    parser.add_argument("agent_id")
+    parser.add_argument("input", help="CSV with a header row of field names, or NDJSON with one object per line")
+    parser.add_argument("--format", choices=INPUT_FORMATS, help="defaults to the input file extension")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--zip", metavar="PATH", help="write filled PDFs into this ZIP file")
+    output.add_argument("--completed", action="store_true", help="store each fill as a completed session")
+    args = parser.parse_args(argv)
+
+    init_storage()
+    agent = get_agent(args.agent_id)
+    if not agent:
+        print(f"Agent {args.agent_id} not found.", file=sys.stderr)
+        return 1
+
+    with open(args.input, encoding="utf-8-sig") as handle:
+        text = handle.read()
+    try:
+        answer_sets = parse_answer_sets(text, args.format or detect_format(args.input))
+    except BatchInputError as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+
+    def report(progress: BatchProgress) -> None:
+        print(f"\r{progress.done}/{progress.total} filled, {progress.failed} failed", end="", file=sys.stderr, flush=True)
+
+    if args.zip:
+        progress_holder: list[BatchProgress] = []
+
+        def track(progress: BatchProgress) -> None:
+            progress_holder[:] = [progress]
+            report(progress)
+
+        with open(args.zip, "wb") as handle:
+            for chunk in iter_zip_batch(agent=agent, answer_sets=answer_sets, on_progress=track):
+                handle.write(chunk)
+        failed = progress_holder[0].failed if progress_holder else 0
+    else:
+        failed = fill_into_completed(agent=agent, answer_sets=answer_sets, on_progress=report).failed
+    print(file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
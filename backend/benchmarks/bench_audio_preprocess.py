@@ -0,0 +1,66 @@
+"""Benchmark STT audio preprocessing on synthetic WAV recordings.
+
+Run from backend/: python benchmarks/bench_audio_preprocess.py
+"""
+import io
+import sys
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from audio_preprocess import preprocess_wav  # noqa: E402
+
+
+def synthetic_recording(*, sample_rate: int, channels: int, lead_s: float, speech_s: float, trail_s: float) -> bytes:
+    rng = np.random.default_rng(7)
+    t = np.arange(int(speech_s * sample_rate)) / sample_rate
+    # Voiced-like signal: harmonics of a wobbling pitch with a syllable-rate envelope.
+    pitch = 140 + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6)) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2)
+    voice = 0.3 * voice / np.abs(voice).max()
+
+    def room_noise(seconds: float) -> np.ndarray:
+        return 0.003 * rng.standard_normal(int(seconds * sample_rate))
+
+    mono = np.concatenate([room_noise(lead_s), voice + room_noise(speech_s), room_noise(trail_s)])
+    interleaved = np.repeat(mono[:, None], channels, axis=1).reshape(-1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes((interleaved * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def main() -> None:
+    cases = [
+        ("48k stereo, 2s + 4s speech + 3s", dict(sample_rate=48000, channels=2, lead_s=2, speech_s=4, trail_s=3)),
+        ("44.1k mono, 1s + 8s speech + 1s", dict(sample_rate=44100, channels=1, lead_s=1, speech_s=8, trail_s=1)),
+        ("48k mono, 5s + 20s speech + 5s", dict(sample_rate=48000, channels=1, lead_s=5, speech_s=20, trail_s=5)),
+        ("16k mono, no silence", dict(sample_rate=16000, channels=1, lead_s=0, speech_s=6, trail_s=0)),
+    ]
+    print(f"{'case':<36} {'in KB':>9} {'out KB':>9} {'ratio':>7} {'in s':>6} {'out s':>6} {'ms':>8}")
+    for name, params in cases:
+        source = synthetic_recording(**params)
+        runs = 5
+        started = time.perf_counter()
+        for _ in range(runs):
+            output = preprocess_wav(source)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / runs
+        in_seconds = params["lead_s"] + params["speech_s"] + params["trail_s"]
+        with wave.open(io.BytesIO(output), "rb") as reader:
+            out_seconds = reader.getnframes() / reader.getframerate()
+        print(
+            f"{name:<36} {len(source) / 1024:>9.0f} {len(output) / 1024:>9.0f} "
+            f"{len(source) / len(output):>6.1f}x {in_seconds:>6.1f} {out_seconds:>6.1f} {elapsed_ms:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Compare raster (PNG per page) and vector (baked widgets) preview flattening.
+
+Run from backend/: python benchmarks/bench_flatten.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from form_index import build_form_index  # noqa: E402
+from pdf_preview import flatten_raster, flatten_vector  # noqa: E402
+from routes.submission import fill_pdf_with_json  # noqa: E402
+from synthetic_forms import build_synthetic_form, synthetic_answers  # noqa: E402
+
+WIDGETS_PER_PAGE = 20
+RUNS = 3
+
+
+def timed(func) -> tuple[float, int]:
+    size = 0
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        size = len(func())
+    return (time.perf_counter() - started) * 1000 / RUNS, size
+
+
+def main() -> None:
+    print(f"{'pages':>5} {'raster ms':>10} {'raster KB':>10} {'vector ms':>10} {'vector KB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in (1, 5, 20, 50):
+            pdf_path = str(Path(tmp) / f"form-{pages}.pdf")
+            Path(pdf_path).write_bytes(build_synthetic_form(pages, WIDGETS_PER_PAGE))
+            with fitz.open(pdf_path) as document:
+                form_index = build_form_index(document)
+            filled = fill_pdf_with_json(pdf_path, synthetic_answers(pages, WIDGETS_PER_PAGE), form_index)
+
+            def run(flatten):
+                with fitz.open(stream=filled, filetype="pdf") as doc:
+                    return flatten(doc)
+
+            raster_ms, raster_size = timed(lambda: run(flatten_raster))
+            vector_ms, vector_size = timed(lambda: run(flatten_vector))
+            print(f"{pages:>5} {raster_ms:>10.1f} {raster_size / 1024:>10.0f} {vector_ms:>10.1f} {vector_size / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compare full-document widget walks with compiled form-index fills.
+
+Run from backend/: python benchmarks/bench_form_index.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from form_index import assign_indexed_value, build_form_index, template_matchers  # noqa: E402
+from routes.submission import fill_pdf_with_json  # noqa: E402
+from synthetic_forms import build_synthetic_form, synthetic_answers  # noqa: E402
+
+PAGES = 50
+WIDGETS_PER_PAGE = 20
+
+
+def legacy_fill(pdf_path: str, answers: dict[str, str], fields: dict[str, dict]) -> bytes:
+    # The pre-index implementation: visit every widget on every page. ``fields`` only supplies fill metadata.
+    with fitz.open(pdf_path) as doc:
+        processed_radio_fields: set[str] = set()
+        matchers = template_matchers(pdf_path)
+        for page in doc:
+            for widget in page.widgets() or []:
+                field_name = str(getattr(widget, "field_name", "") or "").strip()
+                if not field_name or field_name not in answers:
+                    continue
+                field_type = str(getattr(widget, "field_type_string", "") or "")
+                if field_type == "RadioButton":
+                    if field_name in processed_radio_fields:
+                        continue
+                    processed_radio_fields.add(field_name)
+                assign_indexed_value(field_name, fields[field_name], widget, str(answers[field_name]), matchers)
+        doc.need_appearances(True)
+        return doc.write()
+
+
+def timed(func, runs: int = 5) -> float:
+    started = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - started) * 1000 / runs
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = str(Path(tmp) / "form.pdf")
+        Path(pdf_path).write_bytes(build_synthetic_form(PAGES, WIDGETS_PER_PAGE))
+        with fitz.open(pdf_path) as document:
+            build_ms = timed(lambda: build_form_index(document), runs=3)
+            form_index = build_form_index(document)
+
+        print(f"{PAGES} pages, {PAGES * WIDGETS_PER_PAGE} widgets; index build {build_ms:.1f} ms (once, at upload)")
+        print(f"{'answers':<28} {'full walk ms':>13} {'indexed ms':>11} {'speedup':>8}")
+        scenarios = [
+            ("1 page (live preview)", synthetic_answers(PAGES, WIDGETS_PER_PAGE, [7])),
+            ("5 pages", synthetic_answers(PAGES, WIDGETS_PER_PAGE, [0, 10, 20, 30, 40])),
+            ("all 1000 widgets", synthetic_answers(PAGES, WIDGETS_PER_PAGE)),
+        ]
+        for name, answers in scenarios:
+            legacy_ms = timed(lambda: legacy_fill(pdf_path, answers, form_index["fields"]))
+            indexed_ms = timed(lambda: fill_pdf_with_json(pdf_path, answers, form_index))
+            print(f"{name:<28} {legacy_ms:>13.1f} {indexed_ms:>11.1f} {legacy_ms / indexed_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
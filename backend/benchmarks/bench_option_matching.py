@@ -0,0 +1,92 @@
+"""Compare per-call option normalization with the compiled option matcher.
+
+Run from backend/: python benchmarks/bench_option_matching.py
+"""
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from option_matching import OptionMatcher, _compiled_matcher, map_value_to_allowed_option  # noqa: E402
+
+FIELDS = 20
+LOOKUPS_PER_FIELD = 50
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^\w]+", " ", str(text or "").lower(), flags=re.UNICODE).strip()
+
+
+def legacy_map(value: str, options: list[str]) -> str:
+    # The pre-matcher implementation: normalize every option on every call.
+    raw = str(value or "").strip()
+    if not raw:
+        return ""
+    if raw in options:
+        return raw
+    normalized_raw = _normalize(raw)
+    for option in options:
+        if normalized_raw == _normalize(option):
+            return option
+    for option in options:
+        normalized_option = _normalize(option)
+        if normalized_raw and normalized_raw in normalized_option:
+            return option
+        if normalized_option and normalized_option in normalized_raw:
+            return option
+    return ""
+
+
+def build_fields(option_count: int) -> list[list[str]]:
+    return [[f"Option {field}-{index} (County of Region {index % 37})" for index in range(option_count)] for field in range(FIELDS)]
+
+
+def answers_for(options: list[str]) -> list[str]:
+    # A mix of spoken-style answers: case/punctuation variants, partial names and misses.
+    picks = []
+    for index in range(LOOKUPS_PER_FIELD):
+        option = options[(index * 7) % len(options)]
+        picks.append([option.upper(), option.replace("(", "").replace(")", ""), option.split(" (")[0].lower(), "none of these"][index % 4])
+    return picks
+
+
+def run(mapper, fields: list[list[str]]) -> float:
+    started = time.perf_counter()
+    for options in fields:
+        for answer in answers_for(options):
+            mapper(answer, options)
+    return (time.perf_counter() - started) * 1000
+
+
+def run_indexed(fields: list[list[str]]) -> float:
+    # Fresh matchers with their substring index already built: first-time answers, no memo hits.
+    matchers = [OptionMatcher(tuple(options)) for options in fields]
+    for matcher in matchers:
+        matcher.match("index warm-up miss")
+    started = time.perf_counter()
+    for options, matcher in zip(fields, matchers):
+        for answer in answers_for(options):
+            matcher.match(answer)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    print(f"{FIELDS} fields x {LOOKUPS_PER_FIELD} answers each")
+    print(f"{'options':>8} {'legacy ms':>10} {'cold ms':>9} {'lookup ms':>10} {'warm ms':>9} {'speedup':>8}")
+    for option_count in (10, 100, 500, 2000):
+        fields = build_fields(option_count)
+        for options in fields:
+            assert all(legacy_map(a, options) == map_value_to_allowed_option(a, options) for a in answers_for(options))
+        legacy_ms = run(legacy_map, fields)
+        fields = build_fields(option_count)  # fresh lists, but equal contents reuse compiled matchers
+        _compiled_matcher.cache_clear()
+        cold_ms = run(map_value_to_allowed_option, fields)
+        warm_ms = run(map_value_to_allowed_option, fields)
+        lookup_ms = run_indexed(fields)
+        print(f"{option_count:>8} {legacy_ms:>10.1f} {cold_ms:>9.1f} {lookup_ms:>10.1f} {warm_ms:>9.1f} {legacy_ms / warm_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
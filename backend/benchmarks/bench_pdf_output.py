@@ -0,0 +1,61 @@
+"""Size and write time of filled PDFs under different output options.
+
+Run from backend/: python benchmarks/bench_pdf_output.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from form_index import assign_indexed_value, build_form_index, iter_answer_widgets, template_matchers  # noqa: E402
+from pdf_output import optimized_pdf_bytes  # noqa: E402
+from synthetic_forms import build_synthetic_form, synthetic_answers  # noqa: E402
+
+WIDGETS_PER_PAGE = 20
+RUNS = 3
+PROFILES = {
+    "write()": lambda doc: doc.write(),
+    "garbage=1": lambda doc: optimized_pdf_bytes(doc, garbage=1, deflate=False, linear=False),
+    "g1+deflate": lambda doc: optimized_pdf_bytes(doc, garbage=1, deflate=True, linear=False),
+    "g3+deflate": lambda doc: optimized_pdf_bytes(doc, garbage=3, deflate=True, linear=False),
+    "g4+deflate": lambda doc: optimized_pdf_bytes(doc, garbage=4, deflate=True, linear=False),
+    "g3+linear": lambda doc: optimized_pdf_bytes(doc, garbage=3, deflate=True, linear=True),
+}
+
+
+def filled_document(pdf_path: str, answers: dict[str, str], form_index: dict) -> fitz.Document:
+    doc = fitz.open(pdf_path)
+    matchers = template_matchers(pdf_path)
+    for field_name, entry, widget in iter_answer_widgets(doc, form_index, answers):
+        assign_indexed_value(field_name, entry, widget, answers[field_name], matchers)
+    doc.need_appearances(True)
+    return doc
+
+
+def main() -> None:
+    print(f"{'pages':>5} {'profile':>12} {'write ms':>9} {'KB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in (1, 5, 20, 50):
+            pdf_path = str(Path(tmp) / f"form-{pages}.pdf")
+            Path(pdf_path).write_bytes(build_synthetic_form(pages, WIDGETS_PER_PAGE))
+            with fitz.open(pdf_path) as document:
+                form_index = build_form_index(document)
+            answers = synthetic_answers(pages, WIDGETS_PER_PAGE)
+
+            for name, write in PROFILES.items():
+                elapsed = 0.0
+                size = 0
+                for _ in range(RUNS):
+                    with filled_document(pdf_path, answers, form_index) as doc:
+                        started = time.perf_counter()
+                        size = len(write(doc))
+                        elapsed += time.perf_counter() - started
+                print(f"{pages:>5} {name:>12} {elapsed * 1000 / RUNS:>9.1f} {size / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
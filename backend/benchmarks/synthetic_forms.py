@@ -0,0 +1,39 @@
+"""Synthetic fillable PDFs shared by the benchmarks."""
+import fitz
+
+
+def build_synthetic_form(pages: int = 50, widgets_per_page: int = 20) -> bytes:
+    """Text, checkbox and combo widgets laid out on ``pages`` letter pages."""
+    document = fitz.open()
+    for page_index in range(pages):
+        page = document.new_page(width=612, height=792)
+        for slot in range(widgets_per_page):
+            y = 40 + slot * 36
+            page.insert_text((36, y + 12), f"Question {page_index + 1}.{slot + 1}", fontsize=9)
+            widget = fitz.Widget()
+            widget.field_name = f"p{page_index}_f{slot}"
+            kind = slot % 5
+            if kind == 3:
+                widget.field_type = fitz.PDF_WIDGET_TYPE_CHECKBOX
+                widget.rect = fitz.Rect(200, y, 214, y + 14)
+            elif kind == 4:
+                widget.field_type = fitz.PDF_WIDGET_TYPE_COMBOBOX
+                widget.choice_values = ["Alberta", "British Columbia", "Manitoba", "Ontario", "Quebec"]
+                widget.rect = fitz.Rect(200, y, 400, y + 18)
+            else:
+                widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+                widget.rect = fitz.Rect(200, y, 500, y + 18)
+            page.add_widget(widget)
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def synthetic_answers(pages: int, widgets_per_page: int, page_indices=None) -> dict[str, str]:
+    answers: dict[str, str] = {}
+    for page_index in page_indices if page_indices is not None else range(pages):
+        for slot in range(widgets_per_page):
+            kind = slot % 5
+            value = "Yes" if kind == 3 else "Ontario" if kind == 4 else f"Answer {page_index}-{slot}"
+            answers[f"p{page_index}_f{slot}"] = value
+    return answers
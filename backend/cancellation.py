@@ -0,0 +1,23 @@
+import threading
+
+
+class OperationCancelled(RuntimeError):
+    pass
+
+
+class CancellationToken:
+    """Cooperative cancellation flag shared between a turn and the upstream calls it starts."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise OperationCancelled("Operation was superseded by a newer turn.")
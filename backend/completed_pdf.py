@@ -0,0 +1,238 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, TypeVar
+
+from form_index import form_index_for_agent
+from pdf_engine import run_pdf_job
+from storage import COMPLETED_DIR, DATA_DIR, MATERIALIZED_DIR, get_agent, save_completed_session, template_blob_path
+
+logger = logging.getLogger(__name__)
+
+# "eager" writes every filled PDF at completion; "lazy" stores answers plus the template hash
+# and fills on first download or preview.
+COMPLETED_PDF_STORAGE = os.getenv("COMPLETED_PDF_STORAGE", "eager").strip().lower()
+if COMPLETED_PDF_STORAGE not in {"eager", "lazy"}:
+    COMPLETED_PDF_STORAGE = "eager"
+MATERIALIZED_CACHE_MAX_BYTES = int(os.getenv("MATERIALIZED_PDF_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)) or 0)
+# A reader whose PDF was evicted before it could open it rebuilds it this many times in total.
+MATERIALIZED_READ_ATTEMPTS = 3
+
+FillFunc = Callable[[str, dict, dict | None], bytes]
+T = TypeVar("T")
+
+# session_id -> [lock, holders and waiters]
+_SESSION_LOCKS: dict[str, list] = {}
+_SESSION_LOCKS_GUARD = threading.Lock()
+
+
+def materialized_pdf_path(session_id: str) -> Path:
+    return MATERIALIZED_DIR / f"{session_id}.pdf"
+
+
+def persist_completed_session(
+    *,
+    session_id: str,
+    agent: dict,
+    answers: dict[str, str],
+    fill: FillFunc,
+    language_code: str = "en-US",
+    language_label: str = "English (US)",
+) -> tuple[Path, bool]:
+    """Save a completed session in the configured storage mode.
+
+    Returns the session's PDF path and whether the PDF was written now. Agents created before
+    templates were content-addressed have no hash to rebuild from and always store eagerly.
+    """
+    template_sha256 = agent.get("template_sha256", "")
+    if COMPLETED_PDF_STORAGE == "lazy" and template_sha256:
+        filled_pdf_path = materialized_pdf_path(session_id)
+        pdf_storage = "lazy"
+    else:
+        filled_pdf_bytes = run_pdf_job(fill, agent["pdf_path"], answers, form_index_for_agent(agent))
+        filled_pdf_path = COMPLETED_DIR / f"{session_id}_completed.pdf"
+        filled_pdf_path.write_bytes(filled_pdf_bytes)
+        pdf_storage = "eager"
+
+    save_completed_session(
+        session_id=session_id,
+        agent_id=agent["agent_id"],
+        answers=answers,
+        filled_pdf_path=str(filled_pdf_path),
+        language_code=language_code,
+        language_label=language_label,
+        template_sha256=template_sha256,
+        pdf_storage=pdf_storage,
+    )
+    return filled_pdf_path, pdf_storage == "eager"
+
+
+@contextmanager
+def _session_lock(session_id: str) -> Iterator[None]:
+    """Hold the session's lock; it is dropped from the map once no thread holds or waits on it."""
+    with _SESSION_LOCKS_GUARD:
+        entry = _SESSION_LOCKS.setdefault(session_id, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _SESSION_LOCKS_GUARD:
+            entry[1] -= 1
+            if not entry[1]:
+                _SESSION_LOCKS.pop(session_id, None)
+
+
+def _touch(path: Path) -> None:
+    # Only the access time moves; cached previews compare against the PDF's mtime.
+    try:
+        os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+    except OSError:
+        pass
+
+
+class _MaterializedFiles:
+    """Sizes of materialized PDFs in least recently used order, kept within a byte budget.
+
+    The directory is scanned once, on first use, to pick up files from earlier runs; after that
+    sizes are tracked as files are written, read and evicted.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._sizes: "OrderedDict[Path, int] | None" = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> "OrderedDict[Path, int]":
+        if self._sizes is None:
+            found = []
+            for path in MATERIALIZED_DIR.glob("*.pdf"):
+                if "_preview_" in path.stem:
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                found.append((stat.st_atime, path, stat.st_size))
+            found.sort(key=lambda item: item[0])
+            self._sizes = OrderedDict((path, size) for _, path, size in found)
+            self._bytes = sum(self._sizes.values())
+        return self._sizes
+
+    def touch(self, path: Path) -> None:
+        with self._lock:
+            sizes = self._load()
+            if path in sizes:
+                sizes.move_to_end(path)
+
+    def add(self, path: Path, size: int) -> None:
+        """Record a newly written file, then evict the least recently used others until within budget."""
+        with self._lock:
+            sizes = self._load()
+            self._bytes += size - sizes.pop(path, 0)
+            sizes[path] = size
+            if not self.max_bytes:
+                return
+            for candidate in list(sizes):
+                if self._bytes <= self.max_bytes:
+                    break
+                if candidate == path:
+                    continue
+                self._bytes -= sizes.pop(candidate)
+                _unlink_materialized(candidate)
+
+
+def _unlink_materialized(path: Path) -> None:
+    # Flattened previews are cached beside the PDF and are stale without it.
+    for target in [path, *path.parent.glob(f"{path.stem}_preview_*.pdf")]:
+        try:
+            target.unlink()
+        except OSError:
+            continue
+
+
+_MATERIALIZED_FILES = _MaterializedFiles(MATERIALIZED_CACHE_MAX_BYTES)
+
+
+def materialize_completed_pdf(session: dict, fill: FillFunc) -> Path | None:
+    """Return the filled PDF of a lazily stored session, rebuilding it from its answers when missing."""
+    path = materialized_pdf_path(session["session_id"])
+    if path.is_file():
+        _touch(path)
+        _MATERIALIZED_FILES.touch(path)
+        return path
+
+    with _session_lock(session["session_id"]):
+        if path.is_file():
+            return path
+
+        template_path = template_blob_path(session["template_sha256"]) if session.get("template_sha256") else None
+        agent = get_agent(session["agent_id"])
+        if not agent or not template_path or not template_path.is_file():
+            logger.warning("Cannot materialize session %s: template is gone.", session["session_id"])
+            return None
+
+        form_index = form_index_for_agent(agent) if agent.get("template_sha256") == session["template_sha256"] else None
+        filled_pdf_bytes = run_pdf_job(fill, str(template_path), session["answers"], form_index)
+        MATERIALIZED_DIR.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=str(MATERIALIZED_DIR), prefix=f".{path.stem}-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(filled_pdf_bytes)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    _MATERIALIZED_FILES.add(path, len(filled_pdf_bytes))
+    return path
+
+
+def _safe_pdf_path(path_value: str, *, must_exist: bool = True) -> Path | None:
+    path = Path(path_value).resolve()
+    data_root = DATA_DIR.resolve()
+    if must_exist and not path.is_file():
+        return None
+    if not str(path).startswith(str(data_root)):
+        return None
+    return path
+
+
+def completed_pdf_path(session: dict, fill: FillFunc) -> Path | None:
+    """Filled PDF of a completed session; lazily stored sessions are filled on first access.
+
+    A materialized PDF can be evicted before the caller opens it; readers go through
+    ``with_completed_pdf`` to have it rebuilt.
+    """
+    if session.get("pdf_storage") == "lazy":
+        # Built under MATERIALIZED_DIR from the session id, so it is only checked for being in the data root.
+        materialized = materialize_completed_pdf(session, fill)
+        return _safe_pdf_path(str(materialized), must_exist=False) if materialized else None
+    return _safe_pdf_path(session["filled_pdf_path"])
+
+
+def with_completed_pdf(session: dict, fill: FillFunc, use: Callable[[Path], T]) -> T | None:
+    """Call ``use`` with the session's filled PDF, or return None when there is none.
+
+    ``use`` should open the file. If a materialized PDF is evicted between materializing and
+    opening, ``use`` raises FileNotFoundError and the PDF is rebuilt for another try.
+    """
+    attempts = MATERIALIZED_READ_ATTEMPTS if session.get("pdf_storage") == "lazy" else 1
+    for attempt in range(1, attempts + 1):
+        pdf_path = completed_pdf_path(session, fill)
+        if not pdf_path:
+            return None
+        try:
+            return use(pdf_path)
+        except FileNotFoundError:
+            if attempt == attempts:
+                raise
+            logger.info("Materialized PDF for session %s was evicted before use; rebuilding.", session["session_id"])
+    return None
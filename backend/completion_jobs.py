@@ -0,0 +1,62 @@
+import os
+
+from jobs import enqueue_job
+from storage import get_job
+
+COMPLETION_JOB_KIND = "interview.finalize"
+COMPLETION_MAX_ATTEMPTS = max(1, int(os.getenv("COMPLETION_MAX_ATTEMPTS", "5") or 1))
+
+
+def completion_job_id(session_id: str) -> str:
+    return f"finalize-{session_id}"
+
+
+def completion_status_url(agent_id: str, session_id: str) -> str:
+    return f"/api/agent/{agent_id}/interview/{session_id}/completion"
+
+
+def get_completion_job(session_id: str) -> dict | None:
+    return get_job(completion_job_id(session_id))
+
+
+def public_status(job: dict) -> dict:
+    """Interview-facing view of a finalization job: ``retrying`` while backing off, ``failed`` once dead."""
+    status = job["status"]
+    if status == "queued" and job["attempts"]:
+        status = "retrying"
+    elif status == "dead":
+        status = "failed"
+    payload = {
+        "session_id": job["payload"]["session_id"],
+        "status": status,
+        "attempts": job["attempts"],
+        "status_url": completion_status_url(job["payload"]["agent_id"], job["payload"]["session_id"]),
+    }
+    if job["status"] == "succeeded":
+        payload.update(job["result"] or {})
+    elif job["last_error"]:
+        payload["error"] = job["last_error"]
+    return payload
+
+
+def enqueue_completion(
+    *,
+    session_id: str,
+    agent_id: str,
+    answers: dict[str, str],
+    language_code: str,
+    language_label: str,
+) -> dict:
+    """Queue finalization for a completed interview; one job per session however often it is called."""
+    enqueue_job(
+        COMPLETION_JOB_KIND,
+        {
+            "session_id": session_id,
+            "agent_id": agent_id,
+            "answers": answers,
+            "language_code": language_code,
+            "language_label": language_label,
+        },
+        job_id=completion_job_id(session_id),
+    )
+    return public_status(get_completion_job(session_id))
@@ -0,0 +1,18 @@
+from datetime import datetime, time, timedelta, timezone
+
+
+def parse_date_bound(value: str, *, end: bool) -> str:
+    """ISO date or datetime -> UTC timestamp string. A bare ``to`` date includes that whole day.
+
+    Raises ValueError for anything ``datetime.fromisoformat`` rejects.
+    """
+    text = value.strip()
+    if len(text) == 10:
+        moment = datetime.combine(datetime.fromisoformat(text).date(), time(), tzinfo=timezone.utc)
+        if end:
+            moment += timedelta(days=1)
+    else:
+        moment = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat()
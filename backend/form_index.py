@@ -0,0 +1,244 @@
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote
+
+import fitz
+
+from option_matching import OptionMatcher, is_checkbox_yes, map_value_to_allowed_option, normalize_for_match
+from pdf_engine import run_pdf_job
+from storage import update_agent_schema
+from template_cache import open_template, template_fingerprint
+
+logger = logging.getLogger(__name__)
+
+FORM_INDEX_VERSION = 2
+# Widget types whose fill depends on the widget's own on-state rather than the field's options.
+BUTTON_FIELD_TYPES = {"CheckBox", "RadioButton"}
+# Templates whose option matchers stay warm in each process that fills PDFs.
+TEMPLATE_MATCHERS_MAX = int(os.getenv("TEMPLATE_MATCHERS_MAX", "64") or 0)
+
+_TEMPLATE_MATCHERS: OrderedDict[str, "FormMatchers"] = OrderedDict()
+_TEMPLATE_MATCHERS_LOCK = threading.Lock()
+
+
+def decode_pdf_token(value: str) -> str:
+    if not value:
+        return ""
+    text = unquote(str(value))
+    # Some PDFs encode spaces as '#20' in widget values.
+    text = re.sub(r"#([0-9A-Fa-f]{2})", lambda m: bytes.fromhex(m.group(1)).decode("latin1"), text)
+    return " ".join(text.split()).strip()
+
+
+def widget_on_state(widget) -> str:
+    """The raw appearance state that turns a checkbox or radio button on."""
+    on_state = getattr(widget, "on_state", "")
+    if callable(on_state):
+        on_state = on_state()
+    return str(on_state or "").strip()
+
+
+def extract_widget_options(widget) -> list[str]:
+    """Decoded choice values and on-states of one widget, without ``Off`` and duplicates."""
+    options: list[str] = []
+    seen = set()
+
+    raw_choices = getattr(widget, "choice_values", None)
+    if callable(raw_choices):
+        raw_choices = raw_choices()
+    button_states = getattr(widget, "button_states", None)
+    if callable(button_states):
+        button_states = button_states()
+    if not isinstance(button_states, dict):
+        button_states = {}
+    state_values = [value for values in button_states.values() for value in values or []]
+
+    for raw in [*(raw_choices or []), *state_values, widget_on_state(widget)]:
+        item = decode_pdf_token(str(raw))
+        if item and item.lower() != "off" and item not in seen:
+            seen.add(item)
+            options.append(item)
+    return options
+
+
+def build_form_index(document: fitz.Document) -> dict:
+    """Compile field name -> widget locations and fill metadata in one pass over the template.
+
+    Checkbox and radio widgets also keep their own on-state and options under ``widget_states``
+    (keyed by xref), so fills never query widget appearance states again. The result is
+    JSON-serializable so it can be persisted with the agent schema.
+    """
+    fields: dict[str, dict] = {}
+    for page_index, page in enumerate(document):
+        for widget in page.widgets() or []:
+            name = str(widget.field_name or "").strip()
+            if not name:
+                continue
+            entry = fields.get(name)
+            if entry is None:
+                entry = {
+                    "type": str(widget.field_type_string or "Text"),
+                    "options": [],
+                    "normalized_options": [],
+                    "widgets": [],
+                    "widget_states": {},
+                }
+                fields[name] = entry
+            entry["widgets"].append([page_index, int(widget.xref)])
+            options = extract_widget_options(widget)
+            if str(widget.field_type_string or "") in BUTTON_FIELD_TYPES:
+                entry["widget_states"][str(widget.xref)] = {"on_state": widget_on_state(widget), "options": options}
+            for option in options:
+                if option not in entry["options"]:
+                    entry["options"].append(option)
+                    entry["normalized_options"].append(normalize_for_match(option))
+    return {"version": FORM_INDEX_VERSION, "page_count": len(document), "fields": fields}
+
+
+def indexed_widget_state(entry: dict, widget) -> dict:
+    """The on-state and options recorded for a checkbox or radio widget at index time."""
+    return entry.get("widget_states", {}).get(str(widget.xref)) or {"on_state": "", "options": []}
+
+
+class FormMatchers:
+    """Option matchers for one template, built from its index entries the first time a field is filled.
+
+    Field matchers reuse the entry's ``normalized_options``; checkbox and radio widgets get a
+    matcher over their own recorded options.
+    """
+
+    def __init__(self) -> None:
+        self._fields: dict[str, OptionMatcher] = {}
+        self._widgets: dict[int, OptionMatcher] = {}
+
+    def for_field(self, field_name: str, entry: dict) -> OptionMatcher:
+        matcher = self._fields.get(field_name)
+        if matcher is None:
+            matcher = OptionMatcher(tuple(entry["options"]), tuple(entry["normalized_options"]))
+            self._fields[field_name] = matcher
+        return matcher
+
+    def for_widget(self, entry: dict, widget) -> OptionMatcher:
+        matcher = self._widgets.get(widget.xref)
+        if matcher is None:
+            normalized = dict(zip(entry["options"], entry["normalized_options"]))
+            options = tuple(indexed_widget_state(entry, widget)["options"])
+            matcher = OptionMatcher(options, tuple(normalized[option] for option in options))
+            self._widgets[widget.xref] = matcher
+        return matcher
+
+
+def template_matchers(pdf_path: str) -> FormMatchers:
+    """Matchers for the template's current version, kept in a small per-process LRU."""
+    key = template_fingerprint(pdf_path)
+    with _TEMPLATE_MATCHERS_LOCK:
+        matchers = _TEMPLATE_MATCHERS.get(key)
+        if matchers is None:
+            matchers = FormMatchers()
+            _TEMPLATE_MATCHERS[key] = matchers
+            while len(_TEMPLATE_MATCHERS) > max(TEMPLATE_MATCHERS_MAX, 1):
+                _TEMPLATE_MATCHERS.popitem(last=False)
+        else:
+            _TEMPLATE_MATCHERS.move_to_end(key)
+        return matchers
+
+
+def assign_indexed_value(
+    field_name: str,
+    entry: dict,
+    widget,
+    value: str,
+    matchers: FormMatchers,
+    *,
+    map_choices: bool = True,
+    checkbox_matches_options: bool = True,
+    schema_options: dict[str, list[str]] | None = None,
+) -> None:
+    """Write one answer into a widget using the on-states and options recorded in its index entry.
+
+    ``map_choices=False`` writes combo box answers verbatim, and ``checkbox_matches_options=False``
+    ticks a checkbox only on a yes. ``schema_options`` (field name -> options from the agent
+    schema) take precedence over the template's own radio and combo options, as the live preview does.
+    """
+    field_type = entry["type"]
+    text_value = str(value or "").strip()
+    field_options = schema_options.get(field_name, []) if schema_options is not None else None
+
+    if field_type == "CheckBox":
+        on_state = indexed_widget_state(entry, widget)["on_state"] or "Yes"
+        checked = is_checkbox_yes(text_value)
+        if not checked and checkbox_matches_options:
+            normalized_on_state = normalize_for_match(on_state)
+            mapped_option = matchers.for_widget(entry, widget).match(text_value)
+            checked = bool(normalized_on_state and normalize_for_match(text_value) == normalized_on_state) or (
+                normalize_for_match(mapped_option) not in {"", "off"}
+            )
+        widget.field_value = on_state if checked else "Off"
+    elif field_type == "RadioButton":
+        if field_options:
+            mapped = map_value_to_allowed_option(text_value, field_options)
+        else:
+            mapped = matchers.for_widget(entry, widget).match(text_value)
+        widget.field_value = mapped or text_value
+    elif field_type == "ComboBox" and field_options is not None:
+        widget.field_value = map_value_to_allowed_option(text_value, field_options) or text_value
+    elif field_type == "ComboBox" and map_choices:
+        widget.field_value = matchers.for_field(field_name, entry).match(text_value) or text_value
+    else:
+        widget.field_value = text_value
+
+    widget.update()
+
+
+def is_valid_form_index(form_index) -> bool:
+    return (
+        isinstance(form_index, dict)
+        and form_index.get("version") == FORM_INDEX_VERSION
+        and isinstance(form_index.get("fields"), dict)
+    )
+
+
+def build_form_index_for_path(pdf_path: str) -> dict:
+    with open_template(pdf_path) as document:
+        return build_form_index(document)
+
+
+def form_index_for_agent(agent: dict) -> dict | None:
+    """Return the agent's compiled index, building and persisting it for agents uploaded before indexing."""
+    schema = agent.get("schema") if isinstance(agent.get("schema"), dict) else {}
+    form_index = schema.get("form_index")
+    if is_valid_form_index(form_index):
+        return form_index
+
+    try:
+        form_index = run_pdf_job(build_form_index_for_path, str(agent.get("pdf_path", "") or ""))
+    except Exception as exc:
+        logger.warning("Could not build form index for agent %s: %s", agent.get("agent_id"), exc)
+        return None
+
+    schema["form_index"] = form_index
+    update_agent_schema(agent["agent_id"], schema)
+    return form_index
+
+
+def iter_answer_widgets(document: fitz.Document, form_index: dict, answers: dict):
+    """Yield (field_name, entry, widget) for answered fields only, page by page.
+
+    Pages without answered widgets are never loaded and widgets are fetched directly by xref.
+    """
+    by_page: dict[int, list[tuple[str, dict, int]]] = {}
+    fields = form_index.get("fields", {})
+    for name in answers:
+        entry = fields.get(name)
+        if not entry:
+            continue
+        for page_index, xref in entry["widgets"]:
+            by_page.setdefault(page_index, []).append((name, entry, xref))
+
+    for page_index in sorted(by_page):
+        page = document[page_index]
+        for name, entry, xref in by_page[page_index]:
+            yield name, entry, page.load_widget(xref)
@@ -0,0 +1,191 @@
+"""Durable background jobs persisted in SQLite.
+
+Jobs are leased by worker threads: a worker that dies mid-job simply lets its lease
+expire and the job is picked up again. Failures are retried with exponential backoff;
+handlers raise ``JobFailed`` for errors a retry cannot fix. Jobs that run out of
+attempts are kept with status ``dead`` until requeued.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable
+
+from storage import finish_job, get_job, insert_job, lease_job, purge_succeeded_jobs, requeue_dead_job
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2") or 0)
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1") or 1)
+# Must outlast the slowest handler, otherwise a second worker starts the same job.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300") or 300)
+JOB_MAX_ATTEMPTS = max(1, int(os.getenv("JOB_MAX_ATTEMPTS", "5") or 1))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2") or 0)
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "300") or 0)
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 60 * 60)) or 0)
+PURGE_INTERVAL_SECONDS = 60 * 60
+
+
+class JobFailed(Exception):
+    """Raised by a handler for a failure that retrying cannot fix; the job goes straight to ``dead``."""
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    func: Callable[[dict], dict | None]
+    max_attempts: int
+    on_dead: Callable[[dict], None] | None = None
+
+
+_HANDLERS: dict[str, JobHandler] = {}
+_WAKE = threading.Event()
+_WORKERS: list[threading.Thread] = []
+_WORKERS_LOCK = threading.Lock()
+_last_purge = 0.0
+
+
+def register_job_handler(
+    kind: str,
+    func: Callable[[dict], dict | None],
+    *,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+    on_dead: Callable[[dict], None] | None = None,
+) -> None:
+    """Route jobs of ``kind`` to ``func(payload)``; its return value is stored as the job result.
+
+    ``on_dead`` receives the job once it is dead-lettered, to undo side effects such as references.
+    """
+    _HANDLERS[kind] = JobHandler(func=func, max_attempts=max(1, max_attempts), on_dead=on_dead)
+
+
+def enqueue_job(kind: str, payload: dict, *, job_id: str = "", delay_seconds: float = 0.0) -> str:
+    """Persist a job and wake a worker. Re-enqueueing an existing ``job_id`` is a no-op."""
+    job_id = job_id or uuid.uuid4().hex
+    handler = _HANDLERS.get(kind)
+    insert_job(
+        job_id=job_id,
+        kind=kind,
+        payload=payload,
+        max_attempts=handler.max_attempts if handler else JOB_MAX_ATTEMPTS,
+        run_after=time.time() + max(0.0, delay_seconds),
+    )
+    _WAKE.set()
+    return job_id
+
+
+def public_job(job: dict) -> dict:
+    """Job status without its payload, which may carry answers or file paths."""
+    payload = {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == "queued" and job["attempts"]:
+        payload["retry_in_seconds"] = max(0, round(job["run_after"] - time.time(), 1))
+    if job["last_error"]:
+        payload["error"] = job["last_error"]
+    if job["result"] is not None:
+        payload["result"] = job["result"]
+    return payload
+
+
+def get_job_status(job_id: str) -> dict | None:
+    job = get_job(job_id)
+    return public_job(job) if job else None
+
+
+def requeue_job(job_id: str) -> bool:
+    if not requeue_dead_job(job_id):
+        return False
+    _WAKE.set()
+    return True
+
+
+def retry_delay(attempts: int) -> float:
+    return min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+
+
+def _bury(job: dict, owner: str, error: str, handler: JobHandler | None) -> None:
+    logger.error("Job %s (%s) dead after %s attempts: %s", job["job_id"], job["kind"], job["attempts"], error)
+    if not finish_job(job["job_id"], owner, status="dead", last_error=error):
+        return
+    if handler and handler.on_dead:
+        try:
+            handler.on_dead(job)
+        except Exception as exc:
+            logger.exception("Dead-letter hook for job %s failed: %s", job["job_id"], exc)
+
+
+def run_next_job(owner: str) -> bool:
+    """Lease and run one due job; returns False when nothing was due."""
+    job = lease_job(owner=owner, lease_seconds=JOB_LEASE_SECONDS)
+    if not job:
+        return False
+
+    handler = _HANDLERS.get(job["kind"])
+    if handler is None:
+        _bury(job, owner, f"No handler registered for job kind '{job['kind']}'.", None)
+        return True
+    if job["attempts"] > job["max_attempts"]:
+        # The previous attempt was the last one and its worker never reported back.
+        _bury(job, owner, job["last_error"] or "Lease expired on the final attempt.", handler)
+        return True
+
+    try:
+        result = handler.func(job["payload"])
+    except JobFailed as exc:
+        _bury(job, owner, str(exc) or type(exc).__name__, handler)
+    except Exception as exc:
+        error = str(exc) or type(exc).__name__
+        if job["attempts"] >= job["max_attempts"]:
+            _bury(job, owner, error, handler)
+        else:
+            delay = retry_delay(job["attempts"])
+            logger.warning(
+                "Job %s (%s) attempt %s failed, retrying in %.0fs: %s", job["job_id"], job["kind"], job["attempts"], delay, exc
+            )
+            finish_job(job["job_id"], owner, status="queued", last_error=error, run_after=time.time() + delay)
+    else:
+        finish_job(job["job_id"], owner, status="succeeded", result=result or {})
+    return True
+
+
+def _purge_if_due() -> None:
+    global _last_purge
+    now = time.time()
+    if not JOB_RETENTION_SECONDS or now - _last_purge < PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = now
+    purged = purge_succeeded_jobs(now - JOB_RETENTION_SECONDS)
+    if purged:
+        logger.info("Purged %s finished jobs.", purged)
+
+
+def _worker_loop(owner: str) -> None:
+    while True:
+        try:
+            if run_next_job(owner):
+                continue
+            _purge_if_due()
+        except Exception as exc:
+            logger.exception("Job worker %s error: %s", owner, exc)
+        _WAKE.wait(JOB_POLL_SECONDS)
+        _WAKE.clear()
+
+
+def start_job_workers(count: int = JOB_WORKERS) -> int:
+    """Start the worker threads once per process; returns how many are running."""
+    with _WORKERS_LOCK:
+        process_tag = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        while len(_WORKERS) < count:
+            owner = f"{process_tag}-{len(_WORKERS)}"
+            thread = threading.Thread(target=_worker_loop, args=(owner,), name=f"job-worker-{len(_WORKERS)}", daemon=True)
+            thread.start()
+            _WORKERS.append(thread)
+        return len(_WORKERS)
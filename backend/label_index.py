@@ -0,0 +1,97 @@
+import logging
+import re
+
+import fitz
+
+from pdf_engine import run_pdf_job
+from storage import update_agent_schema
+from template_cache import open_template
+
+logger = logging.getLogger(__name__)
+
+LABEL_INDEX_VERSION = 1
+# Labels are looked for in this band to the left of a widget, the same band the legacy per-field scan
+# clipped to. Only words wholly inside it count, so a label the band cuts through loses its partial
+# leading word ('full legal name:') where the clipped scan kept the stray glyphs ('nt full legal name:').
+LABEL_SEARCH_LEFT = 200
+LABEL_SEARCH_VERTICAL = 20
+
+
+def label_from_field_name(field_name: str) -> str | None:
+    """Readable label from XFA-style names such as ``form1[0].page1[0].first_name[0]``."""
+    match = re.search(r"\.([a-zA-Z0-9_]+)\[\d+\]$", field_name)
+    if match:
+        return match.group(1).replace("_", " ").title()
+    return None
+
+
+def _label_left_of(words: list[tuple], rect: fitz.Rect) -> str:
+    clip = fitz.Rect(rect.x0 - LABEL_SEARCH_LEFT, rect.y0 - LABEL_SEARCH_VERTICAL, rect.x0, rect.y0 + LABEL_SEARCH_VERTICAL)
+    lines: dict[tuple[int, int], list[tuple]] = {}
+    for word in words:
+        if fitz.Rect(word[:4]) in clip:
+            lines.setdefault((word[5], word[6]), []).append(word)
+    if not lines:
+        return ""
+    # The line closest to the widget comes last in reading order.
+    last_line = lines[max(lines)]
+    return " ".join(word[4] for word in sorted(last_line, key=lambda word: word[7])).strip()
+
+
+def build_label_index(document: fitz.Document) -> dict:
+    """Map every field name to its nearby printed label in one pass, extracting each page's words once."""
+    labels: dict[str, str] = {}
+    unresolved: set[str] = set()
+    for page in document:
+        words = None
+        for widget in page.widgets() or []:
+            name = str(widget.field_name or "")
+            if not name or name in labels:
+                continue
+            if words is None:
+                words = page.get_text("words")
+            label = _label_left_of(words, widget.rect)
+            if label:
+                labels[name] = label
+                continue
+            # Without printed text the field name itself is the best label; later widgets only
+            # get a chance when the name cannot be turned into one either.
+            from_name = label_from_field_name(name)
+            if from_name:
+                labels[name] = from_name
+            else:
+                unresolved.add(name)
+    for name in unresolved - labels.keys():
+        labels[name] = name
+    return {"version": LABEL_INDEX_VERSION, "labels": labels}
+
+
+def build_label_index_for_path(pdf_path: str) -> dict:
+    with open_template(pdf_path) as document:
+        return build_label_index(document)
+
+
+def is_valid_label_index(label_index) -> bool:
+    return (
+        isinstance(label_index, dict)
+        and label_index.get("version") == LABEL_INDEX_VERSION
+        and isinstance(label_index.get("labels"), dict)
+    )
+
+
+def label_index_for_agent(agent: dict) -> dict | None:
+    """Return the agent's label index, building and persisting it for agents uploaded before it existed."""
+    schema = agent.get("schema") if isinstance(agent.get("schema"), dict) else {}
+    label_index = schema.get("label_index")
+    if is_valid_label_index(label_index):
+        return label_index
+
+    try:
+        label_index = run_pdf_job(build_label_index_for_path, str(agent.get("pdf_path", "") or ""))
+    except Exception as exc:
+        logger.warning("Could not build label index for agent %s: %s", agent.get("agent_id"), exc)
+        return None
+
+    schema["label_index"] = label_index
+    update_agent_schema(agent["agent_id"], schema)
+    return label_index
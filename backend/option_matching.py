@@ -0,0 +1,201 @@
+import re
+from functools import lru_cache
+
+_NON_WORD = re.compile(r"[^\w]+", flags=re.UNICODE)
+
+# Spoken and typed affirmatives/negatives across the interview languages.
+YES_TOKENS = frozenset(
+    {
+        "yes",
+        "y",
+        "true",
+        "checked",
+        "check",
+        "on",
+        "1",
+        "selected",
+        "x",
+        "mark yes",
+        "affirmative",
+        "consent",
+        "si",
+        "sí",
+        "oui",
+        "ja",
+        "sim",
+        "hai",
+        "はい",
+        "예",
+        "да",
+        "shi",
+        "是",
+        "haan",
+        "हाँ",
+    }
+)
+NO_TOKENS = frozenset(
+    {
+        "no",
+        "n",
+        "false",
+        "unchecked",
+        "uncheck",
+        "off",
+        "0",
+        "mark no",
+        "decline",
+        "do not consent",
+        "non",
+        "nein",
+        "nao",
+        "não",
+        "iie",
+        "いいえ",
+        "아니요",
+        "нет",
+        "bu",
+        "不是",
+        "nahin",
+        "नहीं",
+    }
+)
+MATCH_CACHE_SIZE = 512
+
+
+def normalize_for_match(text: str) -> str:
+    return _NON_WORD.sub(" ", str(text or "").lower()).strip()
+
+
+def is_checkbox_yes(value: str) -> bool:
+    return normalize_for_match(value) in YES_TOKENS
+
+
+def coerce_checkbox_value(value: str) -> str:
+    """Return "Yes", "No" or "" when the answer is not a recognisable yes/no."""
+    normalized = normalize_for_match(value)
+    if normalized in YES_TOKENS:
+        return "Yes"
+    if normalized in NO_TOKENS:
+        return "No"
+    if " not " in f" {normalized} " and "consent" in normalized:
+        return "No"
+    if "consent" in normalized:
+        return "Yes"
+    return ""
+
+
+class OptionMatcher:
+    """Maps free-form answers onto one field's allowed options.
+
+    Options are normalized once (or taken pre-normalized from the form index); exact and
+    normalized hits are dict lookups. The substring fallback goes through an n-gram index
+    built on first use, so long option lists are not scanned per answer. Recent answers are
+    memoized since live previews resend the same values on every keystroke.
+    """
+
+    __slots__ = ("options", "_exact", "_normalized", "_first_index", "_grams", "_lengths", "_results")
+
+    def __init__(self, options: tuple[str, ...], normalized_options: tuple[str, ...] | None = None) -> None:
+        self.options = options
+        if normalized_options is None or len(normalized_options) != len(options):
+            normalized_options = tuple(normalize_for_match(option) for option in options)
+        self._exact = frozenset(options)
+        self._normalized = normalized_options
+        first_index: dict[str, int] = {}
+        for index, normalized in enumerate(normalized_options):
+            first_index.setdefault(normalized, index)
+        self._first_index = first_index
+        self._grams: dict[str, list[int]] | None = None
+        self._lengths: tuple[int, ...] = ()
+        self._results: dict[str, str] = {}
+
+    def _build_index(self) -> dict[str, list[int]]:
+        # Every 1-3 character substring -> indices of the options containing it, ascending.
+        grams: dict[str, list[int]] = {}
+        for index, normalized in enumerate(self._normalized):
+            seen = set()
+            for size in (1, 2, 3):
+                for start in range(len(normalized) - size + 1):
+                    gram = normalized[start : start + size]
+                    if gram not in seen:
+                        seen.add(gram)
+                        grams.setdefault(gram, []).append(index)
+        self._lengths = tuple(sorted({len(normalized) for normalized in self._normalized if normalized}))
+        self._grams = grams
+        return grams
+
+    def _first_containing(self, normalized_raw: str, grams: dict[str, list[int]]) -> int | None:
+        """Lowest index of an option that contains ``normalized_raw``."""
+        if len(normalized_raw) <= 3:
+            postings = grams.get(normalized_raw)
+            return postings[0] if postings else None
+        postings = [grams.get(normalized_raw[start : start + 3]) for start in range(len(normalized_raw) - 2)]
+        if not all(postings):
+            return None
+        postings.sort(key=len)
+        for index in postings[0]:
+            if normalized_raw in self._normalized[index]:
+                return index
+        return None
+
+    def _first_contained(self, normalized_raw: str) -> int | None:
+        """Lowest index of a non-empty option that occurs inside ``normalized_raw``."""
+        found = None
+        for size in self._lengths:
+            if size > len(normalized_raw):
+                break
+            for start in range(len(normalized_raw) - size + 1):
+                index = self._first_index.get(normalized_raw[start : start + size])
+                if index is not None and (found is None or index < found):
+                    found = index
+        return found
+
+    def _substring_match(self, normalized_raw: str) -> str:
+        grams = self._grams if self._grams is not None else self._build_index()
+        found = [
+            index
+            for index in (self._first_containing(normalized_raw, grams), self._first_contained(normalized_raw))
+            if index is not None
+        ]
+        return self.options[min(found)] if found else ""
+
+    def match(self, value: str) -> str:
+        raw = str(value or "").strip()
+        if not raw:
+            return ""
+        if raw in self._exact:
+            return raw
+        cached = self._results.get(raw)
+        if cached is not None:
+            return cached
+
+        normalized_raw = normalize_for_match(raw)
+        index = self._first_index.get(normalized_raw)
+        if index is not None:
+            result = self.options[index]
+        elif normalized_raw:
+            result = self._substring_match(normalized_raw)
+        else:
+            result = ""
+
+        if len(self._results) >= MATCH_CACHE_SIZE:
+            self._results.clear()
+        self._results[raw] = result
+        return result
+
+
+@lru_cache(maxsize=4096)
+def _compiled_matcher(options: tuple[str, ...]) -> OptionMatcher:
+    return OptionMatcher(options)
+
+
+def option_matcher(options) -> OptionMatcher:
+    """Shared compiled matcher for an option list; identical lists across requests reuse one instance."""
+    return _compiled_matcher(options if isinstance(options, tuple) else tuple(options or ()))
+
+
+def map_value_to_allowed_option(value: str, options) -> str:
+    """Best allowed option for ``value``, or "" when nothing matches."""
+    if not options:
+        return ""
+    return option_matcher(options).match(value)
@@ -0,0 +1,209 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# PyMuPDF work is CPU-bound and holds the GIL; run it in separate processes so request
+# threads (interview turns in particular) stay responsive. 0 workers runs jobs inline.
+PDF_ENGINE_WORKERS = int(os.getenv("PDF_ENGINE_WORKERS", str(min(4, os.cpu_count() or 1))) or 0)
+# Jobs allowed to wait for a worker before new ones are rejected as busy.
+PDF_ENGINE_MAX_QUEUED = int(os.getenv("PDF_ENGINE_MAX_QUEUED", str(max(1, PDF_ENGINE_WORKERS) * 4)) or 0)
+PDF_ENGINE_JOB_TIMEOUT_SECONDS = float(os.getenv("PDF_ENGINE_JOB_TIMEOUT_SECONDS", "60") or 60)
+# Workers are replaced after this many jobs or once their peak RSS passes the threshold,
+# which bounds leaks and fragmentation from large documents.
+PDF_ENGINE_MAX_JOBS_PER_WORKER = int(os.getenv("PDF_ENGINE_MAX_JOBS_PER_WORKER", "200") or 0)
+PDF_ENGINE_MAX_WORKER_RSS_MB = int(os.getenv("PDF_ENGINE_MAX_WORKER_RSS_MB", "768") or 0)
+
+
+class PdfEngineError(RuntimeError):
+    pass
+
+
+class PdfEngineBusy(PdfEngineError):
+    pass
+
+
+class PdfEngineTimeout(PdfEngineError):
+    pass
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _worker_main(conn) -> None:
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        func, args, kwargs = job
+        try:
+            reply = ("ok", func(*args, **kwargs))
+        except Exception as exc:
+            reply = ("error", exc)
+        try:
+            conn.send((*reply, _peak_rss_mb()))
+        except Exception as exc:
+            # The result or the exception could not be pickled; report something that can.
+            conn.send(("error", PdfEngineError(f"{type(exc).__name__}: {exc}"), _peak_rss_mb()))
+
+
+class _Worker:
+    def __init__(self, context) -> None:
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), name="pdf-engine-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.peak_rss_mb = 0.0
+        self.broken = False
+
+    def stop(self, *, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+class PdfEngine:
+    """A small process pool with admission control, per-job timeouts and worker recycling.
+
+    Jobs must be picklable top-level callables; workers start lazily and are replaced after a
+    timeout, a crash, ``max_jobs`` jobs or when their peak RSS exceeds ``max_rss_mb``.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int,
+        max_queued: int,
+        timeout_seconds: float,
+        max_jobs_per_worker: int,
+        max_worker_rss_mb: int,
+    ) -> None:
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_worker_rss_mb = max_worker_rss_mb
+        self._context = multiprocessing.get_context("spawn")
+        self._admission = threading.BoundedSemaphore(workers + max_queued)
+        # Each slot holds a live worker or None until one is needed.
+        self._slots: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(workers):
+            self._slots.put(None)
+
+    def run(self, func, *args, **kwargs):
+        if not self._admission.acquire(blocking=False):
+            raise PdfEngineBusy("PDF engine queue is full.")
+        try:
+            payload = pickle.dumps((func, args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+            try:
+                worker = self._slots.get(timeout=self.timeout_seconds)
+            except queue.Empty as exc:
+                raise PdfEngineTimeout("Timed out waiting for a PDF worker.") from exc
+            try:
+                if worker is None or not worker.process.is_alive():
+                    worker = _Worker(self._context)
+                status, value = self._call(worker, payload)
+            finally:
+                self._slots.put(self._recycle(worker))
+        finally:
+            self._admission.release()
+
+        if status == "error":
+            raise value
+        return value
+
+    def _call(self, worker: _Worker, payload: bytes) -> tuple[str, object]:
+        try:
+            worker.conn.send_bytes(payload)
+            if not worker.conn.poll(self.timeout_seconds):
+                worker.broken = True
+                raise PdfEngineTimeout(f"PDF job exceeded {self.timeout_seconds:.0f}s.")
+            status, value, peak_rss_mb = worker.conn.recv()
+        except (EOFError, OSError) as exc:
+            worker.broken = True
+            raise PdfEngineError("PDF worker exited unexpectedly.") from exc
+        worker.jobs += 1
+        worker.peak_rss_mb = peak_rss_mb
+        return status, value
+
+    def _recycle(self, worker: _Worker | None) -> _Worker | None:
+        if worker is None:
+            return None
+        if worker.broken:
+            logger.warning("Replacing PDF worker pid=%s after a failed job", worker.process.pid)
+            worker.stop(kill=True)
+            return None
+        if self.max_jobs_per_worker and worker.jobs >= self.max_jobs_per_worker:
+            worker.stop()
+            return None
+        if self.max_worker_rss_mb and worker.peak_rss_mb >= self.max_worker_rss_mb:
+            logger.info("Recycling PDF worker pid=%s at %.0f MB peak RSS", worker.process.pid, worker.peak_rss_mb)
+            worker.stop()
+            return None
+        return worker
+
+    def shutdown(self) -> None:
+        while True:
+            try:
+                worker = self._slots.get_nowait()
+            except queue.Empty:
+                return
+            if worker is not None:
+                worker.stop()
+
+
+_ENGINE: PdfEngine | None = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_engine() -> PdfEngine:
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = PdfEngine(
+                workers=PDF_ENGINE_WORKERS,
+                max_queued=PDF_ENGINE_MAX_QUEUED,
+                timeout_seconds=PDF_ENGINE_JOB_TIMEOUT_SECONDS,
+                max_jobs_per_worker=PDF_ENGINE_MAX_JOBS_PER_WORKER,
+                max_worker_rss_mb=PDF_ENGINE_MAX_WORKER_RSS_MB,
+            )
+            atexit.register(_ENGINE.shutdown)
+        return _ENGINE
+
+
+def run_pdf_job(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` on the PDF engine and return its result.
+
+    Runs inline when the engine is disabled or when already inside an engine worker.
+    """
+    if PDF_ENGINE_WORKERS <= 0 or multiprocessing.parent_process() is not None:
+        return func(*args, **kwargs)
+    return get_engine().run(func, *args, **kwargs)
@@ -0,0 +1,44 @@
+import logging
+import os
+
+import fitz
+
+logger = logging.getLogger(__name__)
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in {"1", "true", "yes", "on"}
+
+
+# 1 drops unreferenced objects, 3 also merges duplicates, 4 also compares stream contents (slow).
+PDF_OUTPUT_GARBAGE = min(max(int(os.getenv("PDF_OUTPUT_GARBAGE", "1") or 0), 0), 4)
+PDF_OUTPUT_DEFLATE = _env_flag("PDF_OUTPUT_DEFLATE", "true")
+# Linearized ("fast web view") files let viewers show page one before the download ends.
+# MuPDF 1.24+ no longer writes them; the output then falls back to a regular file.
+PDF_OUTPUT_LINEAR = _env_flag("PDF_OUTPUT_LINEAR", "false")
+
+_linear_unsupported = False
+
+
+def optimized_pdf_bytes(
+    doc: fitz.Document,
+    *,
+    garbage: int = PDF_OUTPUT_GARBAGE,
+    deflate: bool = PDF_OUTPUT_DEFLATE,
+    linear: bool = PDF_OUTPUT_LINEAR,
+) -> bytes:
+    """Serialize ``doc`` without unused objects and with compressed streams."""
+    global _linear_unsupported
+    options = {
+        "garbage": garbage,
+        "deflate": deflate,
+        "deflate_images": deflate,
+        "deflate_fonts": deflate,
+    }
+    if linear and not _linear_unsupported:
+        try:
+            return doc.tobytes(linear=True, **options)
+        except Exception as exc:
+            _linear_unsupported = True
+            logger.warning("Linearized PDF output unavailable, writing regular PDFs: %s", exc)
+    return doc.tobytes(**options)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+
+import fitz
+
+from byte_cache import BoundedByteCache
+from form_index import iter_answer_widgets, template_matchers
+from pdf_engine import run_pdf_job
+from pdf_output import optimized_pdf_bytes
+from template_cache import open_template, template_fingerprint
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SCALE = 1.35
+# raster: every page becomes a PNG. vector: widget appearances are baked into page content.
+FLATTEN_MODES = ("raster", "vector")
+DEFAULT_FLATTEN_MODE = (os.getenv("PREVIEW_FLATTEN_MODE", "raster").strip().lower() or "raster")
+if DEFAULT_FLATTEN_MODE not in FLATTEN_MODES:
+    # A typo here would otherwise fail every default preview and every warm job.
+    logger.warning("Ignoring PREVIEW_FLATTEN_MODE=%r; expected one of %s.", DEFAULT_FLATTEN_MODE, ", ".join(FLATTEN_MODES))
+    DEFAULT_FLATTEN_MODE = "raster"
+PAGE_RASTER_CACHE_MAX_BYTES = int(os.getenv("PAGE_RASTER_CACHE_MAX_BYTES", str(128 * 1024 * 1024)) or 0)
+
+# One-page image PDFs, keyed by template contents plus the answers on that page.
+PAGE_RASTER_CACHE = BoundedByteCache(PAGE_RASTER_CACHE_MAX_BYTES)
+
+
+def render_page_png(page: fitz.Page) -> bytes:
+    pix = page.get_pixmap(matrix=fitz.Matrix(PREVIEW_SCALE, PREVIEW_SCALE), alpha=False)
+    return pix.tobytes("png")
+
+
+def raster_page_pdf(page: fitz.Page) -> bytes:
+    """Render one page into a single-page, image-backed PDF so the preview stays read-only."""
+    flattened = fitz.open()
+    target_page = flattened.new_page(width=page.rect.width, height=page.rect.height)
+    target_page.insert_image(target_page.rect, stream=render_page_png(page))
+    # Compressing once here keeps cached pages small and lets assembly copy streams as-is.
+    output = flattened.tobytes(garbage=1, deflate=True)
+    flattened.close()
+    return output
+
+
+def assemble_page_pdfs(pages: list[bytes]) -> bytes:
+    output = fitz.open()
+    for page_pdf in pages:
+        with fitz.open(stream=page_pdf, filetype="pdf") as source:
+            output.insert_pdf(source)
+    # Page streams are already deflated; only drop objects the merge left behind.
+    data = optimized_pdf_bytes(output, garbage=1)
+    output.close()
+    return data
+
+
+def flatten_raster(doc: fitz.Document) -> bytes:
+    return assemble_page_pdfs([raster_page_pdf(page) for page in doc])
+
+
+def flatten_vector(doc: fitz.Document) -> bytes:
+    """Bake widget appearances into the page content, keeping text selectable and dropping the form."""
+    doc.bake(annots=False, widgets=True)
+    return optimized_pdf_bytes(doc, garbage=3)
+
+
+def flatten_pdf(doc: fitz.Document, mode: str = DEFAULT_FLATTEN_MODE) -> bytes:
+    if mode == "vector":
+        return flatten_vector(doc)
+    return flatten_raster(doc)
+
+
+def resolve_flatten_mode(value: str | None) -> str | None:
+    """Map a request's ``flatten`` parameter to a mode; None when the value is not recognised."""
+    mode = str(value or "").strip().lower() or DEFAULT_FLATTEN_MODE
+    return mode if mode in FLATTEN_MODES else None
+
+
+def blank_page_etag(pdf_path: str, page_index: int) -> str:
+    payload = f"{template_fingerprint(pdf_path)}|{page_index}|{PREVIEW_SCALE}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _render_blank_page_png(pdf_path: str, page_index: int) -> bytes | None:
+    with open_template(pdf_path) as doc:
+        if page_index < 0 or page_index >= len(doc):
+            return None
+        return render_page_png(doc[page_index])
+
+
+def blank_page_png(pdf_path: str, page_index: int) -> bytes | None:
+    """Unfilled page image used as the static background of overlay previews."""
+    key = f"png:{blank_page_etag(pdf_path, page_index)}"
+    cached = PAGE_RASTER_CACHE.get(key)
+    if cached is not None:
+        return cached
+    png = run_pdf_job(_render_blank_page_png, pdf_path, page_index)
+    if png is not None:
+        PAGE_RASTER_CACHE.put(key, png, len(png))
+    return png
+
+
+def _template_page_sizes(pdf_path: str) -> list[dict[str, float]]:
+    with open_template(pdf_path) as doc:
+        return [{"width": float(page.rect.width), "height": float(page.rect.height)} for page in doc]
+
+
+def page_sizes(pdf_path: str) -> list[dict[str, float]]:
+    return run_pdf_job(_template_page_sizes, pdf_path)
+
+
+def _answers_by_page(form_index: dict, answers: dict[str, str]) -> dict[int, dict[str, str]]:
+    by_page: dict[int, dict[str, str]] = {}
+    fields = form_index.get("fields", {})
+    for name, value in answers.items():
+        entry = fields.get(name)
+        if not entry:
+            continue
+        for page_index, _ in entry["widgets"]:
+            by_page.setdefault(page_index, {})[name] = value
+    return by_page
+
+
+def _page_cache_key(fingerprint: str, page_index: int, page_answers: dict[str, str]) -> str:
+    payload = json.dumps([fingerprint, page_index, sorted(page_answers.items())], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _fill_answers(pdf_path: str, doc: fitz.Document, form_index: dict, answers: dict[str, str], assign_value) -> None:
+    processed_radio_fields: set[str] = set()
+    matchers = template_matchers(pdf_path)
+    for field_name, entry, widget in iter_answer_widgets(doc, form_index, answers):
+        if entry["type"] == "RadioButton":
+            if field_name in processed_radio_fields:
+                continue
+            processed_radio_fields.add(field_name)
+        assign_value(field_name, entry, widget, answers[field_name], matchers)
+    try:
+        doc.need_appearances(True)
+    except Exception:
+        pass
+
+
+def render_vector_preview(*, pdf_path: str, form_index: dict, answers: dict[str, str], assign_value) -> bytes:
+    with open_template(pdf_path) as doc:
+        _fill_answers(pdf_path, doc, form_index, answers, assign_value)
+        return flatten_vector(doc)
+
+
+def _render_preview_pages(
+    pdf_path: str, form_index: dict, answers: dict[str, str], page_indices: list[int], assign_value
+) -> list[bytes]:
+    with open_template(pdf_path) as doc:
+        _fill_answers(pdf_path, doc, form_index, answers, assign_value)
+        return [raster_page_pdf(doc[index]) for index in page_indices]
+
+
+def render_cached_raster_preview(*, pdf_path: str, form_index: dict, answers: dict[str, str], assign_value) -> bytes:
+    """Raster preview that only re-renders pages whose answered widgets changed.
+
+    ``assign_value(field_name, entry, widget, value, matchers)`` writes one answer into a widget; it must be
+    picklable because missed pages are rendered on the PDF engine. The cache lives in this process.
+    """
+    fingerprint = template_fingerprint(pdf_path)
+    answers_by_page = _answers_by_page(form_index, answers)
+    page_count = int(form_index.get("page_count", 0))
+    keys = [_page_cache_key(fingerprint, index, answers_by_page.get(index, {})) for index in range(page_count)]
+    pages = [PAGE_RASTER_CACHE.get(key) for key in keys]
+    missing = [index for index, page_pdf in enumerate(pages) if page_pdf is None]
+
+    if missing:
+        # Fill only the fields that appear on pages we actually have to render.
+        needed_answers: dict[str, str] = {}
+        for index in missing:
+            needed_answers.update(answers_by_page.get(index, {}))
+        rendered = run_pdf_job(_render_preview_pages, pdf_path, form_index, needed_answers, missing, assign_value)
+        for index, page_pdf in zip(missing, rendered):
+            pages[index] = page_pdf
+            PAGE_RASTER_CACHE.put(keys[index], page_pdf, len(page_pdf))
+
+    return run_pdf_job(assemble_page_pdfs, pages)
@@ -0,0 +1,82 @@
+import json
+import math
+
+# Every estimate is within 1% of the true value of the rank it stands for.
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch (DDSketch style) for positive values such as durations.
+
+    A value ``v`` lands in bucket ``ceil(log(v, gamma))``, so sketches built with the same
+    accuracy merge by adding bucket counts. That is what lets hourly and daily rollups and
+    the per-agent total be maintained incrementally and combined over any range. Counts may
+    be removed again, which keeps re-saved sessions from being counted twice.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.zero_count = 0
+        self.bins: dict[int, int] = {}
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= 0:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        remaining = self.bins.get(index, 0) + count
+        if remaining > 0:
+            self.bins[index] = remaining
+        else:
+            self.bins.pop(index, None)
+
+    def remove(self, value: float) -> None:
+        self.add(value, -1)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+        self.zero_count += other.zero_count
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def quantile(self, q: float) -> float | None:
+        total = self.count
+        if total <= 0:
+            return None
+        rank = min(max(q, 0.0), 1.0) * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms.
+                return 2 * self.gamma**index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "relative_accuracy": self.relative_accuracy,
+                "zero_count": self.zero_count,
+                "bins": {str(index): count for index, count in sorted(self.bins.items())},
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, text: str | None) -> "QuantileSketch":
+        if not text:
+            return cls()
+        data = json.loads(text)
+        sketch = cls(float(data.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY)))
+        sketch.zero_count = int(data.get("zero_count", 0))
+        sketch.bins = {int(index): int(count) for index, count in data.get("bins", {}).items() if int(count) > 0}
+        return sketch
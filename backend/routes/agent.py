@@ -1,59 +1,35 @@
 import io
 import os
-import re
-from urllib.parse import unquote
+from functools import partial
 
-import fitz
 from flask import Blueprint, jsonify, request, send_file
 
-from storage import DATA_DIR, delete_agent, get_agent, list_agents, list_completed_sessions_by_agent
+from form_index import assign_indexed_value, build_form_index_for_path, extract_widget_options, form_index_for_agent
+from option_matching import is_checkbox_yes, map_value_to_allowed_option
+from pdf_engine import PdfEngineBusy, run_pdf_job
+from pdf_preview import (
+    blank_page_etag,
+    blank_page_png,
+    page_sizes,
+    render_cached_raster_preview,
+    render_vector_preview,
+    resolve_flatten_mode,
+)
+from template_cache import open_template
+from jobs import enqueue_job, register_job_handler
+from storage import DATA_DIR, delete_agent, delete_data_files, get_agent, list_agents, list_completed_sessions_by_agent
 
 agent_bp = Blueprint("agent", __name__)
 
+# Blank page images are addressed by template version, so clients may keep them indefinitely.
+PAGE_IMAGE_MAX_AGE_SECONDS = 365 * 24 * 60 * 60
+FILE_DELETE_JOB_KIND = "files.delete"
+# Compiled lookup tables kept in the schema for PDF work; clients never read them.
+SERVER_SCHEMA_KEYS = ("form_index", "label_index")
 
-def _decode_pdf_token(value: str) -> str:
-    if not value:
-        return ""
-    text = unquote(str(value))
-    text = re.sub(r"#([0-9A-Fa-f]{2})", lambda m: bytes.fromhex(m.group(1)).decode("latin1"), text)
-    return " ".join(text.split()).strip()
 
-
-def _extract_widget_options(widget) -> list[str]:
-    options: list[str] = []
-    seen = set()
-
-    raw_choices = getattr(widget, "choice_values", None)
-    if callable(raw_choices):
-        raw_choices = raw_choices()
-    raw_choices = raw_choices or []
-    for choice in raw_choices:
-        item = _decode_pdf_token(str(choice))
-        if item and item.lower() != "off" and item not in seen:
-            seen.add(item)
-            options.append(item)
-
-    button_states = getattr(widget, "button_states", None)
-    if callable(button_states):
-        button_states = button_states()
-    button_states = button_states or {}
-    if not isinstance(button_states, dict):
-        button_states = {}
-    for state_values in button_states.values():
-        for value in state_values or []:
-            item = _decode_pdf_token(str(value))
-            if item and item.lower() != "off" and item not in seen:
-                seen.add(item)
-                options.append(item)
-
-    on_state = getattr(widget, "on_state", "")
-    if callable(on_state):
-        on_state = on_state()
-    on_state = _decode_pdf_token(str(on_state or ""))
-    if on_state and on_state.lower() != "off" and on_state not in seen:
-        options.append(on_state)
-
-    return options
+def _public_schema(schema: dict) -> dict:
+    return {key: value for key, value in schema.items() if key not in SERVER_SCHEMA_KEYS}
 
 
 def _safe_pdf_path(path_value: str):
@@ -66,78 +42,8 @@ def _safe_pdf_path(path_value: str):
     return path
 
 
-def _is_checkbox_yes(value: str) -> bool:
-    normalized = re.sub(r"[^a-z0-9]+", " ", str(value or "").lower()).strip()
-    yes_tokens = {"yes", "y", "true", "checked", "check", "mark yes", "affirmative", "consent", "on"}
-    if normalized in yes_tokens:
-        return True
-    if " not " in f" {normalized} " and "consent" in normalized:
-        return False
-    return False
-
-
-def _widget_on_state(widget) -> str:
-    on_state = getattr(widget, "on_state", "")
-    if callable(on_state):
-        on_state = on_state()
-    return str(on_state or "").strip()
-
-
-def _map_value_to_allowed_option(value: str, options: list[str]) -> str:
-    raw = str(value or "").strip()
-    if not raw:
-        return ""
-    if raw in options:
-        return raw
-    normalized_raw = re.sub(r"[^a-z0-9]+", " ", raw.lower()).strip()
-    for option in options:
-        normalized_option = re.sub(r"[^a-z0-9]+", " ", option.lower()).strip()
-        if normalized_raw == normalized_option:
-            return option
-    for option in options:
-        normalized_option = re.sub(r"[^a-z0-9]+", " ", option.lower()).strip()
-        if normalized_raw and normalized_raw in normalized_option:
-            return option
-        if normalized_option and normalized_option in normalized_raw:
-            return option
-    return ""
-
-
-def _assign_widget_value(widget, value: str, options_by_field: dict[str, list[str]]) -> None:
-    field_type = str(getattr(widget, "field_type_string", "") or "")
-    field_name = str(getattr(widget, "field_name", "") or "").strip()
-    text_value = str(value or "").strip()
-    field_options = options_by_field.get(field_name, [])
-
-    if field_type == "CheckBox":
-        if _is_checkbox_yes(text_value):
-            widget.field_value = _widget_on_state(widget) or "Yes"
-        else:
-            widget.field_value = "Off"
-    elif field_type == "RadioButton":
-        options = field_options or _extract_widget_options(widget)
-        mapped = _map_value_to_allowed_option(text_value, options)
-        widget.field_value = mapped or text_value
-    elif field_type == "ComboBox":
-        mapped = _map_value_to_allowed_option(text_value, field_options)
-        widget.field_value = mapped or text_value
-    else:
-        widget.field_value = text_value
-
-    widget.update()
-
-
-def _flatten_preview_pdf(doc: fitz.Document) -> bytes:
-    # Render each page into an image-backed PDF so preview remains read-only.
-    flattened = fitz.open()
-    matrix = fitz.Matrix(1.35, 1.35)
-    for source_page in doc:
-        target_page = flattened.new_page(width=source_page.rect.width, height=source_page.rect.height)
-        pix = source_page.get_pixmap(matrix=matrix, alpha=False)
-        target_page.insert_image(target_page.rect, stream=pix.tobytes("png"))
-    output = flattened.write()
-    flattened.close()
-    return output
+def _engine_busy_response() -> tuple:
+    return jsonify({"error": "PDF engine is busy. Please retry shortly.", "code": "PDF_ENGINE_BUSY"}), 503
 
 
 def _field_map_from_schema(schema: dict) -> list[dict]:
@@ -166,7 +72,7 @@ def _field_map_from_schema(schema: dict) -> list[dict]:
 def _field_map_from_pdf(pdf_path: str) -> list[dict]:
     output: list[dict] = []
     seen = set()
-    with fitz.open(pdf_path) as document:
+    with open_template(pdf_path) as document:
         for page_index, page in enumerate(document):
             page_size = {"width": float(page.rect.width), "height": float(page.rect.height)}
             for widget in page.widgets() or []:
@@ -188,7 +94,7 @@ def _field_map_from_pdf(pdf_path: str) -> list[dict]:
                         "key": key,
                         "label": str(getattr(widget, "field_label", "") or "").strip() or key,
                         "type": str(getattr(widget, "field_type_string", "Text") or "Text"),
-                        "options": _extract_widget_options(widget),
+                        "options": extract_widget_options(widget),
                         "page": page_index + 1,
                         "rect": rect_payload,
                         "page_size": page_size,
@@ -197,6 +103,24 @@ def _field_map_from_pdf(pdf_path: str) -> list[dict]:
     return output
 
 
+def _overlay_value(item: dict, value: str) -> dict:
+    field_type = str(item.get("type", "Text"))
+    text_value = str(value or "").strip()
+    options = item.get("options", []) if isinstance(item.get("options"), list) else []
+    if field_type == "CheckBox":
+        checked = is_checkbox_yes(text_value)
+        return {"value": text_value, "display": "X" if checked else "", "checked": checked}
+    if field_type in {"RadioButton", "ComboBox"}:
+        mapped = map_value_to_allowed_option(text_value, options) or text_value
+        return {"value": mapped, "display": mapped}
+    return {"value": text_value, "display": text_value}
+
+
+def _page_image_url(agent_id: str, pdf_path: str, page_number: int) -> str:
+    version = blank_page_etag(pdf_path, page_number - 1)[:16]
+    return f"/api/agent/{agent_id}/pages/{page_number}.png?v={version}"
+
+
 @agent_bp.get("/agent/<agent_id>")
 def agent_details(agent_id: str) -> tuple:
     agent = get_agent(agent_id)
@@ -208,14 +132,16 @@ def agent_details(agent_id: str) -> tuple:
         pdf_path = _safe_pdf_path(str(agent.get("pdf_path", "") or ""))
         if pdf_path:
             try:
-                field_map = _field_map_from_pdf(pdf_path)
+                field_map = run_pdf_job(_field_map_from_pdf, pdf_path)
             except Exception:
                 field_map = []
 
     payload = {
         **agent,
+        "schema": _public_schema(schema),
         "preview_pdf_url": f"/api/agent/{agent_id}/pdf",
         "live_preview_url": f"/api/agent/{agent_id}/preview",
+        "preview_overlay_url": f"/api/agent/{agent_id}/preview/overlay",
         "field_map": field_map,
     }
     return jsonify(payload), 200
@@ -232,6 +158,109 @@ def agent_blank_pdf(agent_id: str):
     return send_file(pdf_path, mimetype="application/pdf", as_attachment=False)
 
 
+@agent_bp.get("/agent/<agent_id>/pages/<int:page_number>.png")
+def agent_page_image(agent_id: str, page_number: int):
+    agent = get_agent(agent_id)
+    if not agent:
+        return jsonify({"error": "Agent not found."}), 404
+    pdf_path = _safe_pdf_path(str(agent.get("pdf_path", "") or ""))
+    if not pdf_path:
+        return jsonify({"error": "Blank PDF not found."}), 404
+
+    try:
+        png = blank_page_png(pdf_path, page_number - 1)
+    except PdfEngineBusy:
+        return _engine_busy_response()
+    except Exception:
+        return jsonify({"error": "Could not render page image."}), 500
+    if png is None:
+        return jsonify({"error": "Page not found."}), 404
+
+    response = send_file(
+        io.BytesIO(png),
+        mimetype="image/png",
+        as_attachment=False,
+        etag=blank_page_etag(pdf_path, page_number - 1),
+        conditional=True,
+        max_age=PAGE_IMAGE_MAX_AGE_SECONDS,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@agent_bp.post("/agent/<agent_id>/preview/overlay")
+def agent_preview_overlay(agent_id: str):
+    """Field rectangles plus formatted values to draw over the blank page images.
+
+    With ``previous_answers`` (the answers the client already draws) only fields whose value
+    changed are returned, plus the keys under ``removed`` that are no longer answered.
+    """
+    agent = get_agent(agent_id)
+    if not agent:
+        return jsonify({"error": "Agent not found."}), 404
+
+    payload = request.get_json(silent=True)
+    if payload is None or not isinstance(payload, dict):
+        return jsonify({"error": "Invalid or missing JSON body"}), 400
+
+    answers_raw = payload.get("answers", {})
+    if not isinstance(answers_raw, dict):
+        return jsonify({"error": "answers must be an object"}), 400
+
+    previous_raw = payload.get("previous_answers")
+    if previous_raw is not None and not isinstance(previous_raw, dict):
+        return jsonify({"error": "previous_answers must be an object"}), 400
+
+    answers = {str(k): str(v) for k, v in answers_raw.items() if str(k).strip()}
+    previous = {str(k): str(v) for k, v in previous_raw.items()} if previous_raw is not None else None
+    pdf_path = _safe_pdf_path(str(agent.get("pdf_path", "") or ""))
+    if not pdf_path:
+        return jsonify({"error": "Blank PDF not found."}), 404
+
+    schema = agent.get("schema", {}) if isinstance(agent.get("schema"), dict) else {}
+    try:
+        field_map = _field_map_from_schema(schema) or run_pdf_job(_field_map_from_pdf, pdf_path)
+        sizes = page_sizes(pdf_path)
+    except PdfEngineBusy:
+        return _engine_busy_response()
+    except Exception:
+        return jsonify({"error": "Could not generate preview overlay."}), 500
+
+    fields = []
+    for item in field_map:
+        key = item["key"]
+        if key not in answers or not item.get("rect"):
+            continue
+        if previous is not None and previous.get(key) == answers[key]:
+            continue
+        fields.append(
+            {
+                "key": key,
+                "type": item["type"],
+                "page": item["page"],
+                "rect": item["rect"],
+                "page_size": item.get("page_size"),
+                **_overlay_value(item, answers[key]),
+            }
+        )
+
+    pages = [
+        {"page": number, **size, "image_url": _page_image_url(agent_id, pdf_path, number)}
+        for number, size in enumerate(sizes, start=1)
+    ]
+    removed = sorted(key for key in previous if key not in answers) if previous is not None else []
+    return jsonify(
+        {
+            "agent_id": agent_id,
+            "pages": pages,
+            "fields": fields,
+            "removed": removed,
+            "changed_only": previous is not None,
+        }
+    ), 200
+
+
 @agent_bp.post("/agent/<agent_id>/preview")
 def agent_live_preview(agent_id: str):
     agent = get_agent(agent_id)
@@ -246,6 +275,10 @@ def agent_live_preview(agent_id: str):
     if not isinstance(answers_raw, dict):
         return jsonify({"error": "answers must be an object"}), 400
 
+    flatten_mode = resolve_flatten_mode(request.args.get("flatten") or payload.get("flatten"))
+    if flatten_mode is None:
+        return jsonify({"error": "flatten must be 'raster' or 'vector'"}), 400
+
     answers = {str(k): str(v) for k, v in answers_raw.items() if str(k).strip()}
     pdf_path = _safe_pdf_path(str(agent.get("pdf_path", "") or ""))
     if not pdf_path:
@@ -262,24 +295,29 @@ def agent_live_preview(agent_id: str):
         if isinstance(options, list):
             options_by_field[key] = [str(x) for x in options]
 
+    assign_value = partial(assign_indexed_value, checkbox_matches_options=False, schema_options=options_by_field)
     try:
-        with fitz.open(pdf_path) as doc:
-            processed_radio_fields: set[str] = set()
-            for page in doc:
-                for widget in page.widgets() or []:
-                    field_key = str(getattr(widget, "field_name", "") or "").strip()
-                    if field_key and field_key in answers:
-                        field_type = str(getattr(widget, "field_type_string", "") or "")
-                        if field_type == "RadioButton":
-                            if field_key in processed_radio_fields:
-                                continue
-                            processed_radio_fields.add(field_key)
-                        _assign_widget_value(widget, answers[field_key], options_by_field)
-            try:
-                doc.need_appearances(True)
-            except Exception:
-                pass
-            pdf_bytes = _flatten_preview_pdf(doc)
+        # form_index_for_agent swallows build errors, a busy engine included; building once more here
+        # turns a still-busy engine into a 503 the client retries instead of a 500.
+        form_index = form_index_for_agent(agent) or run_pdf_job(build_form_index_for_path, pdf_path)
+        if flatten_mode == "vector":
+            pdf_bytes = run_pdf_job(
+                render_vector_preview,
+                pdf_path=pdf_path,
+                form_index=form_index,
+                answers=answers,
+                assign_value=assign_value,
+            )
+        else:
+            # Page cache lookups happen here; only missed pages go to the engine.
+            pdf_bytes = render_cached_raster_preview(
+                pdf_path=pdf_path,
+                form_index=form_index,
+                answers=answers,
+                assign_value=assign_value,
+            )
+    except PdfEngineBusy:
+        return _engine_busy_response()
     except Exception:
         return jsonify({"error": "Could not generate live PDF preview."}), 500
 
@@ -293,7 +331,8 @@ def agent_live_preview(agent_id: str):
 
 @agent_bp.get("/admin/agents")
 def agent_list() -> tuple:
-    return jsonify({"agents": list_agents(limit=300)}), 200
+    agents = [{**agent, "schema": _public_schema(agent["schema"])} for agent in list_agents(limit=300)]
+    return jsonify({"agents": agents}), 200
 
 
 def _with_urls(item: dict) -> dict:
@@ -314,9 +353,21 @@ def agent_sessions(agent_id: str) -> tuple:
     return jsonify({"agent_id": agent_id, "sessions": sessions}), 200
 
 
+def _delete_files_job(payload: dict) -> dict:
+    return {"deleted_files": delete_data_files(payload["paths"])}
+
+
+register_job_handler(FILE_DELETE_JOB_KIND, _delete_files_job)
+
+
 @agent_bp.delete("/admin/agents/<agent_id>")
 def agent_delete(agent_id: str) -> tuple:
     result = delete_agent(agent_id)
     if not result:
         return jsonify({"error": "Agent not found."}), 404
+    # Completed PDFs and previews are removed in the background once the rows are gone.
+    pending_files = result.pop("pending_files")
+    if pending_files:
+        result["cleanup_job_id"] = enqueue_job(FILE_DELETE_JOB_KIND, {"paths": pending_files})
+    result["pending_file_deletions"] = len(pending_files)
     return jsonify(result), 200
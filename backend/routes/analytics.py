@@ -1,10 +1,30 @@
-from flask import Blueprint, jsonify
-from storage import get_all_sessions_for_agent, get_agent
-from datetime import datetime
-import json
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, jsonify, request
+
+from date_bounds import parse_date_bound
+from quantiles import QuantileSketch
+from storage import get_agent, get_agent_rollups, get_agent_stats
 
 analytics_bp = Blueprint('analytics', __name__)
 
+# Default window and the most buckets one timeseries request may span.
+TIMESERIES_DEFAULT_SPAN = {'hour': timedelta(days=2), 'day': timedelta(days=90)}
+TIMESERIES_MAX_BUCKETS = 2000
+
+
+def _seconds(value):
+    return round(value, 1) if value is not None else None
+
+
+def _percentiles(sketch: QuantileSketch) -> dict:
+    """p50/p90/p99 completion time in seconds, None until a session has a usable duration"""
+    return {
+        'p50': _seconds(sketch.quantile(0.5)),
+        'p90': _seconds(sketch.quantile(0.9)),
+        'p99': _seconds(sketch.quantile(0.99)),
+    }
+
 @analytics_bp.route('/api/admin/agents/<agent_id>/analytics')
 def get_agent_analytics(agent_id: str):
     """Get analytics for a specific agent"""
@@ -32,53 +52,24 @@ def get_agent_analytics(agent_id: str):
         
        
         
-        # Get all sessions from all_sessions table
-        all_sessions = get_all_sessions_for_agent(agent_id)
-        
-        # Filter only completed sessions
-        completed_sessions = [s for s in all_sessions if s.get('is_completed')]
-        
-        # Calculate average duration from completed sessions
-        total_duration_seconds = 0
-        valid_duration_count = 0
-        
-        for session in completed_sessions:
-            started_at = session.get('started_at')
-            completed_at = session.get('completed_at')
-            
-            if started_at and completed_at:
-                try:
-                    start_time = datetime.fromisoformat(started_at.replace('Z', '+00:00'))
-                    end_time = datetime.fromisoformat(completed_at.replace('Z', '+00:00'))
-                    duration_seconds = (end_time - start_time).total_seconds()
-                    
-                    # Filter out outliers (less than 5 seconds or more than 2 hours)
-                    if 5 < duration_seconds < 7200:
-                        total_duration_seconds += duration_seconds
-                        valid_duration_count += 1
-                        print(f"Session {session.get('session_id')}: {duration_seconds}s")
-                except Exception as e:
-                    print(f"Error calculating duration for session {session.get('session_id')}: {e}")
-                    continue
+        # Aggregates are kept up to date by save_completed_session
+        stats = get_agent_stats(agent['agent_id'])
         
         # Format average duration
-        if valid_duration_count > 0:
-            avg_seconds = total_duration_seconds / valid_duration_count
+        if stats['duration_count'] > 0:
+            avg_seconds = stats['duration_sum'] / stats['duration_count']
             minutes = int(avg_seconds // 60)
             seconds = int(avg_seconds % 60)
             avg_duration = f"{minutes}m {seconds}s"
         else:
             avg_duration = "N/A"
         
-        print(f"Analytics for agent {agent_id}:")
-        print(f"  Completed sessions: {len(completed_sessions)}")
-        print(f"  Valid durations: {valid_duration_count}")
-        print(f"  Avg duration: {avg_duration}")
-        
         analytics = {
-            'completed_sessions': len(completed_sessions),
+            'completed_sessions': stats['completed_count'],
             'total_fields': total_fields,
             'avg_duration': avg_duration,
+            'languages': stats['languages'],
+            'duration_percentiles': _percentiles(stats['duration_sketch']),
         }
    
         
@@ -87,4 +78,64 @@ def get_agent_analytics(agent_id: str):
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/api/admin/agents/<agent_id>/analytics/timeseries')
+def get_agent_timeseries(agent_id: str):
+    """Hourly or daily starts, completions and median duration over a time range"""
+    agent = get_agent(agent_id)
+    if not agent:
+        return jsonify({'error': 'Agent not found'}), 404
+
+    granularity = str(request.args.get('granularity', 'day')).strip().lower()
+    if granularity not in TIMESERIES_DEFAULT_SPAN:
+        return jsonify({'error': "granularity must be 'hour' or 'day'"}), 400
+
+    try:
+        if request.args.get('to'):
+            range_end = datetime.fromisoformat(parse_date_bound(request.args['to'], end=True))
+        else:
+            range_end = datetime.now(timezone.utc)
+        if request.args.get('from'):
+            range_start = datetime.fromisoformat(parse_date_bound(request.args['from'], end=False))
+        else:
+            range_start = range_end - TIMESERIES_DEFAULT_SPAN[granularity]
+    except ValueError:
+        return jsonify({'error': 'from and to must be ISO dates or datetimes'}), 400
+
+    bucket_size = timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+    if range_end <= range_start:
+        return jsonify({'error': 'from must be before to'}), 400
+    if (range_end - range_start) / bucket_size > TIMESERIES_MAX_BUCKETS:
+        return jsonify({'error': f'Range spans more than {TIMESERIES_MAX_BUCKETS} {granularity} buckets'}), 400
+
+    # Buckets are keyed by their start, so include the one the range starts inside.
+    if granularity == 'hour':
+        first_bucket = range_start.replace(minute=0, second=0, microsecond=0)
+    else:
+        first_bucket = range_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    rollups = get_agent_rollups(agent['agent_id'], granularity, first_bucket.isoformat(), range_end.isoformat())
+
+    # Sketches merge, so percentiles for the whole range come from the same rows
+    range_sketch = QuantileSketch()
+    buckets = []
+    for rollup in rollups:
+        range_sketch.merge(rollup['duration_sketch'])
+        buckets.append({
+            'bucket_start': rollup['bucket_start'],
+            'starts': rollup['starts'],
+            'completions': rollup['completions'],
+            'median_duration_seconds': _seconds(rollup['duration_sketch'].quantile(0.5)),
+        })
+
+    return jsonify({
+        'agent_id': agent['agent_id'],
+        'granularity': granularity,
+        'from': range_start.isoformat(),
+        'to': range_end.isoformat(),
+        'buckets': buckets,
+        'starts': sum(bucket['starts'] for bucket in buckets),
+        'completions': sum(bucket['completions'] for bucket in buckets),
+        'duration_percentiles': _percentiles(range_sketch),
+    })
@@ -0,0 +1,137 @@
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from batch_fill import BatchInputError, BatchProgress, detect_format, fill_into_completed, iter_zip_batch, parse_answer_sets
+from storage import get_agent
+
+batch_bp = Blueprint("batch", __name__)
+logger = logging.getLogger(__name__)
+
+BATCH_FILL_MAX_INPUT_BYTES = int(os.getenv("BATCH_FILL_MAX_INPUT_BYTES", str(20 * 1024 * 1024)) or 0)
+BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-fill-job")
+# In-memory like upload jobs; the completed sessions themselves are durable.
+BATCH_JOBS: dict[str, dict] = {}
+BATCH_JOBS_LOCK = threading.Lock()
+# Finished jobs stay pollable this long after their last update, then are dropped.
+BATCH_JOB_TTL_SECONDS = int(os.getenv("BATCH_JOB_TTL_SECONDS", "3600") or 0)
+FINISHED_BATCH_STATUSES = ("succeeded", "failed")
+
+
+@dataclass
+class BatchInput:
+    text: str
+    input_format: str
+
+
+def _read_batch_input() -> BatchInput | tuple:
+    """Accept a multipart ``file`` field or a raw CSV/NDJSON body."""
+    content_length = request.content_length
+    if content_length is not None and content_length > BATCH_FILL_MAX_INPUT_BYTES:
+        return jsonify({"error": f"Batch input exceeds {BATCH_FILL_MAX_INPUT_BYTES} bytes.", "code": "BATCH_TOO_LARGE"}), 413
+
+    if "file" in request.files:
+        upload = request.files["file"]
+        data = upload.stream.read(BATCH_FILL_MAX_INPUT_BYTES + 1)
+        detected = detect_format(upload.filename or "", upload.mimetype or "")
+    else:
+        data = request.stream.read(BATCH_FILL_MAX_INPUT_BYTES + 1)
+        detected = detect_format(content_type=request.mimetype or "")
+    if len(data) > BATCH_FILL_MAX_INPUT_BYTES:
+        return jsonify({"error": f"Batch input exceeds {BATCH_FILL_MAX_INPUT_BYTES} bytes.", "code": "BATCH_TOO_LARGE"}), 413
+
+    input_format = str(request.args.get("format", "") or detected).strip().lower()
+    return BatchInput(text=data.decode("utf-8-sig", errors="replace"), input_format=input_format)
+
+
+def _set_batch_job(job_id: str, **changes) -> None:
+    with BATCH_JOBS_LOCK:
+        BATCH_JOBS[job_id].update(changes, updated_at=datetime.now(timezone.utc).isoformat())
+
+
+def _evict_batch_jobs() -> None:
+    """Drop finished jobs past their TTL; callers hold ``BATCH_JOBS_LOCK``."""
+    if not BATCH_JOB_TTL_SECONDS:
+        return
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=BATCH_JOB_TTL_SECONDS)).isoformat()
+    expired = [
+        job_id
+        for job_id, job in BATCH_JOBS.items()
+        if job["status"] in FINISHED_BATCH_STATUSES and job["updated_at"] < cutoff
+    ]
+    for job_id in expired:
+        del BATCH_JOBS[job_id]
+
+
+def _run_batch_job(job_id: str, agent: dict, answer_sets: list[dict[str, str]]) -> None:
+    _set_batch_job(job_id, status="running")
+
+    def report(progress: BatchProgress) -> None:
+        _set_batch_job(job_id, progress=progress.as_dict())
+
+    try:
+        progress = fill_into_completed(agent=agent, answer_sets=answer_sets, on_progress=report)
+    except Exception as exc:
+        logger.exception("Batch fill job %s failed: %s", job_id, exc)
+        _set_batch_job(job_id, status="failed", error="Batch fill failed.")
+    else:
+        _set_batch_job(job_id, status="succeeded", progress=progress.as_dict())
+
+
+@batch_bp.post("/admin/agents/<agent_id>/batch-fill")
+def batch_fill(agent_id: str):
+    agent = get_agent(agent_id)
+    if not agent:
+        return jsonify({"error": "Agent not found."}), 404
+
+    output = str(request.args.get("output", "zip")).strip().lower()
+    if output not in {"zip", "completed"}:
+        return jsonify({"error": "output must be 'zip' or 'completed'"}), 400
+
+    batch_input = _read_batch_input()
+    if isinstance(batch_input, tuple):
+        return batch_input
+    try:
+        answer_sets = parse_answer_sets(batch_input.text, batch_input.input_format)
+    except BatchInputError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if output == "zip":
+        response = Response(
+            stream_with_context(iter_zip_batch(agent=agent, answer_sets=answer_sets)),
+            mimetype="application/zip",
+        )
+        response.headers["Content-Disposition"] = f'attachment; filename="{agent["agent_id"]}-batch.zip"'
+        response.headers["X-Batch-Total"] = str(len(answer_sets))
+        return response
+
+    job_id = uuid.uuid4().hex
+    now = datetime.now(timezone.utc).isoformat()
+    with BATCH_JOBS_LOCK:
+        _evict_batch_jobs()
+        BATCH_JOBS[job_id] = {
+            "job_id": job_id,
+            "agent_id": agent["agent_id"],
+            "status": "queued",
+            "progress": BatchProgress(total=len(answer_sets)).as_dict(),
+            "created_at": now,
+            "updated_at": now,
+        }
+    BATCH_EXECUTOR.submit(_run_batch_job, job_id, agent, answer_sets)
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/api/admin/batch-fill/jobs/{job_id}"}), 202
+
+
+@batch_bp.get("/admin/batch-fill/jobs/<job_id>")
+def batch_fill_status(job_id: str) -> tuple:
+    with BATCH_JOBS_LOCK:
+        _evict_batch_jobs()
+        job = dict(BATCH_JOBS.get(job_id) or {})
+    if not job:
+        return jsonify({"error": "Batch job not found."}), 404
+    return jsonify(job), 200
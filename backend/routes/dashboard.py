@@ -1,15 +1,25 @@
 import logging
-from io import BytesIO
+import os
+import tempfile
 from pathlib import Path
 
 import fitz
-from flask import Blueprint, jsonify, send_file
+from flask import Blueprint, jsonify, request, send_file
 
-from storage import DATA_DIR, get_completed_session, list_completed_sessions
+from completed_pdf import completed_pdf_path, with_completed_pdf
+from jobs import register_job_handler
+from pdf_engine import PdfEngineBusy, run_pdf_job
+from pdf_preview import DEFAULT_FLATTEN_MODE, flatten_pdf, resolve_flatten_mode
+from routes.submission import fill_pdf_with_json
+from storage import completed_preview_path, get_completed_session, list_completed_sessions
 
 dashboard_bp = Blueprint("dashboard", __name__)
 logger = logging.getLogger(__name__)
 
+# Completed sessions never change, so browsers may reuse a preview and revalidate with its ETag.
+PREVIEW_MAX_AGE_SECONDS = int(os.getenv("COMPLETED_PREVIEW_MAX_AGE_SECONDS", "3600") or 0)
+PREVIEW_WARM_JOB_KIND = "completed_preview.warm"
+
 
 def _with_urls(item: dict) -> dict:
     session_id = item["session_id"]
@@ -34,27 +44,45 @@ def get_session_detail(session_id: str) -> tuple:
     return jsonify(_with_urls(session)), 200
 
 
-def _safe_pdf_path(path_value: str) -> Path | None:
-    path = Path(path_value).resolve()
-    data_root = DATA_DIR.resolve()
-    if not path.exists() or not path.is_file():
-        return None
-    if not str(path).startswith(str(data_root)):
-        return None
-    return path
+def _flatten_preview_pdf(path: Path, mode: str) -> bytes:
+    with fitz.open(str(path)) as source_doc:
+        return flatten_pdf(source_doc, mode)
 
 
-def _flatten_preview_pdf(path: Path) -> bytes:
-    with fitz.open(str(path)) as source_doc:
-        flattened_doc = fitz.open()
-        matrix = fitz.Matrix(1.35, 1.35)
-        for source_page in source_doc:
-            target_page = flattened_doc.new_page(width=source_page.rect.width, height=source_page.rect.height)
-            pix = source_page.get_pixmap(matrix=matrix, alpha=False)
-            target_page.insert_image(target_page.rect, stream=pix.tobytes("png"))
-        output = flattened_doc.write()
-        flattened_doc.close()
-    return output
+def _cached_preview_pdf(path: Path, mode: str) -> Path:
+    """Flatten once and keep the result beside the filled PDF; later views are plain file sends."""
+    # Stat the source first: a missing PDF raises FileNotFoundError here rather than inside the engine.
+    source_mtime_ns = path.stat().st_mtime_ns
+    preview_path = completed_preview_path(path, mode)
+    if preview_path.is_file() and preview_path.stat().st_mtime_ns >= source_mtime_ns:
+        return preview_path
+
+    preview_bytes = run_pdf_job(_flatten_preview_pdf, path, mode)
+    # Write to a temp file and rename so concurrent viewers never see a partial preview.
+    fd, temp_path = tempfile.mkstemp(dir=str(preview_path.parent), prefix=f".{preview_path.stem}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(preview_bytes)
+        os.replace(temp_path, preview_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return preview_path
+
+
+def _warm_completed_preview(payload: dict) -> dict:
+    """Job handler: flatten a new completion ahead of its first dashboard view."""
+    mode = payload.get("mode") or DEFAULT_FLATTEN_MODE
+    session = get_completed_session(payload["session_id"])
+    pdf_path = completed_pdf_path(session, fill_pdf_with_json) if session and session["pdf_storage"] == "eager" else None
+    if not pdf_path:
+        return {"warmed": False}
+    _cached_preview_pdf(pdf_path, mode)
+    return {"warmed": True, "mode": mode}
+
+
+register_job_handler(PREVIEW_WARM_JOB_KIND, _warm_completed_preview, max_attempts=2)
 
 
 @dashboard_bp.get("/admin/dashboard/sessions/<session_id>/pdf")
@@ -63,18 +91,34 @@ def preview_pdf(session_id: str):
     if not session:
         return jsonify({"error": "Session not found."}), 404
 
-    pdf_path = _safe_pdf_path(session["filled_pdf_path"])
-    if not pdf_path:
-        logger.warning("Missing or invalid PDF path for session_id=%s", session_id)
-        return jsonify({"error": "Filled PDF not found."}), 404
+    flatten_mode = resolve_flatten_mode(request.args.get("flatten"))
+    if flatten_mode is None:
+        return jsonify({"error": "flatten must be 'raster' or 'vector'"}), 400
+
+    def send_preview(pdf_path: Path):
+        return send_file(
+            _cached_preview_pdf(pdf_path, flatten_mode),
+            mimetype="application/pdf",
+            as_attachment=False,
+            conditional=True,
+            etag=True,
+            max_age=PREVIEW_MAX_AGE_SECONDS,
+        )
 
     try:
-        preview_bytes = _flatten_preview_pdf(pdf_path)
+        response = with_completed_pdf(session, fill_pdf_with_json, send_preview)
+    except PdfEngineBusy:
+        return jsonify({"error": "PDF engine is busy. Please retry shortly.", "code": "PDF_ENGINE_BUSY"}), 503
     except Exception as exc:
         logger.exception("Failed to flatten preview PDF for session_id=%s: %s", session_id, exc)
         return jsonify({"error": "Could not render preview PDF."}), 500
+    if response is None:
+        logger.warning("Missing or invalid PDF path for session_id=%s", session_id)
+        return jsonify({"error": "Filled PDF not found."}), 404
 
-    return send_file(BytesIO(preview_bytes), mimetype="application/pdf", as_attachment=False)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
 
 
 @dashboard_bp.get("/admin/dashboard/sessions/<session_id>/download")
@@ -83,14 +127,19 @@ def download_pdf(session_id: str):
     if not session:
         return jsonify({"error": "Session not found."}), 404
 
-    pdf_path = _safe_pdf_path(session["filled_pdf_path"])
-    if not pdf_path:
+    def send_download(pdf_path: Path):
+        return send_file(
+            pdf_path,
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name=f"completed-{session_id}.pdf",
+        )
+
+    try:
+        response = with_completed_pdf(session, fill_pdf_with_json, send_download)
+    except PdfEngineBusy:
+        return jsonify({"error": "PDF engine is busy. Please retry shortly.", "code": "PDF_ENGINE_BUSY"}), 503
+    if response is None:
         logger.warning("Missing or invalid download PDF path for session_id=%s", session_id)
         return jsonify({"error": "Filled PDF not found."}), 404
-
-    return send_file(
-        pdf_path,
-        mimetype="application/pdf",
-        as_attachment=True,
-        download_name=f"completed-{session_id}.pdf",
-    )
+    return response
@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+import logging
+from typing import BinaryIO, Iterable, Iterator
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from completed_pdf import with_completed_pdf
+from date_bounds import parse_date_bound
+from pdf_engine import PdfEngineBusy
+from routes.submission import fill_pdf_with_json
+from storage import get_agent, iter_completed_sessions
+from zip_stream import iter_zip
+
+export_bp = Blueprint("export", __name__)
+logger = logging.getLogger(__name__)
+
+EXPORT_MAX_SESSION_IDS = 1000
+# Cells starting with these run as formulas in spreadsheet apps; answers are end-user input.
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+SESSION_COLUMNS = ["session_id", "agent_id", "started_at", "completed_at", "duration_seconds", "language_code", "language_label"]
+
+
+def _schema_field_keys(schema: dict) -> list[str]:
+    interview_fields = schema.get("interview_fields", []) if isinstance(schema, dict) else []
+    keys = [f["key"] for f in interview_fields if isinstance(f, dict) and f.get("key")]
+    if keys:
+        return keys
+    widget_names = schema.get("widget_names", []) if isinstance(schema, dict) else []
+    return [w for w in widget_names if isinstance(w, str) and w.strip()]
+
+
+def _iter_ndjson(sessions: Iterable[dict]) -> Iterator[str]:
+    for session in sessions:
+        row = {column: session[column] for column in SESSION_COLUMNS}
+        row["answers"] = session["answers"]
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def _iter_pdf_entries(agent_id: str, sessions: Iterable[dict]) -> Iterator[tuple[str, bytes | BinaryIO]]:
+    """Filled PDFs as open files, so the archive copies them in chunks; ends with ``export_report.json``.
+
+    Opening here means a materialized PDF evicted mid-export is rebuilt rather than missing from the archive.
+    """
+    exported = 0
+    missing = []
+    for session in sessions:
+        try:
+            pdf_file = with_completed_pdf(session, fill_pdf_with_json, lambda path: path.open("rb"))
+        except PdfEngineBusy:
+            missing.append({"session_id": session["session_id"], "error": "PDF engine busy."})
+            continue
+        except Exception as exc:
+            logger.exception("Could not export PDF for session_id=%s: %s", session["session_id"], exc)
+            missing.append({"session_id": session["session_id"], "error": "Could not build filled PDF."})
+            continue
+        if not pdf_file:
+            missing.append({"session_id": session["session_id"], "error": "Filled PDF not found."})
+            continue
+        exported += 1
+        yield f"completed-{session['session_id']}.pdf", pdf_file
+    report = {"agent_id": agent_id, "exported": exported, "missing": missing}
+    yield "export_report.json", json.dumps(report, indent=2).encode("utf-8")
+
+
+def _csv_cell(value):
+    """Neutralize answers a spreadsheet would evaluate as a formula."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _iter_csv(sessions: Iterable[dict], field_keys: list[str] | None) -> Iterator[str]:
+    """One CSV line per session. Without ``field_keys`` the answers go into a single JSON column."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SESSION_COLUMNS + (field_keys if field_keys is not None else ["answers_json"]))
+    for session in sessions:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        row = [session[column] for column in SESSION_COLUMNS]
+        if field_keys is not None:
+            row.extend(session["answers"].get(key, "") for key in field_keys)
+        else:
+            row.append(json.dumps(session["answers"], ensure_ascii=False))
+        writer.writerow([_csv_cell(value) for value in row])
+    yield buffer.getvalue()
+
+
+def _date_range() -> tuple[str, str] | None:
+    try:
+        completed_from = parse_date_bound(request.args["from"], end=False) if request.args.get("from") else ""
+        completed_before = parse_date_bound(request.args["to"], end=True) if request.args.get("to") else ""
+    except ValueError:
+        return None
+    return completed_from, completed_before
+
+
+def _export_response(agent: dict | None):
+    export_format = str(request.args.get("format", "ndjson")).strip().lower()
+    if export_format not in {"ndjson", "csv"}:
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+    date_range = _date_range()
+    if date_range is None:
+        return jsonify({"error": "from and to must be ISO dates or datetimes"}), 400
+
+    sessions = iter_completed_sessions(
+        agent_id=agent["agent_id"] if agent else None,
+        completed_from=date_range[0],
+        completed_before=date_range[1],
+    )
+    if export_format == "csv":
+        body = _iter_csv(sessions, _schema_field_keys(agent["schema"]) if agent else None)
+        mimetype = "text/csv"
+    else:
+        body = _iter_ndjson(sessions)
+        mimetype = "application/x-ndjson"
+
+    filename = f"{agent['agent_id'] if agent else 'all'}-sessions.{export_format}"
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@export_bp.get("/admin/agents/<agent_id>/sessions/export")
+def export_agent_sessions(agent_id: str):
+    agent = get_agent(agent_id)
+    if not agent:
+        return jsonify({"error": "Agent not found."}), 404
+    return _export_response(agent)
+
+
+@export_bp.get("/admin/dashboard/sessions/export")
+def export_all_sessions():
+    return _export_response(None)
+
+
+@export_bp.get("/admin/agents/<agent_id>/sessions/pdfs.zip")
+def download_agent_pdfs(agent_id: str):
+    agent = get_agent(agent_id)
+    if not agent:
+        return jsonify({"error": "Agent not found."}), 404
+    date_range = _date_range()
+    if date_range is None:
+        return jsonify({"error": "from and to must be ISO dates or datetimes"}), 400
+    session_ids = request.args.getlist("session_id") or None
+    if session_ids and len(session_ids) > EXPORT_MAX_SESSION_IDS:
+        return jsonify({"error": f"At most {EXPORT_MAX_SESSION_IDS} session_id values are accepted."}), 400
+
+    sessions = iter_completed_sessions(
+        agent_id=agent["agent_id"],
+        completed_from=date_range[0],
+        completed_before=date_range[1],
+        session_ids=session_ids,
+    )
+    response = Response(
+        stream_with_context(iter_zip(_iter_pdf_entries(agent["agent_id"], sessions))),
+        mimetype="application/zip",
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{agent["agent_id"]}-completed.zip"'
+    return response
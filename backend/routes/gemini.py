@@ -9,6 +9,7 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 from flask import Blueprint, jsonify, request
 
+from cancellation import CancellationToken, OperationCancelled
 from storage import get_agent
 
 load_dotenv()
@@ -62,9 +63,30 @@ def _chunk_dict(data: dict[str, str], chunk_size: int = 28) -> list[dict[str, st
     return [dict(items[index : index + chunk_size]) for index in range(0, len(items), chunk_size)]
 
 
-def run_gemini_json(*, prompt: str, response_schema: dict, model_name: str | None = None) -> dict:
+def _collect_streamed_text(response, cancel_token: CancellationToken) -> str:
+    parts: list[str] = []
+    for chunk in response:
+        # Leaving the stream early closes the upstream call instead of waiting for it to finish.
+        cancel_token.raise_if_cancelled()
+        try:
+            parts.append(chunk.text or "")
+        except ValueError:
+            continue
+    cancel_token.raise_if_cancelled()
+    return "".join(parts)
+
+
+def run_gemini_json(
+    *,
+    prompt: str,
+    response_schema: dict,
+    model_name: str | None = None,
+    cancel_token: CancellationToken | None = None,
+) -> dict:
     if not GEMINI_API_KEY:
         raise GeminiAuthError("Missing GEMINI_API_KEY.")
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
 
     call_id = uuid.uuid4().hex[:8]
     active_model = model_name or GEMINI_MODEL
@@ -74,14 +96,16 @@ def run_gemini_json(*, prompt: str, response_schema: dict, model_name: str | Non
 
     model = genai.GenerativeModel(model_name=active_model)
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "response_mime_type": "application/json",
-                "response_schema": response_schema,
-            },
-        )
-        raw_text = response.text or ""
+        generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": response_schema,
+        }
+        if cancel_token is not None:
+            response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+            raw_text = _collect_streamed_text(response, cancel_token)
+        else:
+            response = model.generate_content(prompt, generation_config=generation_config)
+            raw_text = response.text or ""
         logger.warning("[Gemini %s] raw_response=%s", call_id, raw_text)
         try:
             parsed = json.loads(raw_text)
@@ -90,6 +114,9 @@ def run_gemini_json(*, prompt: str, response_schema: dict, model_name: str | Non
             raise GeminiRequestError("Gemini returned invalid JSON response.") from exc
         logger.warning("[Gemini %s] parsed_response=%s", call_id, json.dumps(parsed, ensure_ascii=False))
         return parsed
+    except OperationCancelled:
+        logger.warning("[Gemini %s] cancelled by a newer turn", call_id)
+        raise
     except Exception as exc:
         message = str(exc)
         auth_markers = (
@@ -4,21 +4,62 @@ import base64
 import os
 import uuid
 import re
-from urllib.parse import unquote
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+from itertools import chain
 from datetime import datetime, timezone
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
+import queue
 import requests
-import fitz
 
 from routes.gemini import GeminiAuthError, GeminiRateLimitError, GeminiRequestError, run_gemini_json
-from storage import COMPLETED_DIR, get_agent, save_completed_session, save_session_start
+import session_events
+from completion_jobs import (
+    COMPLETION_JOB_KIND,
+    COMPLETION_MAX_ATTEMPTS,
+    enqueue_completion,
+    get_completion_job,
+    public_status,
+)
+from completed_pdf import persist_completed_session
+from jobs import JobFailed, enqueue_job, register_job_handler
+from audio_preprocess import is_wav_upload, preprocess_wav
+from cancellation import CancellationToken, OperationCancelled
+from form_index import (
+    assign_indexed_value,
+    build_form_index,
+    decode_pdf_token,
+    extract_widget_options,
+    iter_answer_widgets,
+    template_matchers,
+)
+from option_matching import coerce_checkbox_value, map_value_to_allowed_option, normalize_for_match
+from pdf_engine import PdfEngineBusy, run_pdf_job
+from pdf_output import optimized_pdf_bytes
+from template_cache import open_template
+from routes.dashboard import PREVIEW_WARM_JOB_KIND
+from storage import get_agent, save_session_start
 
 interview_bp = Blueprint("interview", __name__)
 logger = logging.getLogger(__name__)
 
 
+class AudioTooLargeError(RuntimeError):
+    pass
+
+
+@dataclass
+class TurnAudio:
+    stream: object
+    filename: str
+    content_type: str
+
+
 @dataclass
 class InterviewSession:
     session_id: str
@@ -31,6 +72,7 @@ class InterviewSession:
     answers: dict[str, str] = field(default_factory=dict)
     created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    cancel_token: CancellationToken = field(default_factory=CancellationToken, repr=False)
 
     @property
     def current_field(self) -> str | None:
@@ -42,8 +84,16 @@ class InterviewSession:
 
 
 SESSIONS: dict[str, InterviewSession] = {}
+SESSION_TURN_LOCK = threading.Lock()
 ELEVENLABS_API_BASE = "https://api.elevenlabs.io/v1"
+TURN_PIPELINE_WORKERS = max(2, int(os.getenv("INTERVIEW_PIPELINE_WORKERS", "8") or 8))
+# Shared pool for the fan-out stages of an audio turn (TTS chunks, completion PDF).
+TURN_PIPELINE_EXECUTOR = ThreadPoolExecutor(max_workers=TURN_PIPELINE_WORKERS, thread_name_prefix="interview-turn")
+EVENT_KEEPALIVE_SECONDS = 15
+MAX_TURN_AUDIO_BYTES = int(os.getenv("MAX_TURN_AUDIO_BYTES", str(10 * 1024 * 1024)) or 0)
+AUDIO_UPLOAD_CHUNK_BYTES = 64 * 1024
 ENABLE_LABEL_LOCALIZATION = os.getenv("ENABLE_INTERVIEW_LABEL_LOCALIZATION", "1").strip().lower() in {"1", "true", "yes"}
+ENABLE_STT_PREPROCESSING = os.getenv("ENABLE_STT_AUDIO_PREPROCESSING", "1").strip().lower() in {"1", "true", "yes"}
 SUPPORTED_INTERVIEW_LANGUAGES: dict[str, str] = {
     "en-US": "English (US)",
     "en-GB": "English (UK)",
@@ -228,10 +278,6 @@ def _to_stt_language_code(language_code: str) -> str:
     return normalized.lower()
 
 
-def _normalize_for_match(text: str) -> str:
-    return re.sub(r"[^\w]+", " ", text.lower(), flags=re.UNICODE).strip()
-
-
 def _fallback_label_from_key(field_key: str) -> str:
     text = str(field_key).replace("_", " ").replace("\t", " ")
     text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
@@ -242,18 +288,10 @@ def _fallback_label_from_key(field_key: str) -> str:
     return text or str(field_key)
 
 
-def _decode_pdf_token(value: str) -> str:
-    if not value:
-        return ""
-    text = unquote(str(value))
-    text = re.sub(r"#([0-9A-Fa-f]{2})", lambda m: bytes.fromhex(m.group(1)).decode("latin1"), text)
-    return " ".join(text.split()).strip()
-
-
 def _clean_pdf_label(label: str, fallback: str) -> str:
-    text = _decode_pdf_token(label or "")
+    text = decode_pdf_token(label or "")
     if not text:
-        text = _decode_pdf_token(fallback)
+        text = decode_pdf_token(fallback)
     marker = "Type in the date or use the arrow keys to select a date."
     if marker in text:
         text = text.split(marker, 1)[0].strip()
@@ -266,43 +304,6 @@ def _clean_pdf_label(label: str, fallback: str) -> str:
     return _fallback_label_from_key(fallback)
 
 
-def _extract_widget_options(widget) -> list[str]:
-    options: list[str] = []
-    seen = set()
-
-    raw_choices = getattr(widget, "choice_values", None)
-    if callable(raw_choices):
-        raw_choices = raw_choices()
-    raw_choices = raw_choices or []
-    for choice in raw_choices:
-        item = _decode_pdf_token(str(choice))
-        if item and item.lower() != "off" and item not in seen:
-            seen.add(item)
-            options.append(item)
-
-    button_states = getattr(widget, "button_states", None)
-    if callable(button_states):
-        button_states = button_states()
-    button_states = button_states or {}
-    if not isinstance(button_states, dict):
-        button_states = {}
-    for state_values in button_states.values():
-        for value in state_values or []:
-            item = _decode_pdf_token(str(value))
-            if item and item.lower() != "off" and item not in seen:
-                seen.add(item)
-                options.append(item)
-
-    on_state = getattr(widget, "on_state", "")
-    if callable(on_state):
-        on_state = on_state()
-    on_state = _decode_pdf_token(str(on_state or ""))
-    if on_state and on_state.lower() != "off" and on_state not in seen:
-        options.append(on_state)
-
-    return options
-
-
 def _normalize_field_meta_item(item: dict) -> dict:
     field_key = str(item.get("key", "")).strip()
     label = str(item.get("label", "")).strip() or _fallback_label_from_key(field_key)
@@ -358,7 +359,7 @@ def _build_field_meta_from_pdf(pdf_path: str) -> dict[str, dict]:
         return fields_meta
 
     try:
-        with fitz.open(pdf_path) as document:
+        with open_template(pdf_path) as document:
             for page in document:
                 for widget in page.widgets() or []:
                     key = str(getattr(widget, "field_name", "") or "").strip()
@@ -367,7 +368,7 @@ def _build_field_meta_from_pdf(pdf_path: str) -> dict[str, dict]:
 
                     field_type = str(getattr(widget, "field_type_string", "Text") or "Text").strip() or "Text"
                     label = _clean_pdf_label(str(getattr(widget, "field_label", "") or ""), key)
-                    options = _extract_widget_options(widget)
+                    options = extract_widget_options(widget)
 
                     item = fields_meta.get(key)
                     if not item:
@@ -558,8 +559,8 @@ def _build_next_field_prompt(next_field_meta: dict, language_code: str = "en-US"
 
 
 def _mentions_field_label(text: str, field_label: str) -> bool:
-    normalized_text = _normalize_for_match(text)
-    normalized_field = _normalize_for_match(field_label)
+    normalized_text = normalize_for_match(text)
+    normalized_field = normalize_for_match(field_label)
     if not normalized_text or not normalized_field:
         return False
     if normalized_field in normalized_text:
@@ -585,100 +586,11 @@ def _ensure_next_question(*, assistant_response: str, next_field_meta: dict, lan
     return f"{clean} {next_prompt}".strip()
 
 
-def _coerce_checkbox_value(value: str) -> str:
-    normalized = _normalize_for_match(value)
-    yes_tokens = {
-        "yes",
-        "y",
-        "true",
-        "checked",
-        "check",
-        "on",
-        "1",
-        "selected",
-        "x",
-        "mark yes",
-        "affirmative",
-        "consent",
-        "si",
-        "sí",
-        "oui",
-        "ja",
-        "sim",
-        "hai",
-        "はい",
-        "예",
-        "да",
-        "shi",
-        "是",
-        "haan",
-        "हाँ",
-    }
-    no_tokens = {
-        "no",
-        "n",
-        "false",
-        "unchecked",
-        "uncheck",
-        "off",
-        "0",
-        "mark no",
-        "decline",
-        "do not consent",
-        "non",
-        "nein",
-        "nao",
-        "não",
-        "iie",
-        "いいえ",
-        "아니요",
-        "нет",
-        "bu",
-        "不是",
-        "nahin",
-        "नहीं",
-    }
-    if normalized in yes_tokens:
-        return "Yes"
-    if normalized in no_tokens:
-        return "No"
-    if " not " in f" {normalized} " and "consent" in normalized:
-        return "No"
-    if "consent" in normalized:
-        return "Yes"
-    return ""
-
-
-def _map_value_to_allowed_option(value: str, options: list[str]) -> str:
-    if not options:
-        return value.strip()
-    raw = value.strip()
-    if not raw:
-        return ""
-    if raw in options:
-        return raw
-
-    normalized_raw = _normalize_for_match(raw)
-    normalized_options = {option: _normalize_for_match(option) for option in options}
-
-    for option, normalized_option in normalized_options.items():
-        if normalized_raw == normalized_option:
-            return option
-
-    for option, normalized_option in normalized_options.items():
-        if normalized_raw and normalized_raw in normalized_option:
-            return option
-        if normalized_option and normalized_option in normalized_raw:
-            return option
-
-    return ""
-
-
 def _coerce_value_for_field(field_meta: dict, value: str) -> str:
     field_type = str(field_meta.get("type", "Text"))
     options = field_meta.get("options", []) if isinstance(field_meta.get("options"), list) else []
     if field_type == "CheckBox":
-        checkbox_value = _coerce_checkbox_value(value)
+        checkbox_value = coerce_checkbox_value(value)
         if checkbox_value:
             if checkbox_value in options:
                 return checkbox_value
@@ -686,95 +598,61 @@ def _coerce_value_for_field(field_meta: dict, value: str) -> str:
             return checkbox_value
         if not options:
             return ""
-        mapped = _map_value_to_allowed_option(value, options)
+        mapped = map_value_to_allowed_option(value, options)
         return mapped
     if field_type in {"ComboBox", "RadioButton"}:
-        return _map_value_to_allowed_option(value, options)
+        return map_value_to_allowed_option(value, options) if options else value.strip()
     return value.strip()
 
 
-def _checkbox_is_yes(value: str) -> bool:
-    return _coerce_checkbox_value(value) == "Yes"
-
-
-def _widget_on_state(widget) -> str:
-    on_state = getattr(widget, "on_state", "")
-    if callable(on_state):
-        on_state = on_state()
-    return str(on_state or "").strip()
-
-
-def _assign_widget_value(widget, value: str) -> None:
-    field_type = str(getattr(widget, "field_type_string", "") or "")
-    text_value = str(value or "").strip()
-
-    if field_type == "CheckBox":
-        on_state = _widget_on_state(widget) or "Yes"
-        normalized_text = _normalize_for_match(text_value)
-        normalized_on_state = _normalize_for_match(on_state)
-        mapped_option = _map_value_to_allowed_option(text_value, _extract_widget_options(widget))
-        if (
-            _checkbox_is_yes(text_value)
-            or (normalized_on_state and normalized_text == normalized_on_state)
-            or (_normalize_for_match(mapped_option) not in {"", "off"})
-        ):
-            widget.field_value = on_state
-        else:
-            widget.field_value = "Off"
-    elif field_type == "RadioButton":
-        options = _extract_widget_options(widget)
-        mapped = _map_value_to_allowed_option(text_value, options)
-        widget.field_value = mapped or text_value
-    else:
-        widget.field_value = text_value
-
-    widget.update()
-
-
-def _fill_pdf_with_answers(pdf_path: str, answers: dict[str, str]) -> bytes:
-    with fitz.open(pdf_path) as doc:
+def _fill_pdf_with_answers(pdf_path: str, answers: dict[str, str], form_index: dict | None = None) -> bytes:
+    with open_template(pdf_path) as doc:
         processed_radio_fields: set[str] = set()
-        for page in doc:
-            for widget in page.widgets() or []:
-                field_key = str(getattr(widget, "field_name", "") or "").strip()
-                if field_key and field_key in answers:
-                    field_type = str(getattr(widget, "field_type_string", "") or "")
-                    if field_type == "RadioButton":
-                        if field_key in processed_radio_fields:
-                            continue
-                        processed_radio_fields.add(field_key)
-                    _assign_widget_value(widget, str(answers[field_key]))
+        matchers = template_matchers(pdf_path)
+        for field_key, entry, widget in iter_answer_widgets(doc, form_index or build_form_index(doc), answers):
+            if entry["type"] == "RadioButton":
+                if field_key in processed_radio_fields:
+                    continue
+                processed_radio_fields.add(field_key)
+            assign_indexed_value(field_key, entry, widget, str(answers[field_key]), matchers, map_choices=False)
         # Ask viewers to respect updated appearance streams.
         try:
             doc.need_appearances(True)
         except Exception:
             pass
-        return doc.write()
+        return optimized_pdf_bytes(doc)
 
 
-def _finalize_completed_interview(*, session: InterviewSession, agent: dict) -> dict:
+def _finalize_completed_interview(job: dict) -> dict:
+    """Completion job handler: fill the PDF and persist the completed session, then announce it."""
+    agent = get_agent(job["agent_id"])
+    if not agent:
+        raise JobFailed("Agent was not found.")
     pdf_path = str(agent.get("pdf_path", "") or "").strip()
     if not pdf_path or not os.path.exists(pdf_path):
-        raise RuntimeError("Original PDF file is missing for this agent.")
-
-    filled_pdf_bytes = _fill_pdf_with_answers(pdf_path, session.answers)
-    filled_pdf_path = COMPLETED_DIR / f"{session.session_id}_completed.pdf"
-    filled_pdf_path.write_bytes(filled_pdf_bytes)
+        raise JobFailed("Original PDF file is missing for this agent.")
 
-    save_completed_session(
-        session_id=session.session_id,
-        agent_id=session.agent_id,
-        answers=session.answers,
-        filled_pdf_path=str(filled_pdf_path),
-        language_code=session.language_code,     
-        language_label=session.language_label, 
+    session_id = job["session_id"]
+    _, pdf_written = persist_completed_session(
+        session_id=session_id,
+        agent=agent,
+        answers=job["answers"],
+        fill=_fill_pdf_with_answers,
+        language_code=job["language_code"],
+        language_label=job["language_label"],
     )
 
-    session_id = session.session_id
-    return {
+    artifacts = {
         "download_url": f"/api/admin/dashboard/sessions/{session_id}/download",
         "pdf_preview_url": f"/api/admin/dashboard/sessions/{session_id}/pdf",
     }
+    session_events.publish(session_id, "pdf_ready", artifacts)
+    if pdf_written:
+        enqueue_job(PREVIEW_WARM_JOB_KIND, {"session_id": session_id})
+    return artifacts
+
+
+register_job_handler(COMPLETION_JOB_KIND, _finalize_completed_interview, max_attempts=COMPLETION_MAX_ATTEMPTS)
 
 
 # Add these helper functions after line 220 (_build_field_meta):
@@ -822,6 +700,7 @@ def _evaluate_turn_with_gemini(
     was_interruption: bool,
     language_code: str,
     language_label: str,
+    cancel_token: CancellationToken | None = None,
 ) -> dict:
     current_label = _display_label(current_field_meta, language_code)
     current_type = str(current_field_meta.get("type", "Text")).strip() or "Text"
@@ -905,6 +784,7 @@ Rules:
             },
             "required": ["intent", "is_answer_adequate", "normalized_value", "assistant_response"],
         },
+        cancel_token=cancel_token,
     )
     
     # NEW: Store collected_values for grouped fields
@@ -922,6 +802,7 @@ def _evaluate_and_update_session(
     session: InterviewSession,
     user_input: str,
     was_interruption: bool,
+    cancel_token: CancellationToken | None = None,
 ) -> dict:
     copy = _copy_for_language(session.language_code)
 
@@ -986,94 +867,130 @@ def _evaluate_and_update_session(
         was_interruption=was_interruption,
         language_code=session.language_code,
         language_label=session.language_label,
+        cancel_token=cancel_token,
     )
+    # A superseded turn must not advance the session the newer turn is working on. The check and
+    # the state change share the lock _begin_turn cancels under, so a newer turn either cancels
+    # this one first or starts after its answers are applied.
+    with SESSION_TURN_LOCK:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        intent = str(evaluation.get("intent", "clarification"))
+        is_answer_adequate = bool(evaluation.get("is_answer_adequate", False))
+        raw_normalized_value = str(evaluation.get("normalized_value", "")).strip()
+        collected_values = evaluation.get("collected_values", [])
+        assistant_response = str(evaluation.get("assistant_response", "")).strip()
+
+        # NEW: Handle grouped field answers
+        if is_answer_adequate and collected_values and len(related_fields) > 1:
+            # Map collected values to related fields
+            for i, field_key in enumerate(related_fields):
+                if i < len(collected_values):
+                    session.answers[field_key] = collected_values[i]
+                else:
+                    session.answers[field_key] = ""
+            session.missing_fields = session.missing_fields[len(related_fields):]
+            session.updated_at = datetime.now(timezone.utc).isoformat()
+        elif is_answer_adequate and raw_normalized_value:
+            normalized_value = _coerce_value_for_field(current_field_meta, raw_normalized_value)
+            if normalized_value:
+                session.answers[current_field] = normalized_value
+                session.missing_fields = session.missing_fields[1:]
+                session.updated_at = datetime.now(timezone.utc).isoformat()
+            else:
+                is_answer_adequate = False
 
-    intent = str(evaluation.get("intent", "clarification"))
-    is_answer_adequate = bool(evaluation.get("is_answer_adequate", False))
-    raw_normalized_value = str(evaluation.get("normalized_value", "")).strip()
-    collected_values = evaluation.get("collected_values", [])
-    assistant_response = str(evaluation.get("assistant_response", "")).strip()
-
-    # NEW: Handle grouped field answers
-    if is_answer_adequate and collected_values and len(related_fields) > 1:
-        # Map collected values to related fields
-        for i, field_key in enumerate(related_fields):
-            if i < len(collected_values):
-                session.answers[field_key] = collected_values[i]
+        if is_answer_adequate:
+            if session.completed:
+                if not assistant_response:
+                    assistant_response = copy["completed_generating"]
             else:
-                session.answers[field_key] = ""
-        session.missing_fields = session.missing_fields[len(related_fields):]
-        session.updated_at = datetime.now(timezone.utc).isoformat()
-    elif is_answer_adequate and raw_normalized_value:
-        normalized_value = _coerce_value_for_field(current_field_meta, raw_normalized_value)
-        if normalized_value:
-            session.answers[current_field] = normalized_value
-            session.missing_fields = session.missing_fields[1:]
-            session.updated_at = datetime.now(timezone.utc).isoformat()
+                next_field = session.current_field or "the next field"
+                next_field_meta = _field_meta_for(session, next_field)
+                assistant_response = assistant_response or _build_next_field_prompt(next_field_meta, session.language_code)
         else:
-            is_answer_adequate = False
-
-    if is_answer_adequate:
-        if session.completed:
+            session.updated_at = datetime.now(timezone.utc).isoformat()
             if not assistant_response:
-                assistant_response = copy["completed_generating"]
-        else:
-            next_field = session.current_field or "the next field"
-            next_field_meta = _field_meta_for(session, next_field)
-            assistant_response = assistant_response or _build_next_field_prompt(next_field_meta, session.language_code)
-    else:
-        session.updated_at = datetime.now(timezone.utc).isoformat()
-        if not assistant_response:
-            if intent == "barge_in":
-                assistant_response = f'{copy["barge_in_prefix"]}{_build_field_question(current_field_meta, session.language_code)}'
-            else:
-                assistant_response = copy["still_need"].format(
-                    label=current_label,
-                    question=_build_field_question(current_field_meta, session.language_code),
-                )
-
-    logger.info(
-        "Interview turn evaluated agent_id=%s session_id=%s intent=%s adequate=%s completed=%s next_field=%s",
-        agent_id,
-        session.session_id,
-        intent,
-        is_answer_adequate,
-        session.completed,
-        session.current_field,
-    )
+                if intent == "barge_in":
+                    assistant_response = f'{copy["barge_in_prefix"]}{_build_field_question(current_field_meta, session.language_code)}'
+                else:
+                    assistant_response = copy["still_need"].format(
+                        label=current_label,
+                        question=_build_field_question(current_field_meta, session.language_code),
+                    )
+
+        logger.info(
+            "Interview turn evaluated agent_id=%s session_id=%s intent=%s adequate=%s completed=%s next_field=%s",
+            agent_id,
+            session.session_id,
+            intent,
+            is_answer_adequate,
+            session.completed,
+            session.current_field,
+        )
 
-    return {
-        "session_id": session.session_id,
-        "completed": session.completed,
-        "current_field": session.current_field,
-        "missing_fields": session.missing_fields,
-        "answers": session.answers,
-        "language_code": session.language_code,
-        "language_label": session.language_label,
-        "intent": intent,
-        "is_answer_adequate": is_answer_adequate,
-        "assistant_response": assistant_response,
-    }
+        return {
+            "session_id": session.session_id,
+            "completed": session.completed,
+            "current_field": session.current_field,
+            "missing_fields": list(session.missing_fields),
+            "answers": dict(session.answers),
+            "language_code": session.language_code,
+            "language_label": session.language_label,
+            "intent": intent,
+            "is_answer_adequate": is_answer_adequate,
+            "assistant_response": assistant_response,
+        }
 
 
 def _attach_completion_artifacts(*, session: InterviewSession, result: dict) -> dict:
+    """Queue finalization for a completed session; the PDF URLs arrive via the status URL or ``pdf_ready``."""
     if not result.get("completed"):
         return result
-
-    agent = get_agent(session.agent_id)
-    if not agent:
-        logger.warning("Could not finalize completed session %s because agent was not found.", session.session_id)
-        return result
-
     try:
-        artifacts = _finalize_completed_interview(session=session, agent=agent)
-        result.update(artifacts)
+        completion = enqueue_completion(
+            session_id=session.session_id,
+            agent_id=session.agent_id,
+            answers=dict(session.answers),
+            language_code=session.language_code,
+            language_label=session.language_label,
+        )
     except Exception as exc:
-        logger.exception("Failed to finalize completed interview session %s: %s", session.session_id, exc)
+        logger.exception("Failed to queue completion for interview session %s: %s", session.session_id, exc)
+        return result
+    result["completion_status"] = completion["status"]
+    result["completion_status_url"] = completion["status_url"]
+    for key in ("download_url", "pdf_preview_url"):
+        if completion.get(key):
+            result[key] = completion[key]
     return result
 
 
-def _synthesize_with_elevenlabs(text: str) -> tuple[bytes, str]:
+@contextmanager
+def _stage_timer(timings: dict[str, float], stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def _timed_stage(timings: dict[str, float], stage: str, func, *args, **kwargs):
+    with _stage_timer(timings, stage):
+        return func(*args, **kwargs)
+
+
+def _split_first_sentence(text: str) -> tuple[str, str]:
+    """Split off the first spoken sentence so its audio can be requested early."""
+    clean = str(text or "").strip()
+    match = re.search(r"[.!?](?=\s)|[。！？]", clean)
+    if not match or match.end() >= len(clean):
+        return clean, ""
+    return clean[: match.end()].strip(), clean[match.end() :].strip()
+
+
+def _synthesize_with_elevenlabs(text: str, cancel_token: CancellationToken | None = None) -> tuple[bytes, str]:
     api_key = os.getenv("ELEVENLABS_API_KEY", "").strip()
     voice_id = os.getenv("ELEVENLABS_VOICE_ID", "").strip()
     tts_model = os.getenv("ELEVENLABS_TTS_MODEL", "eleven_flash_v2_5").strip()
@@ -1095,16 +1012,106 @@ def _synthesize_with_elevenlabs(text: str) -> tuple[bytes, str]:
             "model_id": tts_model,
         },
         timeout=25,
+        stream=cancel_token is not None,
     )
 
     if not response.ok:
         logger.error("ElevenLabs TTS failed status=%s body=%s", response.status_code, response.text[:400])
         raise RuntimeError("ElevenLabs TTS request failed.")
 
-    return response.content, "audio/mpeg"
+    if cancel_token is None:
+        return response.content, "audio/mpeg"
+
+    chunks: list[bytes] = []
+    with response:
+        for chunk in response.iter_content(chunk_size=16384):
+            # Closing the response mid-body stops the synthesis download for a superseded turn.
+            cancel_token.raise_if_cancelled()
+            chunks.append(chunk)
+    return b"".join(chunks), "audio/mpeg"
+
+
+def _read_turn_audio_request() -> tuple[dict, TurnAudio | None]:
+    """Locate the turn audio without buffering it: raw audio bodies or a multipart 'audio' part."""
+    if request.mimetype.startswith("audio/") or request.mimetype == "application/octet-stream":
+        # Raw bodies are relayed to STT while the client is still sending.
+        content_type = request.mimetype if request.mimetype.startswith("audio/") else "audio/webm"
+        return request.args, TurnAudio(stream=request.stream, filename="turn_audio.webm", content_type=content_type)
+    audio_file = request.files.get("audio")
+    if not audio_file:
+        return request.form, None
+    return request.form, TurnAudio(
+        stream=audio_file.stream,
+        filename=audio_file.filename or "turn_audio.webm",
+        content_type=audio_file.mimetype or "audio/webm",
+    )
+
+
+def _iter_audio_chunks(stream, max_bytes: int = MAX_TURN_AUDIO_BYTES) -> Iterator[bytes]:
+    total = 0
+    while True:
+        chunk = stream.read(AUDIO_UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise AudioTooLargeError(f"Turn audio exceeds the {max_bytes} byte limit.")
+        yield chunk
+
+
+def _open_audio_chunks(turn_audio: TurnAudio) -> Iterator[bytes] | None:
+    """Return the chunk iterator, or None when the upload is empty."""
+    if MAX_TURN_AUDIO_BYTES and (request.content_length or 0) > MAX_TURN_AUDIO_BYTES + AUDIO_UPLOAD_CHUNK_BYTES:
+        raise AudioTooLargeError(f"Turn audio exceeds the {MAX_TURN_AUDIO_BYTES} byte limit.")
+    chunks = _iter_audio_chunks(turn_audio.stream)
+    first = next(chunks, b"")
+    if not first:
+        return None
+    return chain([first], chunks)
+
+
+def _multipart_stream(*, fields: dict[str, str], filename: str, content_type: str, chunks, boundary: str) -> Iterator[bytes]:
+    for name, value in fields.items():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode("utf-8")
+    yield (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    yield from chunks
+    yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+
+def _transcribe_turn_audio(
+    *, turn_audio: TurnAudio, audio_chunks: Iterator[bytes], language_code: str, timings: dict[str, float]
+) -> str:
+    content_type = turn_audio.content_type
+    filename = turn_audio.filename
+    # Peek at the first chunk so WAV sent as application/octet-stream is still recognised by its header.
+    head = next(audio_chunks, b"")
+    audio_chunks = chain([head], audio_chunks)
+    payload = audio_chunks
+    if ENABLE_STT_PREPROCESSING and (is_wav_upload(content_type, head) or filename.lower().endswith(".wav")):
+        # PCM has to be decoded in full to find trailing silence; compressed uploads keep streaming.
+        with _stage_timer(timings, "preprocess"):
+            payload = preprocess_wav(b"".join(audio_chunks))
+        content_type = "audio/wav"
+        filename = "turn_audio.wav"
+    with _stage_timer(timings, "stt"):
+        return _transcribe_with_elevenlabs(
+            audio_chunks=payload,
+            filename=filename,
+            content_type=content_type,
+            language_code=language_code,
+        )
 
 
-def _transcribe_with_elevenlabs(*, audio_bytes: bytes, filename: str, content_type: str, language_code: str = "") -> str:
+def _transcribe_with_elevenlabs(*, audio_chunks, filename: str, content_type: str, language_code: str = "") -> str:
+    """Transcribe audio; ``audio_chunks`` is bytes or an iterable of bytes streamed as the upload body."""
     api_key = os.getenv("ELEVENLABS_API_KEY", "").strip()
     stt_model = os.getenv("ELEVENLABS_STT_MODEL", "scribe_v1").strip()
     fallback_language_code = os.getenv("ELEVENLABS_STT_LANGUAGE", "").strip()
@@ -1117,11 +1124,20 @@ def _transcribe_with_elevenlabs(*, audio_bytes: bytes, filename: str, content_ty
     if selected_language_code:
         data["language_code"] = selected_language_code
 
+    if isinstance(audio_chunks, (bytes, bytearray)):
+        audio_chunks = [bytes(audio_chunks)]
+    boundary = uuid.uuid4().hex
+    # A generator body is sent with chunked transfer encoding, so nothing is held in full.
     response = requests.post(
         f"{ELEVENLABS_API_BASE}/speech-to-text",
-        headers={"xi-api-key": api_key},
-        files={"file": (filename, audio_bytes, content_type)},
-        data=data,
+        headers={"xi-api-key": api_key, "Content-Type": f"multipart/form-data; boundary={boundary}"},
+        data=_multipart_stream(
+            fields=data,
+            filename=filename,
+            content_type=content_type,
+            chunks=audio_chunks,
+            boundary=boundary,
+        ),
         timeout=40,
     )
 
@@ -1144,7 +1160,10 @@ def start_interview(agent_id: str) -> tuple:
     has_interview_fields = isinstance(schema.get("interview_fields"), list) and bool(schema.get("interview_fields"))
     field_meta = _build_field_meta(schema)
     if not has_interview_fields:
-        rebuilt_meta = _build_field_meta_from_pdf(str(agent.get("pdf_path", "") or ""))
+        try:
+            rebuilt_meta = run_pdf_job(_build_field_meta_from_pdf, str(agent.get("pdf_path", "") or ""))
+        except PdfEngineBusy:
+            return jsonify({"error": "PDF engine is busy. Please retry shortly.", "code": "PDF_ENGINE_BUSY"}), 503
         if rebuilt_meta:
             field_meta = rebuilt_meta
     if not field_meta:
@@ -1173,7 +1192,7 @@ def start_interview(agent_id: str) -> tuple:
     )
     session.created_at = datetime.now(timezone.utc).isoformat()
     SESSIONS[session_id] = session
-    save_session_start(session_id, agent_id, session.created_at)
+    save_session_start(session_id, agent["agent_id"], session.created_at)
 
     if ENABLE_LABEL_LOCALIZATION and _should_localize_labels(session.language_code):
         try:
@@ -1221,6 +1240,14 @@ def start_interview(agent_id: str) -> tuple:
 
 # Add this function after _finalize_completed_interview (around line 700):
 
+def _begin_turn(session: InterviewSession) -> CancellationToken:
+    """Cancel whatever the session was still doing and hand out a token for the new turn."""
+    with SESSION_TURN_LOCK:
+        session.cancel_token.cancel()
+        session.cancel_token = CancellationToken()
+        return session.cancel_token
+
+
 def _require_session(agent_id: str, session_id: str) -> InterviewSession | tuple:
     """Validate and return session, or return error tuple"""
     if not session_id:
@@ -1253,18 +1280,22 @@ def process_interview_turn(agent_id: str) -> tuple:
         if isinstance(session_or_error, tuple):
             return session_or_error
         session = session_or_error
+        cancel_token = _begin_turn(session)
 
         result = _evaluate_and_update_session(
             agent_id=agent_id,
             session=session,
             user_input=user_input,
             was_interruption=was_interruption,
+            cancel_token=cancel_token,
         )
         result = _attach_completion_artifacts(session=session, result=result)
         return (
             jsonify(result),
             200,
         )
+    except OperationCancelled:
+        return jsonify({"error": "Turn was superseded by a newer turn.", "code": "TURN_CANCELLED"}), 409
     except GeminiAuthError as exc:
         logger.warning("Interview turn blocked by Gemini auth issue: %s", exc)
         return jsonify({"error": str(exc), "code": "GEMINI_AUTH"}), 502
@@ -1308,57 +1339,146 @@ def speak_text(agent_id: str) -> tuple:
         return jsonify({"error": "Failed to synthesize assistant speech.", "code": "ELEVENLABS_TTS"}), 502
 
 
+def _no_emit(event: str, data: dict) -> None:
+    return None
+
+
+def _state_delta(*, session: InterviewSession, previous_answers: dict[str, str]) -> dict:
+    changed = {key: value for key, value in session.answers.items() if previous_answers.get(key) != value}
+    return {
+        "answers": changed,
+        "current_field": session.current_field,
+        "remaining_fields": len(session.missing_fields),
+        "completed": session.completed,
+    }
+
+
+def _run_spoken_turn(
+    *,
+    agent_id: str,
+    session: InterviewSession,
+    user_input: str,
+    was_interruption: bool,
+    timings: dict[str, float],
+    emit=_no_emit,
+    cancel_token: CancellationToken | None = None,
+    stream_sentences: bool = False,
+) -> dict:
+    """Evaluate a turn, then fan out completion and TTS; progress is reported through ``emit``.
+
+    With ``stream_sentences`` the first sentence is synthesized separately so an event-stream
+    client can start playing it early. Plain HTTP callers only see the joined audio, so they
+    get a single TTS request and unbroken prosody.
+    """
+    previous_answers = dict(session.answers)
+    with _stage_timer(timings, "evaluate"):
+        result = _evaluate_and_update_session(
+            agent_id=agent_id,
+            session=session,
+            user_input=user_input,
+            was_interruption=was_interruption,
+            cancel_token=cancel_token,
+        )
+    emit("state", _state_delta(session=session, previous_answers=previous_answers))
+
+    # Finalization runs as a background job that announces itself with ``pdf_ready``;
+    # streamed TTS chunks run concurrently, so the tail of the turn costs the slower one.
+    result = _attach_completion_artifacts(session=session, result=result)
+
+    assistant_response = str(result.get("assistant_response", "")).strip()
+    if stream_sentences:
+        sentences = [text for text in _split_first_sentence(assistant_response) if text]
+        stages = ("tts_first_sentence", "tts_remainder")
+    else:
+        sentences = [assistant_response] if assistant_response else []
+        stages = ("tts",)
+    tts_futures = [
+        TURN_PIPELINE_EXECUTOR.submit(_timed_stage, timings, stage, _synthesize_with_elevenlabs, text, cancel_token)
+        for stage, text in zip(stages, sentences)
+    ]
+
+    audio_chunks: list[bytes] = []
+    audio_mime_type = ""
+    for index, (text, future) in enumerate(zip(sentences, tts_futures)):
+        emit("assistant_text", {"index": index, "text": text, "final": index == len(sentences) - 1})
+        try:
+            audio, audio_mime_type = future.result()
+        except OperationCancelled:
+            # The answers are already applied; a newer turn only silences this one.
+            result["audio_cancelled"] = True
+            break
+        audio_chunks.append(audio)
+        emit(
+            "audio",
+            {
+                "index": index,
+                "audio_mime_type": audio_mime_type,
+                "audio_base64": base64.b64encode(audio).decode("ascii"),
+                "final": index == len(sentences) - 1,
+            },
+        )
+
+    # MPEG frames concatenate cleanly, so the chunks play back as one clip.
+    result["audio_mime_type"] = audio_mime_type
+    result["audio_base64"] = base64.b64encode(b"".join(audio_chunks)).decode("ascii") if audio_chunks else ""
+    return result
+
+
 @interview_bp.post("/agent/<agent_id>/interview/turn-audio")
 def process_interview_turn_audio(agent_id: str) -> tuple:
     try:
-        session_id = str(request.form.get("session_id", "")).strip()
-        was_interruption = str(request.form.get("was_interruption", "false")).strip().lower() == "true"
-        audio_file = request.files.get("audio")
+        params, turn_audio = _read_turn_audio_request()
+        session_id = str(params.get("session_id", "")).strip()
+        was_interruption = str(params.get("was_interruption", "false")).strip().lower() == "true"
 
         if not session_id:
             return jsonify({"error": "Missing session_id"}), 400
-        if not audio_file:
+        if not turn_audio:
             return jsonify({"error": "Missing audio file"}), 400
 
         session_or_error = _require_session(agent_id, session_id)
         if isinstance(session_or_error, tuple):
             return session_or_error
         session = session_or_error
+        cancel_token = _begin_turn(session)
 
-        audio_bytes = audio_file.read()
-        if not audio_bytes:
+        timings: dict[str, float] = {}
+        turn_started = time.perf_counter()
+
+        audio_chunks = _open_audio_chunks(turn_audio)
+        if audio_chunks is None:
             return jsonify({"error": "Uploaded audio is empty"}), 400
 
-        transcript = _transcribe_with_elevenlabs(
-            audio_bytes=audio_bytes,
-            filename=audio_file.filename or "turn_audio.webm",
-            content_type=audio_file.mimetype or "audio/webm",
+        transcript = _transcribe_turn_audio(
+            turn_audio=turn_audio,
+            audio_chunks=audio_chunks,
             language_code=session.language_code,
+            timings=timings,
         )
         if not transcript:
             return jsonify({"error": "No speech detected in audio. Please try again."}), 400
+        cancel_token.raise_if_cancelled()
 
-        result = _evaluate_and_update_session(
+        result = _run_spoken_turn(
             agent_id=agent_id,
             session=session,
             user_input=transcript,
             was_interruption=was_interruption,
+            timings=timings,
+            cancel_token=cancel_token,
         )
-        result = _attach_completion_artifacts(session=session, result=result)
-
-        assistant_response = str(result.get("assistant_response", "")).strip()
-        audio_mime_type = ""
-        audio_base64 = ""
-        if assistant_response:
-            tts_audio, audio_mime_type = _synthesize_with_elevenlabs(assistant_response)
-            audio_base64 = base64.b64encode(tts_audio).decode("ascii")
+        timings["total"] = round((time.perf_counter() - turn_started) * 1000, 1)
+        logger.info("Interview audio turn timings session_id=%s timings_ms=%s", session.session_id, timings)
 
         result["user_transcript"] = transcript
-        result["audio_mime_type"] = audio_mime_type
-        result["audio_base64"] = audio_base64
         result["language_code"] = session.language_code
         result["language_label"] = session.language_label
+        result["timings_ms"] = timings
         return jsonify(result), 200
+    except AudioTooLargeError as exc:
+        return jsonify({"error": str(exc), "code": "AUDIO_TOO_LARGE"}), 413
+    except OperationCancelled:
+        return jsonify({"error": "Turn was superseded by a newer turn.", "code": "TURN_CANCELLED"}), 409
     except GeminiAuthError as exc:
         logger.warning("Interview audio turn blocked by Gemini auth issue: %s", exc)
         return jsonify({"error": str(exc), "code": "GEMINI_AUTH"}), 502
@@ -1371,3 +1491,158 @@ def process_interview_turn_audio(agent_id: str) -> tuple:
     except Exception as exc:
         logger.exception("Interview audio turn processing failed: %s", exc)
         return jsonify({"error": "Failed to process interview audio turn.", "code": "ELEVENLABS_OR_PIPELINE"}), 502
+
+
+def _session_snapshot(session: InterviewSession) -> dict:
+    return {
+        "session_id": session.session_id,
+        "current_field": session.current_field,
+        "missing_fields": session.missing_fields,
+        "answers": session.answers,
+        "completed": session.completed,
+        "language_code": session.language_code,
+        "language_label": session.language_label,
+    }
+
+
+@interview_bp.get("/agent/<agent_id>/interview/<session_id>/events")
+def interview_events(agent_id: str, session_id: str):
+    session_or_error = _require_session(agent_id, session_id)
+    if isinstance(session_or_error, tuple):
+        return session_or_error
+    session = session_or_error
+
+    channel = session_events.subscribe(session_id)
+    # The full state is sent once per connection; turns afterwards only push deltas.
+    snapshot = session_events.make_message("snapshot", _session_snapshot(session))
+
+    def stream():
+        try:
+            yield session_events.format_sse(snapshot)
+            while True:
+                try:
+                    message = channel.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield session_events.format_sse(message)
+        finally:
+            session_events.unsubscribe(session_id, channel)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@interview_bp.post("/agent/<agent_id>/interview/<session_id>/cancel")
+def cancel_interview_turn(agent_id: str, session_id: str) -> tuple:
+    """Barge-in hook: abort in-flight evaluation/TTS before the next turn is uploaded."""
+    session_or_error = _require_session(agent_id, session_id)
+    if isinstance(session_or_error, tuple):
+        return session_or_error
+    _begin_turn(session_or_error)
+    return jsonify({"session_id": session_id, "cancelled": True}), 200
+
+
+@interview_bp.get("/agent/<agent_id>/interview/<session_id>/completion")
+def interview_completion_status(agent_id: str, session_id: str) -> tuple:
+    """Status of a completed session's finalization; backed by SQLite, so it outlives the in-memory session."""
+    job = get_completion_job(session_id)
+    if not job or job["payload"]["agent_id"].lower() != agent_id.lower():
+        return jsonify({"error": "Completion job not found."}), 404
+    return jsonify(public_status(job)), 200
+
+
+@interview_bp.post("/agent/<agent_id>/interview/<session_id>/turns")
+def process_channel_turn(agent_id: str, session_id: str) -> tuple:
+    """Turn submission for clients listening on the events channel; replies with a compact delta."""
+    session_or_error = _require_session(agent_id, session_id)
+    if isinstance(session_or_error, tuple):
+        return session_or_error
+    session = session_or_error
+
+    def emit(event: str, data: dict) -> None:
+        session_events.publish(session_id, event, data)
+
+    try:
+        cancel_token = _begin_turn(session)
+        timings: dict[str, float] = {}
+        turn_started = time.perf_counter()
+        params, turn_audio = _read_turn_audio_request()
+        if turn_audio:
+            was_interruption = str(params.get("was_interruption", "false")).strip().lower() == "true"
+            audio_chunks = _open_audio_chunks(turn_audio)
+            if audio_chunks is None:
+                return jsonify({"error": "Uploaded audio is empty"}), 400
+            user_input = _transcribe_turn_audio(
+                turn_audio=turn_audio,
+                audio_chunks=audio_chunks,
+                language_code=session.language_code,
+                timings=timings,
+            )
+            if not user_input:
+                return jsonify({"error": "No speech detected in audio. Please try again."}), 400
+        else:
+            data = request.get_json(silent=True)
+            if data is None or not isinstance(data, dict):
+                return jsonify({"error": "Invalid or missing JSON body"}), 400
+            user_input = str(data.get("user_input", "")).strip()
+            was_interruption = bool(data.get("was_interruption", False))
+            if not user_input:
+                return jsonify({"error": "Missing user_input"}), 400
+
+        cancel_token.raise_if_cancelled()
+        emit("transcript", {"text": user_input})
+        previous_answers = dict(session.answers)
+        result = _run_spoken_turn(
+            agent_id=agent_id,
+            session=session,
+            user_input=user_input,
+            was_interruption=was_interruption,
+            timings=timings,
+            emit=emit,
+            cancel_token=cancel_token,
+            stream_sentences=True,
+        )
+        timings["total"] = round((time.perf_counter() - turn_started) * 1000, 1)
+        emit("turn_done", {"timings_ms": timings})
+
+        payload = {
+            "intent": result.get("intent"),
+            "is_answer_adequate": result.get("is_answer_adequate"),
+            "user_transcript": user_input,
+            "assistant_response": result.get("assistant_response", ""),
+            "state": _state_delta(session=session, previous_answers=previous_answers),
+            "timings_ms": timings,
+        }
+        for key in ("completion_status", "completion_status_url", "download_url", "pdf_preview_url"):
+            if result.get(key):
+                payload[key] = result[key]
+        if not session_events.has_subscribers(session_id):
+            # Nobody received the audio events, so fall back to returning the clip inline.
+            payload["audio_mime_type"] = result.get("audio_mime_type", "")
+            payload["audio_base64"] = result.get("audio_base64", "")
+        return jsonify(payload), 200
+    except AudioTooLargeError as exc:
+        emit("error", {"error": str(exc), "code": "AUDIO_TOO_LARGE"})
+        return jsonify({"error": str(exc), "code": "AUDIO_TOO_LARGE"}), 413
+    except OperationCancelled:
+        return jsonify({"error": "Turn was superseded by a newer turn.", "code": "TURN_CANCELLED"}), 409
+    except GeminiAuthError as exc:
+        logger.warning("Interview channel turn blocked by Gemini auth issue: %s", exc)
+        emit("error", {"error": str(exc), "code": "GEMINI_AUTH"})
+        return jsonify({"error": str(exc), "code": "GEMINI_AUTH"}), 502
+    except GeminiRateLimitError as exc:
+        logger.warning("Interview channel turn blocked by Gemini rate limit: %s", exc)
+        emit("error", {"error": str(exc), "code": "GEMINI_RATE_LIMIT"})
+        return jsonify({"error": str(exc), "code": "GEMINI_RATE_LIMIT"}), 429
+    except GeminiRequestError as exc:
+        logger.warning("Interview channel turn failed due to Gemini request issue: %s", exc)
+        emit("error", {"error": str(exc), "code": "GEMINI_REQUEST"})
+        return jsonify({"error": str(exc), "code": "GEMINI_REQUEST"}), 502
+    except Exception as exc:
+        logger.exception("Interview channel turn processing failed: %s", exc)
+        emit("error", {"error": "Failed to process interview turn.", "code": "ELEVENLABS_OR_PIPELINE"})
+        return jsonify({"error": "Failed to process interview turn.", "code": "ELEVENLABS_OR_PIPELINE"}), 502
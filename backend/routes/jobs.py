@@ -0,0 +1,33 @@
+from flask import Blueprint, jsonify, request
+
+from jobs import get_job_status, public_job, requeue_job
+from storage import list_jobs
+
+jobs_bp = Blueprint("jobs", __name__)
+
+JOB_STATUSES = {"queued", "running", "succeeded", "dead"}
+
+
+@jobs_bp.get("/jobs/<job_id>")
+def job_status(job_id: str) -> tuple:
+    job = get_job_status(job_id)
+    if not job:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job), 200
+
+
+@jobs_bp.get("/admin/jobs")
+def jobs_list() -> tuple:
+    status = str(request.args.get("status", "")).strip().lower()
+    if status and status not in JOB_STATUSES:
+        return jsonify({"error": f"status must be one of: {', '.join(sorted(JOB_STATUSES))}"}), 400
+    limit = min(max(request.args.get("limit", 100, type=int) or 100, 1), 500)
+    return jsonify({"jobs": [public_job(job) for job in list_jobs(status, limit)]}), 200
+
+
+@jobs_bp.post("/admin/jobs/<job_id>/retry")
+def job_retry(job_id: str) -> tuple:
+    """Requeue a dead-lettered job with a fresh set of attempts."""
+    if not requeue_job(job_id):
+        return jsonify({"error": "Only dead jobs can be retried."}), 409
+    return jsonify(get_job_status(job_id)), 200
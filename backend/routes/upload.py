@@ -1,23 +1,53 @@
+import hashlib
 import logging
+import os
 import uuid
 import fitz
 import re
-from urllib.parse import unquote
+from dataclasses import dataclass
+from pathlib import Path
 from flask import Blueprint, jsonify, request
-from werkzeug.utils import secure_filename
-from storage import UPLOAD_DIR, save_agent
+from form_index import build_form_index, decode_pdf_token, extract_widget_options
+from jobs import JobFailed, enqueue_job, register_job_handler
+from label_index import build_label_index
+from pdf_engine import PdfEngineBusy, run_pdf_job
+from storage import (
+    UPLOAD_DIR,
+    acquire_template,
+    get_agent,
+    get_job,
+    get_template_schema,
+    release_template,
+    save_agent,
+    save_template_schema,
+)
 
 upload_bp = Blueprint("upload", __name__)
 logger = logging.getLogger(__name__)
 
+# 0 disables the cap, like the other byte limits.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)) or 0)
+UPLOAD_CHUNK_BYTES = 256 * 1024
+# "sync" parses inside the request; "async" returns 202 with a job id. Overridable per request with ?mode=.
+UPLOAD_INGEST_MODE = os.getenv("UPLOAD_INGEST_MODE", "sync").strip().lower() or "sync"
+UPLOAD_JOB_KIND = "upload.ingest"
+# Background ingestion reports the queue's states in the upload API's own vocabulary.
+UPLOAD_JOB_STATUSES = {"queued": "queued", "running": "parsing", "succeeded": "succeeded", "dead": "failed"}
 
-def _decode_pdf_token(value: str) -> str:
-    if not value:
-        return ""
-    text = unquote(str(value))
-    # Some PDFs encode spaces as '#20' in widget values.
-    text = re.sub(r"#([0-9A-Fa-f]{2})", lambda m: bytes.fromhex(m.group(1)).decode("latin1"), text)
-    return " ".join(text.split()).strip()
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class UploadRejectedError(ValueError):
+    pass
+
+
+@dataclass
+class UploadSource:
+    stream: object
+    filename: str
+    agent_name: str
 
 
 def _humanize_label(text: str) -> str:
@@ -34,9 +64,9 @@ def _humanize_label(text: str) -> str:
 
 
 def _clean_label(label: str, fallback: str) -> str:
-    text = _decode_pdf_token(label or "")
+    text = decode_pdf_token(label or "")
     if not text:
-        text = _decode_pdf_token(fallback)
+        text = decode_pdf_token(fallback)
     # Remove verbose Acrobat date helper suffix for cleaner spoken prompts.
     marker = "Type in the date or use the arrow keys to select a date."
     if marker in text:
@@ -44,154 +74,276 @@ def _clean_label(label: str, fallback: str) -> str:
     text = text.rstrip(":;,. ").strip()
     if text.lower() in {"i, full name", "i full name"}:
         text = "Full name"
-    return _humanize_label(text or _decode_pdf_token(fallback))
+    return _humanize_label(text or decode_pdf_token(fallback))
 
 
-def _extract_widget_options(widget) -> list[str]:
-    options: list[str] = []
+def _parse_template(pdf_path: str) -> tuple[list[str], list[dict], dict, dict]:
+    """Extract widget names, interview fields, the compiled form index and field labels from an uploaded PDF."""
+    widget_names: list[str] = []
     seen = set()
+    interview_fields: list[dict] = []
+    fields_by_key: dict[str, dict] = {}
+    with fitz.open(pdf_path) as document:
+        form_index = build_form_index(document)
+        label_index = build_label_index(document)
+        for page_index, page in enumerate(document):
+            widgets = page.widgets() or []
+            for widget in widgets:
+                name = (widget.field_name or "").strip()
+                if name and name not in seen:
+                    seen.add(name)
+                    widget_names.append(name)
 
-    raw_choices = getattr(widget, "choice_values", None)
-    if callable(raw_choices):
-        raw_choices = raw_choices()
-    raw_choices = raw_choices or []
-    for choice in raw_choices:
-        item = _decode_pdf_token(str(choice))
-        if item and item.lower() != "off" and item not in seen:
-            seen.add(item)
-            options.append(item)
-
-    button_states = getattr(widget, "button_states", None)
-    if callable(button_states):
-        button_states = button_states()
-    button_states = button_states or {}
-    if not isinstance(button_states, dict):
-        button_states = {}
-    for state_values in button_states.values():
-        for value in state_values or []:
-            item = _decode_pdf_token(str(value))
-            if item and item.lower() != "off" and item not in seen:
-                seen.add(item)
-                options.append(item)
-
-    on_state = getattr(widget, "on_state", "")
-    if callable(on_state):
-        on_state = on_state()
-    on_state = _decode_pdf_token(str(on_state or ""))
-    if on_state and on_state.lower() != "off" and on_state not in seen:
-        options.append(on_state)
-
-    return options
+                if not name:
+                    continue
 
+                field_key = name.strip()
+                field_type = (getattr(widget, "field_type_string", None) or "Text").strip() or "Text"
+                field_label = _clean_label(getattr(widget, "field_label", None) or "", field_key)
+                field_options = extract_widget_options(widget)
+
+                item = fields_by_key.get(field_key)
+                if not item:
+                    rect = getattr(widget, "rect", None)
+                    item = {
+                        "key": field_key,
+                        "label": field_label,
+                        "type": field_type,
+                        "options": [],
+                        "page": page_index + 1,
+                        "rect": (
+                            {
+                                "x0": float(rect.x0),
+                                "y0": float(rect.y0),
+                                "x1": float(rect.x1),
+                                "y1": float(rect.y1),
+                            }
+                            if rect is not None
+                            else None
+                        ),
+                        "page_size": {
+                            "width": float(page.rect.width),
+                            "height": float(page.rect.height),
+                        },
+                    }
+                    fields_by_key[field_key] = item
+                    interview_fields.append(item)
+                elif not item.get("label") and field_label:
+                    item["label"] = field_label
+
+                existing_options = set(item.get("options", []))
+                for option in field_options:
+                    if option not in existing_options:
+                        item["options"].append(option)
+                        existing_options.add(option)
+
+    # Add explicit boolean choices for standalone checkboxes.
+    for item in interview_fields:
+        if item.get("type") == "CheckBox" and not item.get("options"):
+            item["options"] = ["Yes", "No"]
+    return widget_names, interview_fields, form_index, label_index
+
+
+def _spool_upload(stream, destination: Path, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[int, str]:
+    """Copy an upload stream to disk in chunks, enforcing the size limit as bytes arrive.
+
+    Returns the byte count and the SHA-256 of the contents, hashed on the same pass.
+    """
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with destination.open("wb") as handle:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes and written > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes.")
+                digest.update(chunk)
+                handle.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return written, digest.hexdigest()
+
+
+def _read_upload_request() -> UploadSource | tuple:
+    """Accept a multipart ``file`` field or a raw application/pdf body (metadata in the query string)."""
+    content_length = request.content_length
+    if MAX_UPLOAD_BYTES and content_length is not None and content_length > MAX_UPLOAD_BYTES:
+        return jsonify({"error": f"Upload exceeds {MAX_UPLOAD_BYTES} bytes.", "code": "UPLOAD_TOO_LARGE"}), 413
+
+    if request.mimetype == "application/pdf":
+        filename = str(request.args.get("filename", "") or "upload.pdf").strip()
+        agent_name = str(request.args.get("agent_name", "")).strip()
+        return UploadSource(stream=request.stream, filename=filename, agent_name=agent_name)
 
-@upload_bp.post("/admin/upload")
-def upload_pdf() -> tuple:
     if "file" not in request.files:
         return jsonify({"error": "Missing file field. Use form-data key 'file'."}), 400
 
     pdf_file = request.files["file"]
     if not pdf_file.filename:
         return jsonify({"error": "No file selected."}), 400
+    return UploadSource(
+        stream=pdf_file.stream,
+        filename=pdf_file.filename,
+        agent_name=str(request.form.get("agent_name", "")).strip(),
+    )
 
-    if not pdf_file.filename.lower().endswith(".pdf"):
-        return jsonify({"error": "Only PDF files are supported."}), 400
-    agent_name = str(request.form.get("agent_name", "")).strip()
+
+def _template_schema(*, sha256: str, pdf_path: Path, filename: str) -> dict:
+    """Parsed schema for a template, reused from the template store when the same file was seen before."""
+    schema = get_template_schema(sha256)
+    if schema is not None:
+        return schema
 
     try:
-        file_bytes = pdf_file.read()
-        widget_names: list[str] = []
-        seen = set()
-        interview_fields: list[dict] = []
-        fields_by_key: dict[str, dict] = {}
-        with fitz.open(stream=file_bytes, filetype="pdf") as document:
-            for page_index, page in enumerate(document):
-                widgets = page.widgets() or []
-                for widget in widgets:
-                    name = (widget.field_name or "").strip()
-                    if name and name not in seen:
-                        seen.add(name)
-                        widget_names.append(name)
-
-                    if not name:
-                        continue
-
-                    field_key = name.strip()
-                    field_type = (getattr(widget, "field_type_string", None) or "Text").strip() or "Text"
-                    field_label = _clean_label(getattr(widget, "field_label", None) or "", field_key)
-                    field_options = _extract_widget_options(widget)
-
-                    item = fields_by_key.get(field_key)
-                    if not item:
-                        rect = getattr(widget, "rect", None)
-                        item = {
-                            "key": field_key,
-                            "label": field_label,
-                            "type": field_type,
-                            "options": [],
-                            "page": page_index + 1,
-                            "rect": (
-                                {
-                                    "x0": float(rect.x0),
-                                    "y0": float(rect.y0),
-                                    "x1": float(rect.x1),
-                                    "y1": float(rect.y1),
-                                }
-                                if rect is not None
-                                else None
-                            ),
-                            "page_size": {
-                                "width": float(page.rect.width),
-                                "height": float(page.rect.height),
-                            },
-                        }
-                        fields_by_key[field_key] = item
-                        interview_fields.append(item)
-                    elif not item.get("label") and field_label:
-                        item["label"] = field_label
-
-                    existing_options = set(item.get("options", []))
-                    for option in field_options:
-                        if option not in existing_options:
-                            item["options"].append(option)
-                            existing_options.add(option)
-
-        # Add explicit boolean choices for standalone checkboxes.
-        for item in interview_fields:
-            if item.get("type") == "CheckBox" and not item.get("options"):
-                item["options"] = ["Yes", "No"]
+        widget_names, interview_fields, form_index, label_index = run_pdf_job(_parse_template, str(pdf_path))
+    except PdfEngineBusy:
+        raise
     except Exception as exc:
-        logger.exception("Failed to parse uploaded PDF '%s': %s", pdf_file.filename, exc)
-        return jsonify({"error": "Could not parse PDF. Please upload a valid fillable PDF."}), 400
+        logger.exception("Failed to parse uploaded PDF '%s': %s", filename, exc)
+        raise UploadRejectedError("Could not parse PDF. Please upload a valid fillable PDF.") from exc
 
     if not widget_names:
-        return jsonify({"error": "No fillable fields detected."}), 400
-
-    agent_id = uuid.uuid4().hex[:8]
-    safe_name = secure_filename(pdf_file.filename) or "upload.pdf"
-    pdf_path = UPLOAD_DIR / f"{agent_id}_{safe_name}"
-    pdf_path.write_bytes(file_bytes)
+        raise UploadRejectedError("No fillable fields detected.")
 
     schema = {
         "widget_names": widget_names,
         "interview_fields": interview_fields,
         "blank_values": {name: None for name in widget_names},
+        "form_index": form_index,
+        "label_index": label_index,
+    }
+    save_template_schema(sha256, schema)
+    return schema
+
+
+def _upload_result(*, agent_id: str, agent_name: str, filename: str, schema: dict) -> dict:
+    widget_names = schema.get("widget_names", [])
+    return {
+        "filename": filename,
+        "agent_name": agent_name,
+        "fieldCount": len(widget_names),
+        "widgetNames": widget_names,
+        "agent_id": agent_id,
+        "share_url": f"/agent/{agent_id}",
     }
+
+
+def _create_agent(*, agent_id: str, sha256: str, pdf_path: Path, filename: str, agent_name: str) -> dict:
+    schema = _template_schema(sha256=sha256, pdf_path=pdf_path, filename=filename)
     if not agent_name:
-        fallback_name = pdf_file.filename.rsplit(".", 1)[0].strip()
+        fallback_name = filename.rsplit(".", 1)[0].strip()
         agent_name = fallback_name or f"Agent {agent_id}"
-
-    save_agent(agent_id=agent_id, pdf_path=str(pdf_path), schema=schema, agent_name=agent_name)
-
-    return (
-        jsonify(
-            {
-                "filename": pdf_file.filename,
-                "agent_name": agent_name,
-                "fieldCount": len(widget_names),
-                "widgetNames": widget_names,
-                "agent_id": agent_id,
-                "share_url": f"/agent/{agent_id}",
-            }
-        ),
-        200,
+    save_agent(
+        agent_id=agent_id,
+        pdf_path=str(pdf_path),
+        schema=schema,
+        agent_name=agent_name,
+        template_sha256=sha256,
     )
+    return _upload_result(agent_id=agent_id, agent_name=agent_name, filename=filename, schema=schema)
+
+
+def _ingest_uploaded_pdf(*, agent_id: str, sha256: str, pdf_path: Path, filename: str, agent_name: str) -> dict:
+    """Create an agent on an acquired template; releases the template and raises UploadRejectedError on failure."""
+    try:
+        return _create_agent(agent_id=agent_id, sha256=sha256, pdf_path=pdf_path, filename=filename, agent_name=agent_name)
+    except BaseException:
+        release_template(sha256)
+        raise
+
+
+def _run_upload_job(payload: dict) -> dict:
+    """Job handler for background ingestion; transient failures such as a busy engine are retried."""
+    agent = get_agent(payload["agent_id"])
+    if agent:
+        # An earlier attempt saved the agent but did not get to record the result.
+        return _upload_result(
+            agent_id=agent["agent_id"], agent_name=agent["agent_name"], filename=payload["filename"], schema=agent["schema"]
+        )
+    try:
+        return _create_agent(
+            agent_id=payload["agent_id"],
+            sha256=payload["sha256"],
+            pdf_path=Path(payload["pdf_path"]),
+            filename=payload["filename"],
+            agent_name=payload["agent_name"],
+        )
+    except UploadRejectedError as exc:
+        raise JobFailed(str(exc)) from exc
+
+
+def _release_failed_upload(job: dict) -> None:
+    release_template(job["payload"]["sha256"])
+
+
+register_job_handler(UPLOAD_JOB_KIND, _run_upload_job, on_dead=_release_failed_upload)
+
+
+@upload_bp.post("/admin/upload")
+def upload_pdf() -> tuple:
+    upload = _read_upload_request()
+    if isinstance(upload, tuple):
+        return upload
+    filename = upload.filename
+
+    if not filename.lower().endswith(".pdf"):
+        return jsonify({"error": "Only PDF files are supported."}), 400
+
+    mode = str(request.args.get("mode", "") or UPLOAD_INGEST_MODE).strip().lower()
+    if mode not in {"sync", "async"}:
+        return jsonify({"error": "mode must be 'sync' or 'async'"}), 400
+
+    agent_id = uuid.uuid4().hex[:8]
+    spooled_path = UPLOAD_DIR / f".incoming-{agent_id}.pdf"
+    try:
+        written, sha256 = _spool_upload(upload.stream, spooled_path)
+    except UploadTooLargeError as exc:
+        return jsonify({"error": str(exc), "code": "UPLOAD_TOO_LARGE"}), 413
+    if not written:
+        spooled_path.unlink(missing_ok=True)
+        return jsonify({"error": "Uploaded file is empty."}), 400
+
+    # Identical files share one blob and one parsed schema.
+    pdf_path = acquire_template(sha256, spooled_path)
+    ingest_kwargs = {
+        "agent_id": agent_id,
+        "sha256": sha256,
+        "pdf_path": pdf_path,
+        "filename": filename,
+        "agent_name": upload.agent_name,
+    }
+    if mode == "async":
+        job_id = enqueue_job(UPLOAD_JOB_KIND, {**ingest_kwargs, "pdf_path": str(pdf_path)})
+        return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/api/admin/upload/jobs/{job_id}"}), 202
+
+    try:
+        payload = _ingest_uploaded_pdf(**ingest_kwargs)
+    except PdfEngineBusy:
+        return jsonify({"error": "PDF engine is busy. Please retry shortly.", "code": "PDF_ENGINE_BUSY"}), 503
+    except UploadRejectedError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(payload), 200
+
+
+@upload_bp.get("/admin/upload/jobs/<job_id>")
+def upload_job_status(job_id: str) -> tuple:
+    job = get_job(job_id)
+    if not job or job["kind"] != UPLOAD_JOB_KIND:
+        return jsonify({"error": "Upload job not found."}), 404
+    payload = {
+        "job_id": job_id,
+        "status": UPLOAD_JOB_STATUSES.get(job["status"], job["status"]),
+        "filename": job["payload"]["filename"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == "succeeded":
+        payload["result"] = job["result"]
+    elif job["last_error"]:
+        payload["error"] = job["last_error"]
+    return jsonify(payload), 200
@@ -0,0 +1,56 @@
+import json
+import queue
+import threading
+from itertools import count
+
+# Per-session fan-out of interview events to Server-Sent Events subscribers.
+_SUBSCRIBERS: dict[str, list[queue.Queue]] = {}
+_LOCK = threading.Lock()
+_EVENT_IDS = count(1)
+MAX_QUEUED_EVENTS = 256
+
+
+def subscribe(session_id: str) -> queue.Queue:
+    channel: queue.Queue = queue.Queue(maxsize=MAX_QUEUED_EVENTS)
+    with _LOCK:
+        _SUBSCRIBERS.setdefault(session_id, []).append(channel)
+    return channel
+
+
+def unsubscribe(session_id: str, channel: queue.Queue) -> None:
+    with _LOCK:
+        channels = _SUBSCRIBERS.get(session_id, [])
+        if channel in channels:
+            channels.remove(channel)
+        if not channels:
+            _SUBSCRIBERS.pop(session_id, None)
+
+
+def has_subscribers(session_id: str) -> bool:
+    with _LOCK:
+        return bool(_SUBSCRIBERS.get(session_id))
+
+
+def make_message(event: str, data: dict) -> tuple[int, str, dict]:
+    return next(_EVENT_IDS), event, data
+
+
+def publish(session_id: str, event: str, data: dict) -> int:
+    """Queue an event for every open channel of a session; returns the number of receivers."""
+    message = make_message(event, data)
+    with _LOCK:
+        channels = list(_SUBSCRIBERS.get(session_id, []))
+    delivered = 0
+    for channel in channels:
+        try:
+            channel.put_nowait(message)
+            delivered += 1
+        except queue.Full:
+            # A stalled client should not block the interview; it can resync from the next state event.
+            continue
+    return delivered
+
+
+def format_sse(message: tuple[int, str, dict]) -> str:
+    event_id, event, data = message
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -1,19 +1,38 @@
 import json
 import sqlite3
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterator
+
+from quantiles import QuantileSketch
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 UPLOAD_DIR = DATA_DIR / "uploads"
+TEMPLATE_BLOB_DIR = UPLOAD_DIR / "blobs"
 COMPLETED_DIR = DATA_DIR / "completed"
+# Filled PDFs rebuilt on demand for sessions stored without one; safe to evict.
+MATERIALIZED_DIR = COMPLETED_DIR / "materialized"
 DB_PATH = DATA_DIR / "agents.sqlite3"
 
+# Serializes template reference counting with blob creation/removal on disk.
+_TEMPLATE_LOCK = threading.Lock()
+
+# Completion times outside (min, max) seconds are left out of duration aggregates.
+STATS_MIN_DURATION_SECONDS = 5
+STATS_MAX_DURATION_SECONDS = 7200
+# Rows read per query while streaming exports; each page is a separate short read.
+EXPORT_PAGE_SIZE = 500
+
 
 def init_storage() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    TEMPLATE_BLOB_DIR.mkdir(parents=True, exist_ok=True)
     COMPLETED_DIR.mkdir(parents=True, exist_ok=True)
+    MATERIALIZED_DIR.mkdir(parents=True, exist_ok=True)
 
     with sqlite3.connect(DB_PATH) as conn:
         conn.execute(
@@ -33,6 +52,19 @@ def init_storage() -> None:
         }
         if "agent_name" not in columns:
             conn.execute("ALTER TABLE agents ADD COLUMN agent_name TEXT NOT NULL DEFAULT ''")
+        if "template_sha256" not in columns:
+            conn.execute("ALTER TABLE agents ADD COLUMN template_sha256 TEXT NOT NULL DEFAULT ''")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS templates (
+                sha256 TEXT PRIMARY KEY,
+                pdf_path TEXT NOT NULL,
+                schema_json TEXT NOT NULL DEFAULT '',
+                ref_count INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS completed_sessions (
@@ -45,17 +77,469 @@ def init_storage() -> None:
             )
             """
         )
+        session_columns = {
+            row[1]
+            for row in conn.execute("PRAGMA table_info(completed_sessions)").fetchall()
+        }
+        if "template_sha256" not in session_columns:
+            conn.execute("ALTER TABLE completed_sessions ADD COLUMN template_sha256 TEXT NOT NULL DEFAULT ''")
+        if "pdf_storage" not in session_columns:
+            conn.execute("ALTER TABLE completed_sessions ADD COLUMN pdf_storage TEXT NOT NULL DEFAULT 'eager'")
+        if "completed_at" not in session_columns:
+            conn.execute("ALTER TABLE completed_sessions ADD COLUMN completed_at TEXT NOT NULL DEFAULT ''")
+            conn.execute("ALTER TABLE completed_sessions ADD COLUMN duration_seconds REAL NOT NULL DEFAULT 0")
+            conn.execute("ALTER TABLE completed_sessions ADD COLUMN language_code TEXT NOT NULL DEFAULT 'en-US'")
+            conn.execute("ALTER TABLE completed_sessions ADD COLUMN language_label TEXT NOT NULL DEFAULT 'English (US)'")
+            _backfill_session_metadata(conn)
+        renamed_sessions = _canonicalize_session_agent_ids(conn)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_completed_sessions_agent ON completed_sessions (agent_id, completed_at)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_completed_sessions_completed ON completed_sessions (completed_at)")
+        stats_exist = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agent_stats'"
+        ).fetchone()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS agent_stats (
+                agent_id TEXT PRIMARY KEY,
+                completed_count INTEGER NOT NULL DEFAULT 0,
+                duration_sum REAL NOT NULL DEFAULT 0,
+                duration_count INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS agent_language_stats (
+                agent_id TEXT NOT NULL,
+                language_code TEXT NOT NULL,
+                language_label TEXT NOT NULL,
+                session_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (agent_id, language_code)
+            )
+            """
+        )
+        stats_columns = {row[1] for row in conn.execute("PRAGMA table_info(agent_stats)").fetchall()}
+        if "duration_sketch" not in stats_columns:
+            conn.execute("ALTER TABLE agent_stats ADD COLUMN duration_sketch TEXT NOT NULL DEFAULT ''")
+            stats_exist = None
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS agent_rollups (
+                agent_id TEXT NOT NULL,
+                granularity TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                starts INTEGER NOT NULL DEFAULT 0,
+                completions INTEGER NOT NULL DEFAULT 0,
+                duration_sketch TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (agent_id, granularity, bucket_start)
+            )
+            """
+        )
+        # Aggregates keyed by a pre-canonical spelling would hide those sessions from analytics.
+        if not stats_exist or renamed_sessions:
+            rebuild_agent_stats(conn)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload_json TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_after REAL NOT NULL,
+                lease_owner TEXT NOT NULL DEFAULT '',
+                lease_expires_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT NOT NULL DEFAULT '',
+                result_json TEXT NOT NULL DEFAULT '',
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (status, run_after)")
+
+
+def _canonicalize_session_agent_ids(conn: sqlite3.Connection) -> int:
+    """Rewrite session agent ids to the agent's own spelling.
+
+    Older submissions stored the id in whatever case the client sent and were matched with
+    ``LOWER()``; exact matches let the ``(agent_id, completed_at)`` index serve lookups.
+    """
+    cursor = conn.execute(
+        """
+        UPDATE completed_sessions
+        SET agent_id = (
+            SELECT agents.agent_id FROM agents WHERE LOWER(agents.agent_id) = LOWER(completed_sessions.agent_id)
+        )
+        WHERE agent_id NOT IN (SELECT agent_id FROM agents)
+          AND EXISTS (
+            SELECT 1 FROM agents WHERE LOWER(agents.agent_id) = LOWER(completed_sessions.agent_id)
+          )
+        """
+    )
+    return cursor.rowcount
+
+
+def _backfill_session_metadata(conn: sqlite3.Connection) -> None:
+    """Copy timing and language from the per-session JSON files into the columns added for them."""
+    rows = conn.execute("SELECT session_id, created_at FROM completed_sessions").fetchall()
+    for session_id, created_at in rows:
+        metadata = {}
+        metadata_path = COMPLETED_DIR / f"{session_id}.json"
+        if metadata_path.exists():
+            try:
+                metadata = json.loads(metadata_path.read_text())
+            except Exception:
+                metadata = {}
+        conn.execute(
+            """
+            UPDATE completed_sessions
+            SET completed_at = ?, duration_seconds = ?, language_code = ?, language_label = ?
+            WHERE session_id = ?
+            """,
+            (
+                metadata.get("completed_at") or created_at,
+                float(metadata.get("duration_seconds") or 0),
+                metadata.get("language_code") or "en-US",
+                metadata.get("language_label") or "English (US)",
+                session_id,
+            ),
+        )
+
+
+def _stats_duration(duration_seconds: float) -> bool:
+    """Durations outside this window are abandoned or instant sessions and stay out of the average."""
+    return STATS_MIN_DURATION_SECONDS < duration_seconds < STATS_MAX_DURATION_SECONDS
+
+
+def rollup_buckets(timestamp: str) -> list[tuple[str, str]]:
+    """(granularity, bucket_start) pairs a UTC ISO timestamp is counted under."""
+    moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    hour = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return [("hour", hour.isoformat()), ("day", hour.replace(hour=0).isoformat())]
+
+
+def _update_sketch(conn: sqlite3.Connection, table: str, where: str, params: tuple, value: float, count: int) -> None:
+    row = conn.execute(f"SELECT duration_sketch FROM {table} WHERE {where}", params).fetchone()
+    sketch = QuantileSketch.from_json(row[0] if row else "")
+    sketch.add(value, count)
+    conn.execute(f"UPDATE {table} SET duration_sketch = ? WHERE {where}", (sketch.to_json(), *params))
+
+
+def _record_session_start(conn: sqlite3.Connection, agent_id: str, started_at: str) -> None:
+    for granularity, bucket_start in rollup_buckets(started_at):
+        conn.execute(
+            """
+            INSERT INTO agent_rollups (agent_id, granularity, bucket_start, starts)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT(agent_id, granularity, bucket_start) DO UPDATE SET starts = starts + 1
+            """,
+            (agent_id, granularity, bucket_start),
+        )
+
+
+def _apply_session_stats(
+    conn: sqlite3.Connection,
+    *,
+    agent_id: str,
+    duration_seconds: float,
+    completed_at: str,
+    language_code: str,
+    language_label: str,
+    sign: int,
+) -> None:
+    """Add (``sign=1``) or remove (``sign=-1``) one completed session from its agent's aggregates."""
+    counted = _stats_duration(duration_seconds)
+    if completed_at:
+        for granularity, bucket_start in rollup_buckets(completed_at):
+            conn.execute(
+                """
+                INSERT INTO agent_rollups (agent_id, granularity, bucket_start, completions)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(agent_id, granularity, bucket_start) DO UPDATE SET
+                    completions = completions + excluded.completions
+                """,
+                (agent_id, granularity, bucket_start, sign),
+            )
+            if counted:
+                _update_sketch(
+                    conn,
+                    "agent_rollups",
+                    "agent_id = ? AND granularity = ? AND bucket_start = ?",
+                    (agent_id, granularity, bucket_start),
+                    duration_seconds,
+                    sign,
+                )
+    conn.execute(
+        """
+        INSERT INTO agent_stats (agent_id, completed_count, duration_sum, duration_count, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(agent_id) DO UPDATE SET
+            completed_count = completed_count + excluded.completed_count,
+            duration_sum = duration_sum + excluded.duration_sum,
+            duration_count = duration_count + excluded.duration_count,
+            updated_at = excluded.updated_at
+        """,
+        (
+            agent_id,
+            sign,
+            sign * duration_seconds if counted else 0.0,
+            sign * int(counted),
+            datetime.now(timezone.utc).isoformat(),
+        ),
+    )
+    conn.execute(
+        """
+        INSERT INTO agent_language_stats (agent_id, language_code, language_label, session_count)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(agent_id, language_code) DO UPDATE SET
+            session_count = session_count + excluded.session_count,
+            language_label = CASE WHEN excluded.session_count > 0 THEN excluded.language_label ELSE language_label END
+        """,
+        (agent_id, language_code, language_label, sign),
+    )
+    if counted:
+        _update_sketch(conn, "agent_stats", "agent_id = ?", (agent_id,), duration_seconds, sign)
+
+
+def rebuild_agent_stats(conn: sqlite3.Connection) -> None:
+    """Recompute every agent's aggregates from ``completed_sessions`` and the session metadata files."""
+    now = datetime.now(timezone.utc).isoformat()
+    conn.execute("DELETE FROM agent_stats")
+    conn.execute("DELETE FROM agent_language_stats")
+    conn.execute(
+        """
+        INSERT INTO agent_stats (agent_id, completed_count, duration_sum, duration_count, updated_at)
+        SELECT
+            agent_id,
+            COUNT(*),
+            COALESCE(SUM(CASE WHEN duration_seconds > ? AND duration_seconds < ? THEN duration_seconds END), 0),
+            COUNT(CASE WHEN duration_seconds > ? AND duration_seconds < ? THEN 1 END),
+            ?
+        FROM completed_sessions
+        GROUP BY agent_id
+        """,
+        (
+            STATS_MIN_DURATION_SECONDS,
+            STATS_MAX_DURATION_SECONDS,
+            STATS_MIN_DURATION_SECONDS,
+            STATS_MAX_DURATION_SECONDS,
+            now,
+        ),
+    )
+    conn.execute(
+        """
+        INSERT INTO agent_language_stats (agent_id, language_code, language_label, session_count)
+        SELECT agent_id, language_code, MAX(language_label), COUNT(*)
+        FROM completed_sessions
+        GROUP BY agent_id, language_code
+        """
+    )
+
+    conn.execute("DELETE FROM agent_rollups")
+    agent_sketches: dict[str, QuantileSketch] = {}
+    rollups: dict[tuple[str, str, str], dict] = {}
+
+    def rollup(agent_id: str, granularity: str, bucket_start: str) -> dict:
+        return rollups.setdefault(
+            (agent_id, granularity, bucket_start), {"starts": 0, "completions": 0, "sketch": QuantileSketch()}
+        )
+
+    # Metadata files keep the id as the client sent it; count starts under the agent's own spelling.
+    canonical_ids = {row[0].lower(): row[0] for row in conn.execute("SELECT agent_id FROM agents").fetchall()}
+    # Interview starts only live in the per-session metadata files.
+    for metadata_path in COMPLETED_DIR.glob("*.json"):
+        try:
+            metadata = json.loads(metadata_path.read_text())
+            agent_id = canonical_ids.get(str(metadata.get("agent_id", "")).lower())
+            if agent_id and metadata.get("started_at"):
+                for granularity, bucket_start in rollup_buckets(metadata["started_at"]):
+                    rollup(agent_id, granularity, bucket_start)["starts"] += 1
+        except Exception:
+            continue
+
+    for agent_id, duration_seconds, completed_at in conn.execute(
+        "SELECT agent_id, duration_seconds, completed_at FROM completed_sessions WHERE completed_at != ''"
+    ):
+        counted = _stats_duration(duration_seconds)
+        if counted:
+            agent_sketches.setdefault(agent_id, QuantileSketch()).add(duration_seconds)
+        try:
+            buckets = rollup_buckets(completed_at)
+        except ValueError:
+            continue
+        for granularity, bucket_start in buckets:
+            bucket = rollup(agent_id, granularity, bucket_start)
+            bucket["completions"] += 1
+            if counted:
+                bucket["sketch"].add(duration_seconds)
+
+    conn.executemany(
+        "UPDATE agent_stats SET duration_sketch = ? WHERE agent_id = ?",
+        [(sketch.to_json(), agent_id) for agent_id, sketch in agent_sketches.items()],
+    )
+    conn.executemany(
+        """
+        INSERT INTO agent_rollups (agent_id, granularity, bucket_start, starts, completions, duration_sketch)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (agent_id, granularity, bucket_start, bucket["starts"], bucket["completions"], bucket["sketch"].to_json())
+            for (agent_id, granularity, bucket_start), bucket in rollups.items()
+        ],
+    )
+
+
+def get_agent_stats(agent_id: str) -> dict:
+    """Aggregates for one agent; reads two small rows however many sessions it has."""
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute(
+            """
+            SELECT completed_count, duration_sum, duration_count, duration_sketch
+            FROM agent_stats
+            WHERE agent_id = ?
+            """,
+            (agent_id,),
+        ).fetchone()
+        language_rows = conn.execute(
+            """
+            SELECT language_code, language_label, session_count
+            FROM agent_language_stats
+            WHERE agent_id = ? AND session_count > 0
+            ORDER BY session_count DESC, language_code
+            """,
+            (agent_id,),
+        ).fetchall()
+
+    completed_count, duration_sum, duration_count, duration_sketch = row or (0, 0.0, 0, "")
+    return {
+        "completed_count": completed_count,
+        "duration_sum": duration_sum,
+        "duration_count": duration_count,
+        "duration_sketch": QuantileSketch.from_json(duration_sketch),
+        "languages": [
+            {"language_code": code, "language_label": label, "count": count}
+            for code, label, count in language_rows
+        ],
+    }
+
+
+def get_agent_rollups(agent_id: str, granularity: str, bucket_from: str, bucket_before: str) -> list[dict]:
+    """Hourly or daily buckets with ``bucket_from <= bucket_start < bucket_before``, oldest first."""
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute(
+            """
+            SELECT bucket_start, starts, completions, duration_sketch
+            FROM agent_rollups
+            WHERE agent_id = ? AND granularity = ? AND bucket_start >= ? AND bucket_start < ?
+            ORDER BY bucket_start
+            """,
+            (agent_id, granularity, bucket_from, bucket_before),
+        ).fetchall()
+
+    return [
+        {
+            "bucket_start": row[0],
+            "starts": row[1],
+            "completions": row[2],
+            "duration_sketch": QuantileSketch.from_json(row[3]),
+        }
+        for row in rows
+    ]
+
+
+def save_agent(agent_id: str, pdf_path: str, schema: dict, agent_name: str = "", template_sha256: str = "") -> None:
+    created_at = datetime.now(timezone.utc).isoformat()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            """
+            INSERT INTO agents (agent_id, agent_name, pdf_path, schema_json, created_at, template_sha256)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (agent_id, agent_name, pdf_path, json.dumps(schema), created_at, template_sha256),
+        )
+
 
+def template_blob_path(sha256: str) -> Path:
+    return TEMPLATE_BLOB_DIR / f"{sha256}.pdf"
 
-def save_agent(agent_id: str, pdf_path: str, schema: dict, agent_name: str = "") -> None:
+
+def acquire_template(sha256: str, spooled_path: Path) -> Path:
+    """Take a reference on the content-addressed template for ``sha256``.
+
+    The spooled upload becomes the blob if none exists yet; otherwise it is discarded.
+    Every call must be balanced by ``release_template`` (directly or via ``delete_agent``).
+    """
+    blob_path = template_blob_path(sha256)
     created_at = datetime.now(timezone.utc).isoformat()
+    with _TEMPLATE_LOCK:
+        if blob_path.exists():
+            spooled_path.unlink(missing_ok=True)
+        else:
+            spooled_path.replace(blob_path)
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute(
+                """
+                INSERT INTO templates (sha256, pdf_path, ref_count, created_at)
+                VALUES (?, ?, 0, ?)
+                ON CONFLICT(sha256) DO NOTHING
+                """,
+                (sha256, str(blob_path), created_at),
+            )
+            conn.execute("UPDATE templates SET ref_count = ref_count + 1 WHERE sha256 = ?", (sha256,))
+    return blob_path
+
+
+def release_template(sha256: str) -> bool:
+    """Drop one reference; removes the row and blob when none remain. Returns True if the blob was deleted."""
+    with _TEMPLATE_LOCK:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute(
+                "UPDATE templates SET ref_count = ref_count - 1 WHERE sha256 = ? AND ref_count > 0",
+                (sha256,),
+            )
+            row = conn.execute("SELECT pdf_path, ref_count FROM templates WHERE sha256 = ?", (sha256,)).fetchone()
+            if not row or row[1] > 0:
+                return False
+            conn.execute("DELETE FROM templates WHERE sha256 = ?", (sha256,))
+        blob_path = _safe_data_file(row[0])
+        if blob_path and blob_path.is_file():
+            try:
+                blob_path.unlink()
+                return True
+            except OSError:
+                return False
+    return False
+
+
+def get_template_schema(sha256: str) -> dict | None:
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute("SELECT schema_json FROM templates WHERE sha256 = ?", (sha256,)).fetchone()
+    if not row or not row[0]:
+        return None
+    return json.loads(row[0])
+
+
+def save_template_schema(sha256: str, schema: dict) -> None:
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("UPDATE templates SET schema_json = ? WHERE sha256 = ?", (json.dumps(schema), sha256))
+
+
+def update_agent_schema(agent_id: str, schema: dict) -> None:
     with sqlite3.connect(DB_PATH) as conn:
         conn.execute(
             """
-            INSERT INTO agents (agent_id, agent_name, pdf_path, schema_json, created_at)
-            VALUES (?, ?, ?, ?, ?)
+            UPDATE agents
+            SET schema_json = ?
+            WHERE LOWER(agent_id) = LOWER(?)
             """,
-            (agent_id, agent_name, pdf_path, json.dumps(schema), created_at),
+            (json.dumps(schema), agent_id),
         )
 
 
@@ -63,7 +547,7 @@ def get_agent(agent_id: str) -> dict | None:
     with sqlite3.connect(DB_PATH) as conn:
         row = conn.execute(
             """
-            SELECT agent_id, agent_name, pdf_path, schema_json, created_at
+            SELECT agent_id, agent_name, pdf_path, schema_json, created_at, template_sha256
             FROM agents
             WHERE LOWER(agent_id) = LOWER(?)
             """,
@@ -79,6 +563,7 @@ def get_agent(agent_id: str) -> dict | None:
         "pdf_path": row[2],
         "schema": json.loads(row[3]),
         "created_at": row[4],
+        "template_sha256": row[5] or "",
     }
 
 
@@ -158,6 +643,11 @@ def _safe_data_file(path_value: str) -> Path | None:
         return None
     return path
 
+def completed_preview_path(filled_pdf_path: str | Path, mode: str) -> Path:
+    """Where the flattened preview of a completed PDF is cached, next to the PDF itself."""
+    path = Path(filled_pdf_path)
+    return path.with_name(f"{path.stem}_preview_{mode}.pdf")
+
 def save_session_start(session_id: str, agent_id: str, started_at: str) -> None:
     """Save session start time to metadata file"""
     metadata_path = COMPLETED_DIR / f"{session_id}.json"
@@ -171,13 +661,30 @@ def save_session_start(session_id: str, agent_id: str, started_at: str) -> None:
     }
     
     metadata_path.write_text(json.dumps(metadata, indent=2, ensure_ascii=False))
+    with sqlite3.connect(DB_PATH) as conn:
+        _record_session_start(conn, agent_id, started_at)
     print(f"🚀 Session {session_id} started at {started_at}")
 
+def delete_data_files(paths: list[str]) -> int:
+    """Unlink files that live under the data directory; returns how many were removed."""
+    deleted = 0
+    for raw_path in paths:
+        safe_path = _safe_data_file(raw_path)
+        if safe_path and safe_path.exists() and safe_path.is_file():
+            try:
+                safe_path.unlink()
+                deleted += 1
+            except OSError:
+                continue
+    return deleted
+
+
 def delete_agent(agent_id: str) -> dict | None:
+    """Delete the agent and its sessions; their files are returned as ``pending_files`` for the caller to remove."""
     with sqlite3.connect(DB_PATH) as conn:
         agent_row = conn.execute(
             """
-            SELECT agent_id, pdf_path
+            SELECT agent_id, pdf_path, template_sha256
             FROM agents
             WHERE LOWER(agent_id) = LOWER(?)
             """,
@@ -209,22 +716,27 @@ def delete_agent(agent_id: str) -> dict | None:
             """,
             (agent_id,),
         )
+        conn.execute("DELETE FROM agent_stats WHERE agent_id = ?", (agent_row[0],))
+        conn.execute("DELETE FROM agent_language_stats WHERE agent_id = ?", (agent_row[0],))
+        conn.execute("DELETE FROM agent_rollups WHERE agent_id = ?", (agent_row[0],))
 
-    deleted_files = 0
-    candidate_paths = [agent_row[1], *[row[0] for row in session_rows]]
-    for raw_path in candidate_paths:
-        safe_path = _safe_data_file(raw_path)
-        if safe_path and safe_path.exists() and safe_path.is_file():
-            try:
-                safe_path.unlink()
-                deleted_files += 1
-            except OSError:
-                continue
+    released_template = False
+    template_sha256 = agent_row[2] or ""
+    if template_sha256:
+        # Shared template blobs are only removed once their last agent is gone.
+        released_template = release_template(template_sha256)
+        candidate_paths = [row[0] for row in session_rows]
+    else:
+        candidate_paths = [agent_row[1], *[row[0] for row in session_rows]]
+    for row in session_rows:
+        filled_path = Path(row[0])
+        candidate_paths.extend(str(path) for path in filled_path.parent.glob(f"{filled_path.stem}_preview_*.pdf"))
 
     return {
         "agent_id": agent_row[0],
         "deleted_sessions": len(session_rows),
-        "deleted_files": deleted_files,
+        "released_template": released_template,
+        "pending_files": candidate_paths,
     }
 
 
@@ -236,8 +748,14 @@ def save_completed_session(
     filled_pdf_path: str,
     language_code: str = "en-US",
     language_label: str = "English (US)",
+    template_sha256: str = "",
+    pdf_storage: str = "eager",
 ) -> None:
-    """Save a completed session"""
+    """Save a completed session.
+
+    With ``pdf_storage="lazy"`` no PDF exists yet at ``filled_pdf_path``; it is rebuilt from
+    the answers and the template identified by ``template_sha256`` when first requested.
+    """
     from datetime import datetime, timezone
     
     completed_at = datetime.now(timezone.utc).isoformat()
@@ -260,6 +778,7 @@ def save_completed_session(
             print(f"⚠️  Could not read existing metadata: {e}")
     
     # If no start time found, use completed_at (fallback)
+    start_recorded = bool(started_at)
     if not started_at:
         print(f"⚠️  No start time found, using completed_at as fallback")
         started_at = completed_at
@@ -290,15 +809,59 @@ def save_completed_session(
     metadata_path.write_text(json.dumps(metadata, indent=2, ensure_ascii=False))
     print(f"💾 Saved metadata to: {metadata_path}")
     
-    # Save to database
+    # Save to database; the agent aggregates change in the same transaction.
     with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        previous = conn.execute(
+            """
+            SELECT agent_id, duration_seconds, completed_at, language_code, language_label
+            FROM completed_sessions
+            WHERE session_id = ?
+            """,
+            (session_id,),
+        ).fetchone()
+        if previous:
+            _apply_session_stats(
+                conn,
+                agent_id=previous[0],
+                duration_seconds=previous[1],
+                completed_at=previous[2],
+                language_code=previous[3],
+                language_label=previous[4],
+                sign=-1,
+            )
+        elif not start_recorded:
+            # Submissions and batch fills have no interview start; count it with the completion.
+            _record_session_start(conn, agent_id, started_at)
         conn.execute(
             """
             INSERT OR REPLACE INTO completed_sessions
-                (session_id, agent_id, answers_json, filled_pdf_path, created_at)
-            VALUES (?, ?, ?, ?, ?)
+                (session_id, agent_id, answers_json, filled_pdf_path, created_at, template_sha256, pdf_storage,
+                 completed_at, duration_seconds, language_code, language_label)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (session_id, agent_id, json.dumps(answers), filled_pdf_path, started_at),
+            (
+                session_id,
+                agent_id,
+                json.dumps(answers),
+                filled_pdf_path,
+                started_at,
+                template_sha256,
+                pdf_storage,
+                completed_at,
+                duration_seconds,
+                language_code,
+                language_label,
+            ),
+        )
+        _apply_session_stats(
+            conn,
+            agent_id=agent_id,
+            duration_seconds=duration_seconds,
+            completed_at=completed_at,
+            language_code=language_code,
+            language_label=language_label,
+            sign=1,
         )
     
     print(f"✅ Session {session_id} complete:")
@@ -306,11 +869,166 @@ def save_completed_session(
     print(f"   Completed: {completed_at}")
     print(f"   Duration:  {duration_seconds:.1f}s ({int(duration_seconds // 60)}m {int(duration_seconds % 60)}s)")
 
+_JOB_COLUMNS = (
+    "job_id, kind, payload_json, status, attempts, max_attempts, run_after, "
+    "lease_owner, lease_expires_at, last_error, result_json, created_at, updated_at"
+)
+
+
+def _job_from_row(row) -> dict:
+    return {
+        "job_id": row[0],
+        "kind": row[1],
+        "payload": json.loads(row[2]),
+        "status": row[3],
+        "attempts": row[4],
+        "max_attempts": row[5],
+        "run_after": row[6],
+        "lease_owner": row[7],
+        "lease_expires_at": row[8],
+        "last_error": row[9],
+        "result": json.loads(row[10]) if row[10] else None,
+        "created_at": row[11],
+        "updated_at": row[12],
+    }
+
+
+def insert_job(*, job_id: str, kind: str, payload: dict, max_attempts: int, run_after: float) -> bool:
+    """Queue a job; returns False when ``job_id`` already exists, which makes enqueueing idempotent."""
+    now = datetime.now(timezone.utc).isoformat()
+    with sqlite3.connect(DB_PATH) as conn:
+        cursor = conn.execute(
+            """
+            INSERT OR IGNORE INTO jobs
+                (job_id, kind, payload_json, status, max_attempts, run_after, created_at, updated_at)
+            VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)
+            """,
+            (job_id, kind, json.dumps(payload), max_attempts, run_after, now, now),
+        )
+        return cursor.rowcount > 0
+
+
+def lease_job(*, owner: str, lease_seconds: float) -> dict | None:
+    """Claim the next due job, or one whose previous lease expired, and count the attempt.
+
+    Runs in an IMMEDIATE transaction so concurrent workers, in this or another process,
+    never claim the same job.
+    """
+    now = time.time()
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            f"""
+            SELECT {_JOB_COLUMNS}
+            FROM jobs
+            WHERE (status = 'queued' AND run_after <= ?)
+               OR (status = 'running' AND lease_expires_at <= ?)
+            ORDER BY run_after
+            LIMIT 1
+            """,
+            (now, now),
+        ).fetchone()
+        if row:
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (owner, now + lease_seconds, datetime.now(timezone.utc).isoformat(), row[0]),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    if not row:
+        return None
+    job = _job_from_row(row)
+    job.update(status="running", lease_owner=owner, attempts=job["attempts"] + 1)
+    return job
+
+
+def finish_job(
+    job_id: str,
+    owner: str,
+    *,
+    status: str,
+    result: dict | None = None,
+    last_error: str = "",
+    run_after: float | None = None,
+) -> bool:
+    """Record the outcome of a leased job; ignored (returns False) if the lease was lost meanwhile."""
+    assignments = ["status = ?", "last_error = ?", "lease_owner = ''", "lease_expires_at = 0", "updated_at = ?"]
+    values: list = [status, last_error, datetime.now(timezone.utc).isoformat()]
+    if result is not None:
+        assignments.append("result_json = ?")
+        values.append(json.dumps(result))
+    if run_after is not None:
+        assignments.append("run_after = ?")
+        values.append(run_after)
+    with sqlite3.connect(DB_PATH) as conn:
+        cursor = conn.execute(
+            f"UPDATE jobs SET {', '.join(assignments)} WHERE job_id = ? AND status = 'running' AND lease_owner = ?",
+            (*values, job_id, owner),
+        )
+        return cursor.rowcount > 0
+
+
+def get_job(job_id: str) -> dict | None:
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _job_from_row(row) if row else None
+
+
+def list_jobs(status: str = "", limit: int = 100) -> list[dict]:
+    query = f"SELECT {_JOB_COLUMNS} FROM jobs"
+    params: list = []
+    if status:
+        query += " WHERE status = ?"
+        params.append(status)
+    query += " ORDER BY updated_at DESC LIMIT ?"
+    params.append(limit)
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [_job_from_row(row) for row in rows]
+
+
+def requeue_dead_job(job_id: str) -> bool:
+    """Give a dead-lettered job a fresh set of attempts."""
+    with sqlite3.connect(DB_PATH) as conn:
+        cursor = conn.execute(
+            """
+            UPDATE jobs
+            SET status = 'queued', attempts = 0, run_after = ?, updated_at = ?
+            WHERE job_id = ? AND status = 'dead'
+            """,
+            (time.time(), datetime.now(timezone.utc).isoformat(), job_id),
+        )
+        return cursor.rowcount > 0
+
+
+def purge_succeeded_jobs(older_than: float) -> int:
+    """Delete succeeded jobs that finished before ``older_than`` (epoch seconds)."""
+    # finish_job stamps updated_at, so this ages jobs by completion rather than enqueue time.
+    cutoff = datetime.fromtimestamp(older_than, timezone.utc).isoformat()
+    with sqlite3.connect(DB_PATH) as conn:
+        cursor = conn.execute(
+            "DELETE FROM jobs WHERE status = 'succeeded' AND updated_at < ?",
+            (cutoff,),
+        )
+        return cursor.rowcount
+
+
 def get_completed_session(session_id: str) -> dict | None:
     with sqlite3.connect(DB_PATH) as conn:
         row = conn.execute(
             """
-            SELECT session_id, agent_id, answers_json, filled_pdf_path, created_at
+            SELECT session_id, agent_id, answers_json, filled_pdf_path, created_at, template_sha256, pdf_storage
             FROM completed_sessions
             WHERE session_id = ?
             """,
@@ -328,8 +1046,76 @@ def get_completed_session(session_id: str) -> dict | None:
         "field_count": len(answers),
         "filled_pdf_path": row[3],
         "created_at": row[4],
+        "template_sha256": row[5] or "",
+        "pdf_storage": row[6] or "eager",
     }
 
+def iter_completed_sessions(
+    agent_id: str | None = None,
+    completed_from: str = "",
+    completed_before: str = "",
+    session_ids: list[str] | None = None,
+) -> Iterator[dict]:
+    """Yield completed sessions oldest first, one page of rows per short read, so exports run in constant memory.
+
+    Pages are keyed on ``(completed_at, session_id)`` and no read stays open while the caller consumes
+    rows, so a slow download never holds off writers. Bounds are ISO-8601 UTC timestamps compared
+    against ``completed_at``; ``completed_before`` is exclusive.
+    """
+    clauses = []
+    params: list[str] = []
+    if agent_id is not None:
+        clauses.append("agent_id = ?")
+        params.append(agent_id)
+    if completed_from:
+        clauses.append("completed_at >= ?")
+        params.append(completed_from)
+    if completed_before:
+        clauses.append("completed_at < ?")
+        params.append(completed_before)
+    if session_ids is not None:
+        clauses.append(f"session_id IN ({', '.join('?' for _ in session_ids) or 'NULL'})")
+        params.extend(session_ids)
+
+    after: tuple[str, str] | None = None
+    while True:
+        page_clauses = list(clauses)
+        page_params = list(params)
+        if after is not None:
+            page_clauses.append("(completed_at, session_id) > (?, ?)")
+            page_params.extend(after)
+        where = f"WHERE {' AND '.join(page_clauses)}" if page_clauses else ""
+        with sqlite3.connect(DB_PATH) as conn:
+            rows = conn.execute(
+                f"""
+                SELECT session_id, agent_id, answers_json, created_at, completed_at, duration_seconds,
+                       language_code, language_label, filled_pdf_path, template_sha256, pdf_storage
+                FROM completed_sessions
+                {where}
+                ORDER BY completed_at, session_id
+                LIMIT ?
+                """,
+                [*page_params, EXPORT_PAGE_SIZE],
+            ).fetchall()
+        for row in rows:
+            yield {
+                "session_id": row[0],
+                "agent_id": row[1],
+                "answers": json.loads(row[2]),
+                "started_at": row[3],
+                "completed_at": row[4],
+                "duration_seconds": row[5],
+                "language_code": row[6],
+                "language_label": row[7],
+                "filled_pdf_path": row[8],
+                "template_sha256": row[9] or "",
+                "pdf_storage": row[10] or "eager",
+            }
+        if len(rows) < EXPORT_PAGE_SIZE:
+            return
+        after = (rows[-1][4], rows[-1][0])
+
+
 def get_completed_sessions(limit: int = 500) -> list[dict]:
     """Get all completed sessions with enriched metadata from JSON files"""
     sessions = list_completed_sessions(limit)
@@ -0,0 +1,42 @@
+import os
+
+import fitz
+
+from byte_cache import BoundedByteCache
+
+# Blank templates are read by every fill and preview; keep the hot ones in memory.
+TEMPLATE_CACHE_MAX_BYTES = int(os.getenv("TEMPLATE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)) or 0)
+
+_CACHE = BoundedByteCache(TEMPLATE_CACHE_MAX_BYTES)
+
+
+def _template_key(pdf_path: str) -> tuple[str, int, int]:
+    path = os.path.realpath(pdf_path)
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def template_fingerprint(pdf_path: str) -> str:
+    """Identity of the template's current contents, for keying derived caches."""
+    path, mtime_ns, size = _template_key(pdf_path)
+    return f"{path}:{mtime_ns}:{size}"
+
+
+def template_bytes(pdf_path: str) -> bytes:
+    """Return the template's bytes, served from an LRU keyed by path, mtime and size."""
+    key = _template_key(pdf_path)
+    data = _CACHE.get(key)
+    if data is not None:
+        return data
+
+    with open(key[0], "rb") as handle:
+        data = handle.read()
+    # Drop entries for an older version of the same file before inserting.
+    _CACHE.discard_where(lambda cached: cached[0] == key[0] and cached != key)
+    _CACHE.put(key, data, len(data))
+    return data
+
+
+def open_template(pdf_path: str) -> fitz.Document:
+    """Open a fresh, independently editable document from the cached template bytes."""
+    return fitz.open(stream=template_bytes(pdf_path), filetype="pdf")
@@ -0,0 +1,65 @@
+import io
+import os
+import time
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+FILE_CHUNK_BYTES = 1024 * 1024
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable target that hands written bytes back to the generator."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[tuple[str, bytes | Path | BinaryIO]]) -> Iterator[bytes]:
+    """Stream a ZIP archive built from (name, data) pairs without holding the archive in memory.
+
+    ``data`` may be a file path or an open binary file (closed once copied), which is copied in
+    chunks rather than read whole. Entries are stored uncompressed: PDFs are already deflated
+    internally, so recompressing costs CPU for almost no size gain.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, data in entries:
+            if not isinstance(data, bytes):
+                with data.open("rb") if isinstance(data, Path) else data as source:
+                    stat = os.fstat(source.fileno())
+                    info = zipfile.ZipInfo(name, date_time=time.localtime(stat.st_mtime)[:6])
+                    info.external_attr = (stat.st_mode & 0xFFFF) << 16
+                    info.file_size = stat.st_size
+                    info.compress_type = zipfile.ZIP_STORED
+                    with archive.open(info, mode="w") as target:
+                        while block := source.read(FILE_CHUNK_BYTES):
+                            target.write(block)
+                            chunk = sink.drain()
+                            if chunk:
+                                yield chunk
+            else:
+                archive.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    tail = sink.drain()
+    if tail:
+        yield tail
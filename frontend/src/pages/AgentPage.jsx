@@ -1,6 +1,6 @@
 import { useEffect, useMemo, useRef, useState } from 'react'
 import { useNavigate, useParams } from 'react-router-dom'
-import { API_BASE_URL, getAgentById, getAgentLivePreviewPdf, speakInterviewText, startGuidedInterview, submitInterviewAudioTurn } from '../services/api'
+import { API_BASE_URL, getAgentById, getAgentPreviewOverlay, getInterviewCompletion, openInterviewEvents, speakInterviewText, startGuidedInterview, submitInterviewAudioTurn } from '../services/api'
 import { useI18n } from '../i18n/I18nProvider'
 import { normalizeLanguageCode } from '../i18n/languages'
 import PortalHeader from '../components/PortalHeader'
@@ -9,6 +9,8 @@ const MIN_RECORDING_MS = 500
 const WAITING_SOUND_URL = '/sounds/waiting-loop.mp3'
 const WAITING_SOUND_LOOP_END_SEC = 2
 const WAITING_SOUND_VOLUME = 0.5
+const COMPLETION_POLL_MS = 1000
+const COMPLETION_POLL_MAX_MS = 15000
 const INTERVIEW_TURN_RESPONSE_SCHEMA = {
   type: 'object',
   properties: {
@@ -23,11 +25,24 @@ const INTERVIEW_TURN_RESPONSE_SCHEMA = {
     assistant_response: 'string',
     audio_mime_type: 'string',
     audio_base64: 'string',
+    completion_status: 'queued|running|retrying|succeeded|failed',
+    completion_status_url: 'string',
     download_url: 'string',
     pdf_preview_url: 'string',
   },
 }
 
+function overlayFieldStyle(field, page) {
+  // Rects are PDF points from the page's top-left; percentages keep them aligned at any width.
+  const { x0, y0, x1, y1 } = field.rect
+  return {
+    left: `${(x0 / page.width) * 100}%`,
+    top: `${(y0 / page.height) * 100}%`,
+    width: `${((x1 - x0) / page.width) * 100}%`,
+    height: `${((y1 - y0) / page.height) * 100}%`,
+  }
+}
+
 function buildDataUri(audioMimeType, audioBase64) {
   return `data:${audioMimeType || 'audio/mpeg'};base64,${audioBase64}`
 }
@@ -98,6 +113,8 @@ export default function AgentPage() {
   const recordingInterruptionRef = useRef(false)
   const activeAudioRef = useRef(null)
   const livePreviewRequestRef = useRef(0)
+  // Answers the drawn overlay reflects; sent back so the server only returns changed fields.
+  const livePreviewAnswersRef = useRef(null)
   const waitingAudioRef = useRef(null)
 
   const toneContextRef = useRef(null)
@@ -115,7 +132,8 @@ export default function AgentPage() {
   const [interviewLanguage, setInterviewLanguage] = useState(normalizeLanguageCode(uiLanguage))
   const [livePreviewEnabled, setLivePreviewEnabled] = useState(false)
   const [livePreviewLoading, setLivePreviewLoading] = useState(false)
-  const [livePreviewUrl, setLivePreviewUrl] = useState('')
+  const [livePreviewPages, setLivePreviewPages] = useState([])
+  const [livePreviewFields, setLivePreviewFields] = useState([])
   const [chatModeEnabled, setChatModeEnabled] = useState(true)
   const [lastUserSubtitle, setLastUserSubtitle] = useState('')
   const [lastAssistantSubtitle, setLastAssistantSubtitle] = useState('')
@@ -317,6 +335,9 @@ export default function AgentPage() {
     const errorCode = typeof err === 'object' && err && 'code' in err ? String(err.code || '') : ''
     const statusCode = typeof err === 'object' && err && 'status' in err ? Number(err.status) : 0
 
+    // A newer turn superseded this one; its own response drives the UI.
+    if (errorCode === 'TURN_CANCELLED') return
+
     const authIssue = errorCode === 'GEMINI_AUTH' || /gemini api key|invalid or expired|gemini_auth|api key/i.test(message)
     const rateLimited = errorCode === 'GEMINI_RATE_LIMIT' || statusCode === 429 || /rate limit|resource exhausted|quota/i.test(message)
 
@@ -471,16 +492,17 @@ export default function AgentPage() {
     stopRecordingAndSubmit()
   }
 
+  const clearLivePreview = () => {
+    livePreviewAnswersRef.current = null
+    setLivePreviewPages([])
+    setLivePreviewFields([])
+  }
+
   const endInterview = () => {
     livePreviewRequestRef.current += 1
     setLivePreviewEnabled(false)
     setLivePreviewLoading(false)
-    setLivePreviewUrl((current) => {
-      if (current?.startsWith('blob:')) {
-        URL.revokeObjectURL(current)
-      }
-      return ''
-    })
+    clearLivePreview()
     setShowEndConfirm(false)
     teardownSessionMedia()
     setMode('idle')
@@ -501,12 +523,7 @@ export default function AgentPage() {
     setLastUserSubtitle('')
     setLastAssistantSubtitle('')
     if (!livePreviewEnabled) {
-      setLivePreviewUrl((current) => {
-        if (current?.startsWith('blob:')) {
-          URL.revokeObjectURL(current)
-        }
-        return ''
-      })
+      clearLivePreview()
     }
     setShowEndConfirm(false)
     completionLoggedRef.current = false
@@ -606,31 +623,19 @@ export default function AgentPage() {
     setInterviewLanguage(normalizeLanguageCode(uiLanguage))
   }, [stage, uiLanguage])
 
-  useEffect(() => {
-    return () => {
-      if (livePreviewUrl?.startsWith('blob:')) {
-        URL.revokeObjectURL(livePreviewUrl)
-      }
-    }
-  }, [livePreviewUrl])
-
   const refreshLivePreview = async (answers = {}) => {
     const requestId = livePreviewRequestRef.current + 1
     livePreviewRequestRef.current = requestId
     setLivePreviewLoading(true)
     try {
-      const previewBlob = await getAgentLivePreviewPdf(id, answers)
-      const objectUrl = URL.createObjectURL(previewBlob)
-      if (livePreviewRequestRef.current !== requestId) {
-        URL.revokeObjectURL(objectUrl)
-        return
-      }
-      setLivePreviewUrl((current) => {
-        if (current?.startsWith('blob:')) {
-          URL.revokeObjectURL(current)
-        }
-        return objectUrl
-      })
+      const overlay = await getAgentPreviewOverlay(id, answers, livePreviewAnswersRef.current)
+      if (livePreviewRequestRef.current !== requestId) return
+      const replaced = new Set([...overlay.fields.map((field) => field.key), ...(overlay.removed || [])])
+      setLivePreviewPages(overlay.pages)
+      setLivePreviewFields((current) =>
+        overlay.changed_only ? [...current.filter((field) => !replaced.has(field.key)), ...overlay.fields] : overlay.fields,
+      )
+      livePreviewAnswersRef.current = answers
     } catch (err) {
       if (livePreviewRequestRef.current !== requestId) return
       const message = err instanceof Error ? err.message : t('err_preview_refresh')
@@ -651,14 +656,68 @@ export default function AgentPage() {
     if (livePreviewEnabled) return
     livePreviewRequestRef.current += 1
     setLivePreviewLoading(false)
-    setLivePreviewUrl((current) => {
-      if (current?.startsWith('blob:')) {
-        URL.revokeObjectURL(current)
-      }
-      return ''
-    })
+    clearLivePreview()
   }, [livePreviewEnabled])
 
+  useEffect(() => {
+    const statusUrl = interviewState?.completion_status_url
+    if (!statusUrl || interviewState?.download_url) return
+    // The filled PDF is produced by a background job; pick up its links once it finishes.
+    // pdf_ready on the session's event channel is the fast path; polling covers an event
+    // published before the stream connected.
+    let cancelled = false
+    let timer = null
+    let events = null
+    const sessionId = interviewSessionIdRef.current
+    if (sessionId) {
+      events = openInterviewEvents(id, sessionId, {
+        pdf_ready: (artifacts) => {
+          if (cancelled) return
+          setInterviewState((current) => ({
+            ...current,
+            completion_status: 'succeeded',
+            download_url: artifacts.download_url,
+            pdf_preview_url: artifacts.pdf_preview_url,
+          }))
+        },
+      })
+    }
+    let delay = COMPLETION_POLL_MS
+    const poll = async () => {
+      try {
+        const completion = await getInterviewCompletion(statusUrl)
+        if (cancelled) return
+        delay = COMPLETION_POLL_MS
+        if (completion.status === 'succeeded') {
+          setInterviewState((current) => ({
+            ...current,
+            completion_status: completion.status,
+            download_url: completion.download_url,
+            pdf_preview_url: completion.pdf_preview_url,
+          }))
+          return
+        }
+        if (completion.status === 'failed') {
+          setInterviewState((current) => ({ ...current, completion_status: completion.status }))
+          return
+        }
+      } catch (error) {
+        if (cancelled) return
+        // A 4xx will not change on retry (unknown session, bad URL); leave it to the event channel.
+        if (error.status >= 400 && error.status < 500) return
+        // Network errors and 5xx back off so a struggling server is not polled every second.
+        delay = Math.min(delay * 2, COMPLETION_POLL_MAX_MS)
+      }
+      timer = window.setTimeout(poll, delay)
+    }
+    void poll()
+    return () => {
+      cancelled = true
+      if (timer) window.clearTimeout(timer)
+      if (events) events.close()
+    }
+  }, [id, interviewState?.completion_status_url, interviewState?.download_url])
+
   useEffect(() => {
     if (!interviewState?.completed || completionLoggedRef.current) return
     completionLoggedRef.current = true
@@ -699,11 +758,8 @@ export default function AgentPage() {
     if (interviewState?.pdf_preview_url) {
       return toApiAbsoluteUrl(interviewState.pdf_preview_url)
     }
-    if (livePreviewUrl) {
-      return livePreviewUrl
-    }
     return ''
-  }, [interviewState?.pdf_preview_url, livePreviewUrl])
+  }, [interviewState?.pdf_preview_url])
 
   const closeCompletedView = () => {
     endInterview()
@@ -909,12 +965,25 @@ export default function AgentPage() {
                 <p className="paneLabel">{t('agent_live_pdf_preview')}</p>
                 <span className="livePreviewState">{livePreviewLoading ? t('agent_live_pdf_updating') : t('agent_live_pdf_readonly')}</span>
               </div>
-              {livePreviewUrl ? (
-                <iframe
-                  title={t('agent_live_pdf_preview')}
-                  src={`${livePreviewUrl}#toolbar=1&navpanes=0`}
-                  className="talkingPdfFrame"
-                />
+              {livePreviewPages.length ? (
+                <div className="livePreviewPages" aria-label={t('agent_live_pdf_preview')}>
+                  {livePreviewPages.map((page) => (
+                    <div key={page.page} className="livePreviewPage" style={{ aspectRatio: `${page.width} / ${page.height}` }}>
+                      <img src={page.image_url} alt="" className="livePreviewPageImage" />
+                      {livePreviewFields
+                        .filter((field) => field.page === page.page)
+                        .map((field, index) => (
+                          <span
+                            key={`${field.key}-${index}`}
+                            className={`livePreviewField ${field.type === 'CheckBox' ? 'livePreviewCheck' : ''}`}
+                            style={overlayFieldStyle(field, page)}
+                          >
+                            {field.display}
+                          </span>
+                        ))}
+                    </div>
+                  ))}
+                </div>
               ) : (
                 <p className="hint">{t('agent_live_pdf_preparing')}</p>
               )}
@@ -45,6 +45,35 @@ export async function uploadPdf(file, agentName = '') {
   return payload
 }
 
+export async function startPdfUploadJob(file, agentName = '') {
+  const params = new URLSearchParams({ mode: 'async', filename: file.name || 'upload.pdf' })
+  if (agentName.trim()) {
+    params.set('agent_name', agentName.trim())
+  }
+
+  const response = await fetch(`${API_BASE_URL}/api/admin/upload?${params.toString()}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/pdf' },
+    body: file,
+  })
+
+  const payload = await readJson(response)
+  if (!response.ok) {
+    throw new Error(payload.error || `Upload failed (${response.status})`)
+  }
+
+  return payload
+}
+
+export async function getUploadJob(jobId) {
+  const response = await fetch(`${API_BASE_URL}/api/admin/upload/jobs/${jobId}`)
+  const payload = await readJson(response)
+  if (!response.ok) {
+    throw new Error(payload.error || `Could not load upload job (${response.status})`)
+  }
+  return payload
+}
+
 export async function listAgents() {
   const response = await fetch(`${API_BASE_URL}/api/admin/agents`)
   const payload = await readJson(response)
@@ -84,25 +113,22 @@ export async function getAgentById(agentId) {
   return payload
 }
 
-export async function getAgentLivePreviewPdf(agentId, answers) {
-  const response = await fetch(`${API_BASE_URL}/api/agent/${agentId}/preview`, {
+export async function getAgentPreviewOverlay(agentId, answers, previousAnswers = null) {
+  // With previousAnswers the response only carries changed fields plus the keys under `removed`.
+  const body = previousAnswers ? { answers, previous_answers: previousAnswers } : { answers }
+  const response = await fetch(`${API_BASE_URL}/api/agent/${agentId}/preview/overlay`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ answers }),
+    body: JSON.stringify(body),
   })
-
+  const payload = await readJson(response)
   if (!response.ok) {
-    let message = `Could not generate live preview (${response.status})`
-    try {
-      const payload = await readJson(response)
-      message = payload.error || message
-    } catch {
-      // ignore parse error
-    }
-    throw new Error(message)
+    throw new Error(payload.error || `Could not load preview overlay (${response.status})`)
+  }
+  return {
+    ...payload,
+    pages: (payload.pages || []).map((page) => ({ ...page, image_url: `${API_BASE_URL}${page.image_url}` })),
   }
-
-  return response.blob()
 }
 
 export async function getAgentSignedUrl(agentId) {
@@ -161,14 +187,12 @@ export async function submitInterviewTurn(agentId, turnPayload) {
 }
 
 export async function submitInterviewAudioTurn(agentId, { session_id, audio_blob, was_interruption = false }) {
-  const formData = new FormData()
-  formData.append('session_id', session_id)
-  formData.append('was_interruption', String(Boolean(was_interruption)))
-  formData.append('audio', audio_blob, 'turn.webm')
-
-  const response = await fetch(`${API_BASE_URL}/api/agent/${agentId}/interview/turn-audio`, {
+  // Raw audio body: the backend relays it to speech-to-text as it arrives.
+  const query = new URLSearchParams({ session_id, was_interruption: String(Boolean(was_interruption)) })
+  const response = await fetch(`${API_BASE_URL}/api/agent/${agentId}/interview/turn-audio?${query}`, {
     method: 'POST',
-    body: formData,
+    headers: { 'Content-Type': audio_blob.type || 'audio/webm' },
+    body: audio_blob,
   })
   const payload = await readJson(response)
   if (!response.ok) {
@@ -180,6 +204,64 @@ export async function submitInterviewAudioTurn(agentId, { session_id, audio_blob
   return payload
 }
 
+export async function getInterviewCompletion(statusUrl) {
+  const response = await fetch(`${API_BASE_URL}${statusUrl}`)
+  const payload = await readJson(response)
+  if (!response.ok) {
+    const error = new Error(payload.error || `Could not load completion status (${response.status})`)
+    error.status = response.status
+    throw error
+  }
+  return payload
+}
+
+export function openInterviewEvents(agentId, sessionId, handlers = {}) {
+  const source = new EventSource(`${API_BASE_URL}/api/agent/${agentId}/interview/${sessionId}/events`)
+  const events = ['snapshot', 'transcript', 'state', 'assistant_text', 'audio', 'pdf_ready', 'turn_done', 'error']
+  events.forEach((name) => {
+    const handler = handlers[name]
+    if (!handler) return
+    source.addEventListener(name, (event) => {
+      if (event.data) handler(JSON.parse(event.data))
+    })
+  })
+  return source
+}
+
+export async function submitInterviewChannelTurn(agentId, sessionId, { audio_blob, user_input = '', was_interruption = false }) {
+  const init = { method: 'POST' }
+  if (audio_blob) {
+    const formData = new FormData()
+    formData.append('was_interruption', String(Boolean(was_interruption)))
+    formData.append('audio', audio_blob, 'turn.webm')
+    init.body = formData
+  } else {
+    init.headers = { 'Content-Type': 'application/json' }
+    init.body = JSON.stringify({ user_input, was_interruption })
+  }
+
+  const response = await fetch(`${API_BASE_URL}/api/agent/${agentId}/interview/${sessionId}/turns`, init)
+  const payload = await readJson(response)
+  if (!response.ok) {
+    const error = new Error(payload.error || `Could not process interview turn (${response.status})`)
+    error.code = payload.code || ''
+    error.status = response.status
+    throw error
+  }
+  return payload
+}
+
+export async function cancelInterviewTurn(agentId, sessionId) {
+  const response = await fetch(`${API_BASE_URL}/api/agent/${agentId}/interview/${sessionId}/cancel`, {
+    method: 'POST',
+  })
+  const payload = await readJson(response)
+  if (!response.ok) {
+    throw new Error(payload.error || `Could not cancel interview turn (${response.status})`)
+  }
+  return payload
+}
+
 export async function listDashboardSessions() {
   const response = await fetch(`${API_BASE_URL}/api/admin/dashboard/sessions`)
   const payload = await readJson(response)